@@ -14,6 +14,7 @@ UPLOAD_DIRS = {
     "completed": _UPLOAD_ROOT / "completed",
     "failed": _UPLOAD_ROOT / "failed",
     "ocr_output": _UPLOAD_ROOT / "ocr_output",     # MinerU 输出目录（持久化）
+    "ocr_batches": _UPLOAD_ROOT / "ocr_batches",   # 批量 OCR 的临时输入目录（处理完即删除）
 }
 
 for _d in UPLOAD_DIRS.values():
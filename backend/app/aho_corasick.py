@@ -0,0 +1,157 @@
+"""
+多模式串匹配（Aho-Corasick 自动机）
+
+标签直接匹配、学校关键词窗口、职位关键词匹配原先都是每个模式串单独扫描一遍全文，耗时为 O(模式数 × 文本长度)。
+这里把一组模式串编译为自动机，之后每份文本只扫描一遍即可得到所有命中及其位置：
+- 大小写不敏感：模式串与文本按字符折叠为小写
+- 全角英文/数字/符号折叠为半角、全角空格折叠为空格（中文排版常见 "ＪＡＶＡ" "Ｃ＋＋"），汉字原样匹配
+- 折叠逐字符进行且不改变长度，命中位置即原文下标
+模式串较少（不超过 _DIRECT_SCAN_MAX 个，如学校关键词、职位关键词）时，逐个在折叠后的文本上做 C 层子串查找
+比纯 Python 的自动机扫描更快，此时不构建自动机，接口与结果不变（阈值见 scripts/benchmark_tag_matching.py）。
+自动机构建后只读，可在多个线程中共享；随词表缓存（TagDictionary 每个快照构建一次，固定关键词表见 compile_patterns）。
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+
+# 模式串不超过该数量时逐个子串查找（实测约 250 个模式串时两者耗时持平）
+_DIRECT_SCAN_MAX = 200
+
+_HALFWIDTH = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+_HALFWIDTH[0x3000] = ord(" ")
+
+
+def _fold_char(ch: str) -> str:
+    low = ch.lower()
+    # 少数字符小写后长度变化（如 "İ"），保持原样以免位置错位
+    return low if len(low) == 1 else ch
+
+
+def fold(text: str) -> str:
+    """折叠为小写并把全角字符转为半角，结果与原文等长。"""
+    if text.isascii():
+        return text.lower()
+    text = text.translate(_HALFWIDTH)
+    low = text.lower()
+    return low if len(low) == len(text) else "".join(_fold_char(ch) for ch in text)
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    pattern: str
+
+
+class Automaton:
+    """编译后的多模式串匹配器。折叠后相同的模式串（如 "Java" 与 "JAVA"）命中时一并返回。"""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns: List[str] = []
+        key_ids: Dict[str, int] = {}
+        self._originals: List[List[str]] = []
+        self._keys: List[str] = []
+        goto: List[Dict[str, int]] = [{}]
+        own: List[List[int]] = [[]]
+        for pattern in patterns:
+            if not pattern:
+                continue
+            key = fold(pattern)
+            self.patterns.append(pattern)
+            kid = key_ids.get(key)
+            if kid is not None:
+                self._originals[kid].append(pattern)
+                continue
+            kid = key_ids[key] = len(self._originals)
+            self._originals.append([pattern])
+            self._keys.append(key)
+
+        self._direct = len(self._keys) <= _DIRECT_SCAN_MAX
+        for kid, key in enumerate([] if self._direct else self._keys):
+            state = 0
+            for ch in key:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    own.append([])
+                state = nxt
+            own[state].append(kid)
+
+        # 按层次计算失败指针，并把失败链上的输出合并到各状态，扫描时无需再沿输出链回溯
+        fail = [0] * len(goto)
+        out: List[Tuple[int, ...]] = [()] * len(goto)
+        out[0] = tuple(own[0])
+        queue = deque()
+        for nxt in goto[0].values():
+            out[nxt] = tuple(own[nxt])
+            queue.append(nxt)
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = tuple(own[nxt]) + out[fail[nxt]]
+                queue.append(nxt)
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _scan(self, text: str) -> Iterator[Tuple[int, int]]:
+        """按结束位置顺序产出 (命中结束位置（不含）, 模式键编号)。"""
+        if self._direct:
+            yield from sorted(self._direct_scan(fold(text)))
+            return
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(fold(text)):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for kid in out[state]:
+                yield i + 1, kid
+
+    def _direct_scan(self, folded: str) -> Iterator[Tuple[int, int]]:
+        for kid, key in enumerate(self._keys):
+            pos = folded.find(key)
+            while pos != -1:
+                yield pos + len(key), kid
+                pos = folded.find(key, pos + 1)
+
+    def iter_matches(self, text: str) -> Iterator[Match]:
+        """按结束位置顺序产出所有命中（含重叠命中），位置为原文下标。"""
+        for end, kid in self._scan(text):
+            start = end - len(self._keys[kid])
+            for pattern in self._originals[kid]:
+                yield Match(start, end, pattern)
+
+    def find_all(self, text: str) -> List[Match]:
+        return list(self.iter_matches(text))
+
+    def matched(self, text: str) -> Set[str]:
+        """文本中出现过的模式串集合（不需要位置时使用）。"""
+        if self._direct:
+            folded = fold(text)
+            kids = {kid for kid, key in enumerate(self._keys) if key in folded}
+        else:
+            kids = {kid for _, kid in self._scan(text)}
+        return {p for kid in kids for p in self._originals[kid]}
+
+
+@lru_cache(maxsize=64)
+def _compile_cached(patterns: Tuple[str, ...]) -> Automaton:
+    return Automaton(patterns)
+
+
+def compile_patterns(patterns: Iterable[str]) -> Automaton:
+    """编译一组固定的模式串（如代码中的关键词表）；相同的模式串组合复用同一个自动机。"""
+    return _compile_cached(tuple(patterns))
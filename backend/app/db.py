@@ -1,14 +1,123 @@
-from typing import Any, Dict, List
+import itertools
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
-from supabase import create_client, Client
+from postgrest import SyncPostgrestClient
+from supabase import Client, ClientOptions
 
 from .config import get_app_settings
 
 
-def get_supabase_client() -> Client:
-    settings = get_app_settings()
-    return create_client(settings.supabase_url, settings.supabase_key)
+class _KeepAlivePostgrestClient(SyncPostgrestClient):
+    """PostgREST 客户端：HTTP 会话使用可配置的连接池与 keep-alive 时长。"""
+
+    def create_session(self, base_url, headers, timeout, verify=True) -> httpx.Client:
+        return httpx.Client(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            follow_redirects=True,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10")),
+                keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "120")),
+            ),
+        )
+
+
+class _PooledClient(Client):
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=None, verify=True) -> SyncPostgrestClient:
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        return _KeepAlivePostgrestClient(rest_url, headers=headers, schema=schema, verify=verify, **kwargs)
+
+
+class SupabaseClientPool:
+    """进程内共享的 Supabase 客户端池。
+
+    每个客户端持有长连接的 HTTP 会话（TLS 握手只在建连时发生一次），
+    取用时轮询分配；会话已关闭或存活超过 max_age 的客户端会被重建。
+    """
+
+    def __init__(self, url: str, key: str, size: int, max_age: float) -> None:
+        self.url = url
+        self.key = key
+        self.size = max(1, size)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._slots: List[Optional[Tuple[Client, float]]] = [None] * self.size
+        self._cursor = itertools.count()
+        self.created = 0
+
+    def _create(self) -> Client:
+        self.created += 1
+        return _PooledClient(self.url, self.key, ClientOptions())
+
+    @staticmethod
+    def _is_healthy(client: Client) -> bool:
+        pg = client._postgrest
+        return pg is None or not pg.session.is_closed
+
+    def get(self) -> Client:
+        idx = next(self._cursor) % self.size
+        with self._lock:
+            slot = self._slots[idx]
+            now = time.monotonic()
+            if slot is not None:
+                client, created_at = slot
+                if now - created_at < self.max_age and self._is_healthy(client):
+                    return client
+                try:
+                    if client._postgrest is not None:
+                        client._postgrest.session.close()
+                except Exception:
+                    pass
+            client = self._create()
+            self._slots[idx] = (client, now)
+            return client
+
+    def close(self) -> None:
+        with self._lock:
+            for slot in self._slots:
+                if slot is not None and slot[0]._postgrest is not None:
+                    slot[0]._postgrest.session.close()
+            self._slots = [None] * self.size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            live = sum(1 for s in self._slots if s is not None)
+        return {"size": self.size, "live": live, "created": self.created}
+
+
+_pools: Dict[Tuple[str, str], SupabaseClientPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_supabase_client(url: Optional[str] = None, key: Optional[str] = None) -> Client:
+    """从共享池取 Supabase 客户端；默认使用 SUPABASE_URL / SUPABASE_KEY。
+
+    池大小由 SUPABASE_POOL_SIZE 控制，客户端最长复用 SUPABASE_CLIENT_MAX_AGE 秒。
+    """
+    if url is None or key is None:
+        settings = get_app_settings()
+        url = url or settings.supabase_url
+        key = key or settings.supabase_key
+    with _pools_lock:
+        pool = _pools.get((url, key))
+        if pool is None:
+            pool = SupabaseClientPool(
+                url,
+                key,
+                size=int(os.getenv("SUPABASE_POOL_SIZE", "4")),
+                max_age=float(os.getenv("SUPABASE_CLIENT_MAX_AGE", "3600")),
+            )
+            _pools[(url, key)] = pool
+    return pool.get()
 
 
 def fetch_schema_via_pg_meta() -> Dict[str, List[Dict[str, Any]]]:
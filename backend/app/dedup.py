@@ -0,0 +1,164 @@
+"""
+内容指纹去重
+
+同一份 PDF 常被多次上传（/upload、/uploads/complete、下载失败后重新拉取）。
+入库时计算 SHA-256 并写入 resume_files.content_sha256；watcher 处理前先按指纹查找：
+- 已有解析结果（resumes 行）：直接复制该行，跳过 OCR、LLM 解析与存储上传
+- 仅有 OCR 文本：跳过 OCR，继续解析
+本地 SQLite 记录每个指纹的 OCR 文本、OCR 耗时与 LLM token 消耗，用于复用与统计节省量。
+content_sha256 列需先执行 scripts/add_content_sha256.sql；启动时检测一次，列不存在时各处不读写该列，
+仅保留本地指纹库的复用（跨进程/按库查找重复内容的去重关闭）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import UPLOAD_DIRS
+from .db import get_supabase_client
+
+
+logger = logging.getLogger("dedup")
+
+_CHUNK_SIZE = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    sha256 TEXT PRIMARY KEY,
+    resume_file_id INTEGER,
+    ocr_text TEXT,
+    ocr_seconds REAL NOT NULL DEFAULT 0,
+    llm_tokens INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS savings (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    hits INTEGER NOT NULL DEFAULT 0,
+    ocr_seconds REAL NOT NULL DEFAULT 0,
+    llm_tokens INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO savings(id) VALUES (1);
+"""
+
+
+def file_sha256(path: Path) -> str:
+    """分块读取文件计算 SHA-256（不整体读入内存）。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@dataclass
+class Fingerprint:
+    sha256: str
+    resume_file_id: Optional[int]
+    ocr_text: Optional[str]
+    ocr_seconds: float
+    llm_tokens: int
+
+
+class FingerprintStore:
+    """指纹 -> 处理成本/OCR 文本 的本地记录，以及累计节省量。"""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, sha256: str) -> Optional[Fingerprint]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, resume_file_id, ocr_text, ocr_seconds, llm_tokens FROM fingerprints WHERE sha256 = ?",
+                (sha256,),
+            ).fetchone()
+        return Fingerprint(*row) if row else None
+
+    def record(
+        self,
+        sha256: str,
+        *,
+        resume_file_id: Optional[int],
+        ocr_text: Optional[str],
+        ocr_seconds: float,
+        llm_tokens: int,
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO fingerprints(sha256, resume_file_id, ocr_text, ocr_seconds, llm_tokens, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(sha256) DO UPDATE SET resume_file_id = excluded.resume_file_id, "
+                "ocr_text = excluded.ocr_text, ocr_seconds = excluded.ocr_seconds, "
+                "llm_tokens = excluded.llm_tokens, updated_at = excluded.updated_at",
+                (sha256, resume_file_id, ocr_text, ocr_seconds, llm_tokens, time.time()),
+            )
+
+    def add_savings(self, *, ocr_seconds: float = 0.0, llm_tokens: int = 0) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE savings SET hits = hits + 1, ocr_seconds = ocr_seconds + ?, llm_tokens = llm_tokens + ? WHERE id = 1",
+                (ocr_seconds, llm_tokens),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, ocr_seconds, llm_tokens = self._conn.execute(
+                "SELECT hits, ocr_seconds, llm_tokens FROM savings WHERE id = 1"
+            ).fetchone()
+            known = self._conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+        return {
+            "hits": hits,
+            "ocr_seconds_saved": round(ocr_seconds, 1),
+            "llm_tokens_saved": llm_tokens,
+            "fingerprints": known,
+        }
+
+
+_store: Optional[FingerprintStore] = None
+_store_lock = threading.Lock()
+
+
+def get_fingerprint_store() -> FingerprintStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            db_path = os.getenv("DEDUP_DB") or str(UPLOAD_DIRS["processing"].parent / "fingerprints.sqlite3")
+            _store = FingerprintStore(Path(db_path))
+        return _store
+
+
+_sha256_column: Optional[bool] = None
+_sha256_column_lock = threading.Lock()
+
+
+def content_sha256_supported() -> bool:
+    """resume_files 是否已有 content_sha256 列（首次调用时查询一次并缓存；查询本身失败时下次重试）。"""
+    global _sha256_column
+    with _sha256_column_lock:
+        if _sha256_column is None:
+            try:
+                get_supabase_client().table("resume_files").select("id,content_sha256").limit(1).execute()
+                _sha256_column = True
+            except Exception as e:
+                # PostgREST 对不存在的列返回 42703（undefined_column）
+                if getattr(e, "code", None) != "42703" and "content_sha256" not in str(e):
+                    logger.warning(f"检测 resume_files.content_sha256 列失败，暂不写入指纹: {e}")
+                    return False
+                _sha256_column = False
+                logger.warning(
+                    "resume_files 缺少 content_sha256 列，已停用按库去重且不写入内容指纹；"
+                    "请执行 backend/scripts/add_content_sha256.sql"
+                )
+        return _sha256_column
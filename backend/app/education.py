@@ -11,8 +11,10 @@ from __future__ import annotations
 import json
 import os
 import re
-from difflib import SequenceMatcher
 from .llm import LLMClient
+from .llm_batch import batching_enabled, get_micro_batcher, indexed_input, parse_indexed_answers
+from .model_router import default_model
+from .university_index import UniversityLookup
 from typing import List, Dict, Any, Optional
 
 
@@ -257,6 +259,14 @@ class UniversityClassifier:
         self.universities_double_first_class = self._load_json_file('universities_double_first_class.json')
         self.universities_overseas = self._load_json_file('universities_overseas.json')
         self.alias_mapping = self._create_alias_mapping()
+        self.lookup = UniversityLookup(
+            [
+                ('985', self.universities_985),
+                ('211', self.universities_211),
+                ('double_first_class', self.universities_double_first_class),
+            ],
+            self.alias_mapping,
+        )
 
     def _create_alias_mapping(self) -> Dict[str, str]:
         return {
@@ -286,42 +296,16 @@ class UniversityClassifier:
             '悉尼大学': 'University of Sydney', 'ANU': 'Australian National University',
         }
 
-    def _normalize_university_name(self, name: str) -> str:
-        if not name:
-            return ''
-        name = re.sub(r'\s+', ' ', name.strip())
-        return self.alias_mapping.get(name, name)
-
-    def _fuzzy_match(self, target: str, candidates: List[str], threshold: float = 0.8) -> Optional[str]:
-        target_l = target.lower()
-        best_ratio = 0.0
-        best_match = None
-        for c in candidates:
-            r = SequenceMatcher(None, target_l, c.lower()).ratio()
-            if r > best_ratio and r >= threshold:
-                best_ratio = r
-                best_match = c
-        return best_match
-
-    def classify_university(self, university_name: str) -> str:
+    def classify_university(self, university_name: str, overseas_hint: Optional[bool] = None) -> str:
+        """判定学校层次。overseas_hint 为上游（如合并抽取调用）已给出的海外判断，提供时不再单独调用 LLM。"""
         if not university_name:
             return 'unknown'
-        n = self._normalize_university_name(university_name)
-        if n in self.universities_985:
-            return '985'
-        if n in self.universities_211:
-            return '211'
-        if n in self.universities_double_first_class:
-            return 'double_first_class'
-        # 先尝试国内名单的模糊匹配
-        if self._fuzzy_match(n, self.universities_985):
-            return '985'
-        if self._fuzzy_match(n, self.universities_211):
-            return '211'
-        if self._fuzzy_match(n, self.universities_double_first_class):
-            return 'double_first_class'
-        # 未识别为国内院校：调用 LLM 判断是否海外
-        llm_overseas = self._is_overseas_via_llm(n)
+        # 国内名单：精确查表（含别名），再按 985 -> 211 -> 双一流 模糊匹配（见 university_index）
+        n, tier = self.lookup.lookup(university_name)
+        if tier is not None:
+            return tier
+        # 未识别为国内院校：优先使用上游给出的海外判断，否则调用 LLM 判断是否海外
+        llm_overseas = overseas_hint if overseas_hint is not None else self._is_overseas_via_llm(n)
         if llm_overseas is True:
             return 'overseas'
         if llm_overseas is False:
@@ -342,6 +326,12 @@ class UniversityClassifier:
         client = LLMClient.from_env()
         if not client:
             return None
+        if batching_enabled():
+            # 与其他在途简历的院校合并为一次批量判断
+            val = get_micro_batcher(
+                "overseas", _is_overseas_batch_via_llm, prompt=_OVERSEAS_BATCH_PROMPT, model=default_model
+            ).submit(university_name)
+            return val if isinstance(val, bool) else None
 
         prompt = (
             "判断给定的院校名称是否属于海外大学。仅输出 JSON，不要解释。\\n"
@@ -365,7 +355,7 @@ class UniversityClassifier:
             "输出: {\"overseas\": true}\\n"
         )
 
-        content = client.extract(prompt, university_name, max_tokens=30)
+        content = client.extract(prompt, university_name, max_tokens=30, cache_site="overseas")
         if not content:
             return None
         try:
@@ -401,7 +391,8 @@ class UniversityClassifier:
         for edu in education_list:
             if not isinstance(edu, dict) or 'school' not in edu:
                 continue
-            level = self.classify_university(edu.get('school', ''))
+            hint = edu.get('overseas')
+            level = self.classify_university(edu.get('school', ''), overseas_hint=hint if isinstance(hint, bool) else None)
             if level == 'unknown':
                 continue
             education_levels.append(level)
@@ -443,6 +434,25 @@ education_analyzer = EducationAnalyzer()
 university_classifier = UniversityClassifier()
 
 
+_OVERSEAS_BATCH_PROMPT = (
+    "判断输入 JSON 中每个院校名称是否属于海外大学。仅输出 JSON，不要解释。\n"
+    "输入格式：{\"编号\": \"院校名称\"}；输出格式：{\"编号\": true|false|null}，每个编号都必须给出。\n"
+    "规则：true 表示海外大学；false 表示非海外（国内）；无法判断为 null。\n"
+    "示例：\n"
+    "输入: {\"0\": \"Harvard University\", \"1\": \"清华大学\", \"2\": \"University of Cambridge\"}\n"
+    "输出: {\"0\": true, \"1\": false, \"2\": true}\n"
+)
+
+
+def _is_overseas_batch_via_llm(names: List[str]) -> Optional[Dict[str, Any]]:
+    """批量海外判断：一次调用判断多所院校，返回 {院校名: True/False}（不确定的不返回）。"""
+    client = LLMClient.from_env()
+    if not client:
+        return None
+    content = client.extract(_OVERSEAS_BATCH_PROMPT, indexed_input(names), max_tokens=16 * len(names) + 16)
+    return {k: v for k, v in parse_indexed_answers(content, names).items() if isinstance(v, bool)}
+
+
 def analyze_highest_education_level(education_list: List[Dict[str, Any]]) -> str:
     return education_analyzer.analyze_highest_education_level(education_list)
 
@@ -451,8 +461,8 @@ def get_education_analysis(education_list: List[Dict[str, Any]]) -> Dict[str, An
     return education_analyzer.get_education_analysis(education_list)
 
 
-def classify_university(university_name: str) -> str:
-    return university_classifier.classify_university(university_name)
+def classify_university(university_name: str, overseas_hint: Optional[bool] = None) -> str:
+    return university_classifier.classify_university(university_name, overseas_hint=overseas_hint)
 
 
 def classify_education_background(education_list: List[Dict[str, Any]]) -> Dict[str, Any]:
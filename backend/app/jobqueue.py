@@ -0,0 +1,192 @@
+"""
+本地持久化任务队列（SQLite WAL）
+
+watcher 不再每隔几秒扫描 processing 目录，而是由各入口（/upload、拉取循环、目录监听事件）
+把待处理文件写入本队列，消费端按 id 顺序出队。
+- 状态：pending（待处理）/ running（处理中）/ done（完成）/ failed（失败）
+- 同一路径同一时刻只会存在一个 pending/running 任务（部分唯一索引）
+- 出队为单条 UPDATE ... RETURNING，依赖 (state, id) 索引，与积压量无关
+- 进程崩溃后 running 任务在重启时回到 pending，并计入尝试次数
+- 运行中失败的任务在尝试次数未达上限时退避后重新入队（WATCHER_RETRY_BACKOFF 秒起按次数翻倍，最长 1 小时），
+  达到上限后置为 failed
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from . import UPLOAD_DIRS
+
+
+logger = logging.getLogger("job_queue")
+
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    resume_file_id INTEGER,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state_id ON jobs(state, id);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_active_path ON jobs(path) WHERE state IN ('pending', 'running');
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    path: Path
+    resume_file_id: Optional[int]
+    attempts: int
+
+
+class JobQueue:
+    """崩溃安全的本地任务队列，线程安全（单连接 + 锁）。"""
+
+    def __init__(self, db_path: Path, max_attempts: int = 3, retry_backoff: float = 30.0) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = max(0.0, retry_backoff)
+        self._lock = threading.Lock()
+        self._available = threading.Event()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # 旧版本创建的库没有 available_at 列
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "available_at" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN available_at REAL NOT NULL DEFAULT 0")
+
+    def enqueue(self, path: Path, resume_file_id: Optional[int] = None) -> None:
+        """入队；若该路径已有待处理/处理中任务，则仅补全 resume_file_id。"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs(path, resume_file_id, state, created_at, updated_at) VALUES (?, ?, 'pending', ?, ?) "
+                "ON CONFLICT(path) WHERE state IN ('pending', 'running') "
+                "DO UPDATE SET resume_file_id = COALESCE(jobs.resume_file_id, excluded.resume_file_id)",
+                (str(path), resume_file_id, now, now),
+            )
+        self._available.set()
+
+    def dequeue(self) -> Optional[Job]:
+        """取出最早的已到重试时间的 pending 任务并置为 running；无任务时返回 None。"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, updated_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE state = 'pending' AND available_at <= ? ORDER BY id LIMIT 1) "
+                "RETURNING id, path, resume_file_id, attempts",
+                (now, now),
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(id=row[0], path=Path(row[1]), resume_file_id=row[2], attempts=row[3])
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """阻塞直到有新任务入队或超时。"""
+        self._available.wait(timeout=timeout)
+        self._available.clear()
+
+    def mark_done(self, job_id: int) -> None:
+        self._set_state(job_id, STATE_DONE, None)
+
+    def mark_failed(self, job_id: int, error: Optional[str] = None) -> None:
+        self._set_state(job_id, STATE_FAILED, error)
+
+    def retry_or_fail(self, job_id: int, error: Optional[str] = None) -> bool:
+        """运行中失败：尝试次数未达上限时退避后回到 pending 并返回 True，否则置为 failed 并返回 False。"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row[0] >= self.max_attempts:
+                retry = False
+            else:
+                delay = min(3600.0, self.retry_backoff * 2 ** max(0, row[0] - 1))
+                self._conn.execute(
+                    "UPDATE jobs SET state = 'pending', last_error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                    (error, now + delay, now, job_id),
+                )
+                retry = True
+        if not retry:
+            self._set_state(job_id, STATE_FAILED, error)
+            return False
+        logger.info(f"[queue] 任务 {job_id} 失败，{delay:.0f}s 后重试（第 {row[0]} 次失败）: {error}")
+        return True
+
+    def _set_state(self, job_id: int, state: str, error: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (state, error, time.time(), job_id),
+            )
+
+    def recover_running(self) -> int:
+        """启动时调用：上次崩溃遗留的 running 任务回到 pending；超过最大尝试次数的置为 failed。"""
+        now = time.time()
+        with self._lock:
+            failed = self._conn.execute(
+                "UPDATE jobs SET state = 'failed', last_error = '超过最大尝试次数', updated_at = ? "
+                "WHERE state = 'running' AND attempts >= ?",
+                (now, self.max_attempts),
+            ).rowcount
+            requeued = self._conn.execute(
+                "UPDATE jobs SET state = 'pending', updated_at = ? WHERE state = 'running'",
+                (now,),
+            ).rowcount
+        if failed or requeued:
+            logger.info(f"[queue] 恢复未完成任务: 重新入队={requeued}, 置为失败={failed}")
+        if requeued:
+            self._available.set()
+        return requeued
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        """删除早于指定时间的 done/failed 任务，避免表无限增长。"""
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE state IN ('done', 'failed') AND updated_at < ?",
+                (cutoff,),
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        result = {STATE_PENDING: 0, STATE_RUNNING: 0, STATE_DONE: 0, STATE_FAILED: 0}
+        result.update({state: cnt for state, cnt in rows})
+        return result
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """进程内共享的任务队列实例（API 与 watcher 共用）。"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            db_path = os.getenv("WATCHER_QUEUE_DB") or str(UPLOAD_DIRS["processing"].parent / "jobs.sqlite3")
+            max_attempts = int(os.getenv("WATCHER_MAX_ATTEMPTS", "3"))
+            retry_backoff = float(os.getenv("WATCHER_RETRY_BACKOFF", "30"))
+            _queue = JobQueue(Path(db_path), max_attempts=max_attempts, retry_backoff=retry_backoff)
+        return _queue
@@ -1,30 +1,175 @@
 from __future__ import annotations
 
+import json
 import os
 import logging
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+
+from .llm_cache import get_llm_cache, make_cache_key
+from .llm_limiter import PRIORITY_NORMAL, get_llm_limiter
+from .llm_resilience import (
+    CircuitOpenError,
+    DeadlineExceeded,
+    call_deadline,
+    get_circuit_breaker,
+    get_latency_tracker,
+    get_request_executor,
+    hedge_delay,
+    hedged_call,
+    resilience_stats,
+)
+from .pipeline import SingleFlight
 
 
 logger = logging.getLogger("llm")
 
+# 未指定 max_tokens 时预估的输出 token 数（仅用于限流预占）
+_DEFAULT_OUTPUT_TOKENS = 1024
+
+_SYSTEM_PROMPT = "你是简历信息抽取助手，只能输出严格 JSON。禁止输出说明、示例、Markdown 或 ``` 代码块。所有阶段一律使用中文输出字段内容；但专有名词（公司/机构/学校/产品/技术/代币/公链/人名等）保持原文，英文就好，不要翻译。"
+
+
+class TokenMeter:
+    """累计一段处理过程中 LLM 调用消耗的 token 数（run_graph 的多个线程会同时累加）。"""
+
+    def __init__(self) -> None:
+        self.total_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, tokens: int) -> None:
+        with self._lock:
+            self.total_tokens += tokens
+
+
+_token_meter: ContextVar[Optional[TokenMeter]] = ContextVar("llm_token_meter", default=None)
+
+
+@contextmanager
+def track_llm_tokens() -> Iterator[TokenMeter]:
+    """在 with 块内统计当前上下文中所有 LLMClient.extract 的 token 消耗。"""
+    meter = TokenMeter()
+    token = _token_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _token_meter.reset(token)
+
+
+class _ConnectionStats:
+    """统计共享连接池上的请求数与新建连接数（其余即为复用的连接）。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def on_request(self, request: httpx.Request) -> None:
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+
+
+_conn_stats = _ConnectionStats()
+_http_client: Optional[httpx.Client] = None
+_openai_clients: Dict[Tuple[Optional[str], str], Any] = {}
+_registry: Dict[Tuple[str, Optional[str]], "LLMClient"] = {}
+_registry_lock = threading.Lock()
+_single_flight = SingleFlight()
+
+
+def _shared_http_client() -> httpx.Client:
+    """所有 OpenAI 客户端共用的 httpx 连接池（线程安全）。需在 _registry_lock 内调用。"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            timeout=httpx.Timeout(float(os.getenv("LLM_TIMEOUT", "60")), connect=10.0),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "32")),
+                max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "16")),
+                keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "90")),
+            ),
+            event_hooks={"request": [_conn_stats.on_request]},
+        )
+    return _http_client
+
+
+def llm_pool_stats() -> Dict[str, Any]:
+    """LLM 客户端注册表、连接复用、全局限流与相同请求合并统计。"""
+    with _registry_lock:
+        clients = len(_registry)
+    requests = _conn_stats.requests
+    new_connections = _conn_stats.new_connections
+    return {
+        "clients": clients,
+        "requests": requests,
+        "new_connections": new_connections,
+        "reused_connections": max(0, requests - new_connections),
+        "limiter": get_llm_limiter().stats(),
+        "single_flight": _single_flight.stats(),
+        "resilience": resilience_stats(),
+    }
+
+
+def _provider_name(base_url: Optional[str]) -> str:
+    return base_url or "openai"
+
+
+def llm_circuit_open() -> bool:
+    """当前配置的服务商是否处于熔断中（此时 LLM 调用会直接返回 None）。"""
+    return get_circuit_breaker(_provider_name(os.getenv("OPENAI_BASE_URL"))).is_open()
+
 
 class LLMClient:
     """可选的 LLM 客户端，当前支持 OpenAI，如果未配置将返回 None。
 
+    from_env / from_env_with_model 返回进程内共享的实例（按 (model, base_url) 注册），
+    底层 OpenAI 客户端共用一个 httpx 连接池，可在 watcher 的多个工作线程中并发使用。
+
     使用方式：
       client = LLMClient.from_env()
       if client:
-          text = client.summarize("...")
+          text = client.extract(prompt, text)
     """
 
     def __init__(self, model: str, api_key: str, base_url: Optional[str] = None) -> None:
         from openai import OpenAI  # type: ignore
 
         self.model = model
-        if base_url:
-            self.client = OpenAI(api_key=api_key, base_url=base_url)
-        else:
-            self.client = OpenAI(api_key=api_key)
+        self.provider = _provider_name(base_url)
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "60"))
+        with _registry_lock:
+            key = (base_url, api_key)
+            client = _openai_clients.get(key)
+            if client is None:
+                # 重试由 _complete 负责，使限流器能感知每一次 429
+                kwargs: Dict[str, Any] = {"api_key": api_key, "http_client": _shared_http_client(), "max_retries": 0}
+                if base_url:
+                    kwargs["base_url"] = base_url
+                client = _openai_clients[key] = OpenAI(**kwargs)
+        self.client = client
+
+    @staticmethod
+    def _get(model: str, api_key: str, base_url: Optional[str]) -> "LLMClient":
+        key = (model, base_url)
+        with _registry_lock:
+            inst = _registry.get(key)
+        if inst is not None and inst.client.api_key == api_key:
+            return inst
+        inst = LLMClient(model=model, api_key=api_key, base_url=base_url)
+        with _registry_lock:
+            _registry[key] = inst
+        return inst
 
     @staticmethod
     def from_env() -> Optional["LLMClient"]:
@@ -34,7 +179,7 @@ class LLMClient:
         if not api_key:
             return None
         try:
-            return LLMClient(model=model, api_key=api_key, base_url=base_url)
+            return LLMClient._get(model, api_key, base_url)
         except Exception as e:
             logger.warning(f"初始化 LLM 失败：{e}")
             return None
@@ -46,26 +191,165 @@ class LLMClient:
         if not api_key:
             return None
         try:
-            return LLMClient(model=model_name, api_key=api_key, base_url=base_url)
+            return LLMClient._get(model_name, api_key, base_url)
         except Exception as e:
             logger.warning(f"初始化 LLM 指定模型失败：{e}")
             return None
 
-    def extract(self, prompt: str, text: str, max_tokens: Optional[int] = None) -> Optional[str]:
+    def extract(
+        self,
+        prompt: str,
+        text: str,
+        max_tokens: Optional[int] = None,
+        json_schema: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        cache_site: Optional[str] = None,
+        priority: int = PRIORITY_NORMAL,
+        deadline: Optional[float] = None,
+    ) -> Optional[str]:
+        """调用模型抽取；json_schema 形如 {"name": ..., "schema": {...}}，传入时按结构化输出（strict）约束返回。
+
+        timeout 为单次请求的超时秒数，缺省使用 LLM_TIMEOUT；deadline 为整个调用（含排队与重试）的
+        截止秒数，缺省使用 LLM_DEADLINE。服务商熔断、超时或失败时返回 None，由调用方走规则路径。
+        cache_site 为调用点名称，传入时读写持久化响应缓存（见 llm_cache），并按调用点统计命中率。
+        priority 为全局限流排队优先级（见 llm_limiter），数值越小越优先。
+        并发的相同请求（模型、提示词、文本、max_tokens、schema 均相同）只调用一次上游并共享结果。
+        """
+        # 结构化输出的 schema 同样决定返回内容，并入提示词参与请求键
+        full_prompt = _SYSTEM_PROMPT + "\n" + prompt
+        if json_schema is not None:
+            full_prompt += "\n" + json.dumps(json_schema, ensure_ascii=False, sort_keys=True)
+        request_key = make_cache_key(self.model, full_prompt, text, max_tokens)
+        cache = None
+        if cache_site:
+            try:
+                cache = get_llm_cache()
+                if cache is not None:
+                    cached = cache.get(request_key, cache_site)
+                    if cached is not None:
+                        return cached
+            except Exception as e:
+                logger.warning(f"LLM 缓存读取失败：{e}")
+                cache = None
+        # 多个工作线程同时发起的相同请求只调用一次上游，共享结果
+        return _single_flight.do(
+            request_key,
+            lambda: self._extract_uncached(prompt, text, max_tokens, json_schema, timeout, priority,
+                                           call_deadline(deadline), cache, request_key, cache_site),
+        )
+
+    def _extract_uncached(self, prompt: str, text: str, max_tokens: Optional[int],
+                          json_schema: Optional[Dict[str, Any]], timeout: Optional[float], priority: int,
+                          deadline: float, cache: Any, cache_key: str, cache_site: Optional[str]) -> Optional[str]:
         try:
-            kwargs = {}
-            if max_tokens is not None:
-                kwargs["max_tokens"] = max_tokens
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是简历信息抽取助手，只能输出严格 JSON。禁止输出说明、示例、Markdown 或 ``` 代码块。所有阶段一律使用中文输出字段内容；但专有名词（公司/机构/学校/产品/技术/代币/公链/人名等）保持原文，英文就好，不要翻译。"},
-                    {"role": "user", "content": prompt + "\n\n<文本开始>\n" + text + "\n<文本结束>"},
-                ],
-                temperature=0.0,
-                **kwargs,
-            )
-            return completion.choices[0].message.content or None
+            completion = self._complete(prompt, text, max_tokens, json_schema, timeout, priority, deadline)
+            meter = _token_meter.get()
+            total_tokens = _usage_tokens(completion)
+            if meter is not None:
+                meter.add(total_tokens)
+            content = completion.choices[0].message.content or None
+        except CircuitOpenError:
+            return None
         except Exception as e:
             logger.warning(f"LLM 提取失败：{e}")
             return None
+        # 仅缓存正常结束的响应：被 max_tokens 截断的输出不复用
+        if cache is not None and content and completion.choices[0].finish_reason in (None, "stop"):
+            try:
+                cache.put(cache_key, cache_site, self.model, content, total_tokens)
+            except Exception as e:
+                logger.warning(f"LLM 缓存写入失败：{e}")
+        return content
+
+    def _complete(self, prompt: str, text: str, max_tokens: Optional[int],
+                  json_schema: Optional[Dict[str, Any]], timeout: Optional[float], priority: int,
+                  deadline: float) -> Any:
+        """经全局限流器与熔断器发起一次对话补全，最迟在 deadline（monotonic）返回。
+
+        429/5xx/网络错误按 LLM_MAX_RETRIES 重试，慢请求按 p95 对冲（见 llm_resilience）；最终失败时抛出异常。
+        """
+        kwargs: Dict[str, Any] = {}
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if json_schema is not None:
+            kwargs["response_format"] = {"type": "json_schema", "json_schema": {**json_schema, "strict": True}}
+        user_content = prompt + "\n\n<文本开始>\n" + text + "\n<文本结束>"
+        messages = [
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": user_content},
+        ]
+        per_request = timeout if timeout is not None else self.timeout
+        # 预估 token：中英混排按约 2 字符/token，加上输出上限
+        reserved = (len(_SYSTEM_PROMPT) + len(user_content)) // 2 + (max_tokens or _DEFAULT_OUTPUT_TOKENS)
+        limiter = get_llm_limiter()
+        breaker = get_circuit_breaker(self.provider)
+        latency = get_latency_tracker(self.model)
+
+        def send(remaining: float) -> Any:
+            # 调用方已为本次请求占用一个限流名额，结束时在此归还
+            started = time.monotonic()
+            try:
+                completion = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.0,
+                    timeout=max(1.0, min(per_request, remaining)),
+                    **kwargs,
+                )
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                throttled = status == 429
+                limiter.release(reserved, None, time.monotonic() - started,
+                                throttled=throttled, retry_after=_retry_after(e) if throttled else None)
+                # 超时、网络错误与 5xx 视为服务商不可用；其余 4xx 说明服务商仍在正常响应
+                if status is None or status >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                raise
+            elapsed = time.monotonic() - started
+            limiter.release(reserved, _usage_tokens(completion) or None, elapsed)
+            latency.record(elapsed)
+            breaker.record_success()
+            return completion
+
+        def try_hedge() -> bool:
+            return breaker.state == breaker.CLOSED and limiter.acquire(reserved, priority, timeout=0)
+
+        max_attempts = max(1, int(os.getenv("LLM_MAX_RETRIES", "3")))
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                raise CircuitOpenError(f"{self.provider} 熔断中")
+            if not limiter.acquire(reserved, priority, timeout=max(0.0, deadline - time.monotonic())):
+                raise DeadlineExceeded("等待限流名额超过截止时间")
+            try:
+                return hedged_call(send, deadline, hedge_delay(self.model), try_hedge, get_request_executor())
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                throttled = status == 429
+                # 4xx（限流除外）为请求本身的问题，重试无意义
+                if attempt >= max_attempts or (status is not None and status < 500 and not throttled):
+                    raise
+                backoff = _retry_after(e) or min(20.0, 1.5 * attempt)
+                if time.monotonic() + backoff >= deadline:
+                    raise
+                logger.warning(f"LLM 请求失败，重试({attempt}/{max_attempts})，等待 {backoff:.1f}s：{e}")
+                time.sleep(backoff)
+
+
+def _usage_tokens(completion: Any) -> int:
+    usage = getattr(completion, "usage", None)
+    return int(getattr(usage, "total_tokens", 0) or 0) if usage is not None else 0
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(60.0, float(value)) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,219 @@
+"""
+跨简历的小任务微批处理
+
+海外院校判断（max_tokens=30）、职位/专业/校名翻译等调用本身很小，耗时主要是网络往返。
+MicroBatcher 在 LLM_BATCH_WINDOW_MS 毫秒内收集所有在途简历提交的同类小任务（最多 LLM_BATCH_MAX_SIZE 项），
+合成一次批量 JSON 提示词调用，再把每一项的结果分发回各自的调用方：
+- 同一批内相同的输入只发送一次
+- 每一项的结果按 (模型, 批量提示词, 输入) 写入 LLM 响应缓存（llm_cache），之后直接命中，不再进入批次；
+  提示词或模型路由变化后自然失效
+- 批量调用失败或某项缺失时该项返回 None，由调用方按原逻辑兜底
+LLM_BATCH_ENABLED=0 时调用方走原有的逐个调用路径。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .llm_cache import get_llm_cache, make_cache_key
+
+
+logger = logging.getLogger("llm")
+
+BatchFn = Callable[[List[str]], Optional[Dict[str, Any]]]
+ModelFn = Callable[[], str]
+
+
+def batching_enabled() -> bool:
+    return os.getenv("LLM_BATCH_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+class MicroBatcher:
+    """收集窗口内的小任务并批量执行；run_batch 接收去重后的输入列表，返回 {输入: 结果}。"""
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: BatchFn,
+        *,
+        window: float,
+        max_batch: int,
+        executor: ThreadPoolExecutor,
+        prompt: str = "",
+        model: Optional[ModelFn] = None,
+    ) -> None:
+        self.name = name
+        self.run_batch = run_batch
+        # 参与缓存键：批量提示词与调用时解析出的模型名，与 llm.py 单次调用的键构成一致
+        self.prompt = prompt
+        self.model = model or (lambda: "")
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._executor = executor
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Future] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.items = 0
+        self.cache_hits = 0
+
+    def submit(self, item: str) -> Any:
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items: List[str]) -> List[Any]:
+        """阻塞直到所有输入都有结果（None 表示失败或模型未给出）。"""
+        results: Dict[str, Any] = {}
+        misses = []
+        for item in dict.fromkeys(items):
+            hit, value = self._cache_get(item)
+            if hit:
+                results[item] = value
+            else:
+                misses.append(item)
+        if misses:
+            with self._cond:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._collect_loop, name=f"llm-batch-{self.name}", daemon=True)
+                    self._thread.start()
+                futures = {}
+                for item in misses:
+                    fut = self._pending.get(item)
+                    if fut is None:
+                        fut = self._pending[item] = Future()
+                    futures[item] = fut
+                self._cond.notify_all()
+            for item, fut in futures.items():
+                results[item] = fut.result()
+        return [results[item] for item in items]
+
+    def _collect_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # 第一项到达后开始计时，窗口结束或凑满一批即发出
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                keys = list(self._pending)[: self.max_batch]
+                batch = {k: self._pending.pop(k) for k in keys}
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: Dict[str, Future]) -> None:
+        try:
+            out = self.run_batch(list(batch)) or {}
+        except Exception as e:
+            logger.warning(f"[batch] {self.name} 批量调用失败: {e}")
+            out = {}
+        with self._cond:
+            self.batches += 1
+            self.items += len(batch)
+        for item, fut in batch.items():
+            value = out.get(item)
+            if value is not None:
+                self._cache_put(item, value)
+            fut.set_result(value)
+
+    def _cache_key(self, item: str) -> str:
+        # 批处理器名一并计入，避免未提供 prompt 的不同批处理器共用缓存项
+        return make_cache_key(self.model(), f"{self.name}\x00{self.prompt}", item, None)
+
+    def _cache_get(self, item: str) -> tuple:
+        try:
+            cache = get_llm_cache()
+            cached = cache.get(self._cache_key(item), f"batch:{self.name}") if cache is not None else None
+        except Exception:
+            return False, None
+        if cached is None:
+            return False, None
+        with self._cond:
+            self.cache_hits += 1
+        return True, json.loads(cached)
+
+    def _cache_put(self, item: str, value: Any) -> None:
+        try:
+            cache = get_llm_cache()
+            if cache is not None:
+                cache.put(self._cache_key(item), f"batch:{self.name}", "batch", json.dumps(value, ensure_ascii=False), 0)
+        except Exception as e:
+            logger.warning(f"[batch] 缓存写入失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "pending": len(self._pending),
+                "cache_hits": self.cache_hits,
+            }
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_micro_batcher(name: str, run_batch: BatchFn, *, prompt: str = "", model: Optional[ModelFn] = None) -> MicroBatcher:
+    """按名称取进程内共享的批处理器；同名批处理器沿用首次注册的 run_batch、prompt 与 model。
+
+    prompt 为 run_batch 使用的批量提示词，model 返回其使用的模型名，二者参与结果缓存键。
+    """
+    global _executor
+    with _batchers_lock:
+        batcher = _batchers.get(name)
+        if batcher is None:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))),
+                    thread_name_prefix="llm-batch",
+                )
+            batcher = _batchers[name] = MicroBatcher(
+                name,
+                run_batch,
+                window=float(os.getenv("LLM_BATCH_WINDOW_MS", "20")) / 1000.0,
+                max_batch=int(os.getenv("LLM_BATCH_MAX_SIZE", "32")),
+                executor=_executor,
+                prompt=prompt,
+                model=model,
+            )
+        return batcher
+
+
+def micro_batch_stats() -> Dict[str, Any]:
+    with _batchers_lock:
+        batchers = list(_batchers.values())
+    return {b.name: b.stats() for b in batchers}
+
+
+def parse_indexed_answers(content: Optional[str], items: List[str]) -> Dict[str, Any]:
+    """解析批量提示词的返回：{"0": 答案, "1": 答案, ...}，按编号映射回输入。"""
+    if not content:
+        return {}
+    text = content.strip().strip("`")
+    if text.lower().startswith("json"):
+        text = text[4:]
+    try:
+        data = json.loads(text)
+    except Exception:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    out: Dict[str, Any] = {}
+    for i, item in enumerate(items):
+        if str(i) in data:
+            out[item] = data[str(i)]
+    return out
+
+
+def indexed_input(items: List[str]) -> str:
+    return json.dumps({str(i): item for i, item in enumerate(items)}, ensure_ascii=False)
@@ -0,0 +1,158 @@
+"""
+LLM 响应持久化缓存
+
+重新处理同一份简历、上传失败后重试、调整提示词后回填等场景会重复发起完全相同的 LLM 调用。
+LLMClient.extract 均为 temperature=0.0 的确定性调用，可按以下键复用结果：
+  (模型名, 系统+用户提示词哈希, 输入文本哈希, max_tokens)
+- 按调用点启用：extract(..., cache_site="xxx") 才读写缓存，并按调用点统计命中率与节省的 token
+- 淘汰：超过 LLM_CACHE_TTL 秒的条目过期；条目数超过 LLM_CACHE_MAX_ENTRIES 时按最近使用时间淘汰
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import UPLOAD_DIRS
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_used_at ON responses(used_at);
+CREATE TABLE IF NOT EXISTS site_stats (
+    site TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    tokens_saved INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# 每写入多少条检查一次淘汰
+_EVICT_EVERY = 100
+
+
+def _sha256(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(model: str, prompt: str, text: str, max_tokens: Optional[int]) -> str:
+    """缓存键：模型名 + 提示词哈希 + 输入文本哈希 + max_tokens。"""
+    return _sha256(f"{model}\x00{_sha256(prompt)}\x00{_sha256(text)}\x00{max_tokens}")
+
+
+class LLMResponseCache:
+    """SQLite 实现的 LLM 响应缓存，线程安全。"""
+
+    def __init__(self, db_path: Path, ttl_seconds: float, max_entries: int) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _count(self, site: str, column: str, tokens: int = 0) -> None:
+        self._conn.execute(
+            f"INSERT INTO site_stats(site, {column}, tokens_saved) VALUES (?, 1, ?) "
+            f"ON CONFLICT(site) DO UPDATE SET {column} = {column} + 1, tokens_saved = tokens_saved + excluded.tokens_saved",
+            (site, tokens),
+        )
+
+    def get(self, key: str, site: str) -> Optional[str]:
+        """命中返回缓存内容（并记入命中与节省的 token），未命中/已过期返回 None。"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, tokens FROM responses WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self._count(site, "misses")
+                return None
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+            self._count(site, "hits", tokens=row[1])
+            return row[0]
+
+    def put(self, key: str, site: str, model: str, content: str, tokens: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO responses(key, site, model, content, tokens, created_at, used_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET content = excluded.content, tokens = excluded.tokens, "
+                "created_at = excluded.created_at, used_at = excluded.used_at",
+                (key, site, model, content, tokens, now, now),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def evict(self) -> None:
+        with self._lock:
+            self._evict(time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT site, hits, misses, tokens_saved FROM site_stats ORDER BY site").fetchall()
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        def ratio(hits: int, misses: int) -> float:
+            return round(hits / (hits + misses), 3) if hits + misses else 0.0
+
+        sites = {
+            site: {"hits": h, "misses": m, "hit_ratio": ratio(h, m), "tokens_saved": t}
+            for site, h, m, t in rows
+        }
+        hits = sum(v["hits"] for v in sites.values())
+        misses = sum(v["misses"] for v in sites.values())
+        return {
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": ratio(hits, misses),
+            "tokens_saved": sum(v["tokens_saved"] for v in sites.values()),
+            "sites": sites,
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """进程内共享的 LLM 响应缓存；LLM_CACHE_ENABLED=0 时返回 None。"""
+    global _cache
+    if os.getenv("LLM_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            db_path = os.getenv("LLM_CACHE_DB") or str(UPLOAD_DIRS["processing"].parent / "llm_cache.sqlite3")
+            _cache = LLMResponseCache(
+                Path(db_path),
+                ttl_seconds=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000")),
+            )
+        return _cache
@@ -0,0 +1,157 @@
+"""
+LLM 全局限流与自适应并发
+
+watcher 多个工作线程同时解析简历，每份简历会发起多次 LLM 调用，突发请求容易直接撞上服务商限流。
+所有 LLMClient.extract 调用在发请求前经过进程内共享的 LLMRateLimiter：
+- 令牌桶：每分钟请求数 LLM_RPM、每分钟 token 数 LLM_TPM（按提示词长度 + max_tokens 预估，
+  请求完成后按实际 usage 修正）
+- 优先级排队：数值越小越优先，同优先级先到先得
+- AIMD 并发：成功且延迟低于 LLM_LATENCY_TARGET 时并发上限 +1/limit（约每轮 +1）；
+  收到 429 时减半并按 Retry-After 暂停放行，延迟超标时乘以 0.9
+  并发上限介于 LLM_MIN_CONCURRENCY 与 LLM_MAX_CONCURRENCY 之间
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class _Bucket:
+    """按每分钟速率匀速补充的令牌桶，容量为一分钟的配额。"""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = max(1.0, per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """距离桶内令牌达到 amount 还需等待的秒数。"""
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+
+class LLMRateLimiter:
+    """请求/ token 双令牌桶 + 优先级队列 + AIMD 并发上限，线程安全。"""
+
+    def __init__(self, rpm: float, tpm: float, max_concurrency: int, min_concurrency: int = 1,
+                 latency_target: float = 20.0) -> None:
+        self.requests = _Bucket(rpm)
+        self.tokens = _Bucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.latency_target = latency_target
+        self.limit = float(self.max_concurrency)
+        self.inflight = 0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._throttled = 0
+        self._granted = 0
+        self._wait_seconds = 0.0
+
+    def acquire(self, tokens: int, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None) -> bool:
+        """阻塞直到获得一个并发名额与足够的请求/ token 配额；超时返回 False。"""
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+                    wait: Optional[float] = None
+                    # 只有队首可以放行，保证优先级与先后顺序
+                    if self._waiters[0] == entry and self.inflight < int(self.limit):
+                        wait = max(
+                            self._paused_until - now,
+                            self.requests.wait_for(1),
+                            self.tokens.wait_for(tokens),
+                        )
+                        if wait <= 0:
+                            heapq.heappop(self._waiters)
+                            self.requests.level -= 1
+                            self.tokens.level -= tokens
+                            self.inflight += 1
+                            self._granted += 1
+                            self._wait_seconds += now - start
+                            self._cond.notify_all()
+                            return True
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._waiters.remove(entry)
+                            heapq.heapify(self._waiters)
+                            self._cond.notify_all()
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                raise
+
+    def release(self, reserved_tokens: int, used_tokens: Optional[int], latency: float,
+                throttled: bool = False, retry_after: Optional[float] = None) -> None:
+        """归还并发名额；used_tokens 为实际消耗（None 表示按预估计），并据结果调整并发上限。"""
+        with self._cond:
+            self.inflight = max(0, self.inflight - 1)
+            if used_tokens is not None:
+                self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved_tokens - used_tokens)
+            if throttled:
+                self._throttled += 1
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            elif latency > self.latency_target:
+                self.limit = max(float(self.min_concurrency), self.limit * 0.9)
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "inflight": self.inflight,
+                "waiting": len(self._waiters),
+                "granted": self._granted,
+                "throttled": self._throttled,
+                "avg_wait_seconds": round(self._wait_seconds / self._granted, 3) if self._granted else 0.0,
+            }
+
+
+_limiter: Optional[LLMRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_llm_limiter() -> LLMRateLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = LLMRateLimiter(
+                rpm=float(os.getenv("LLM_RPM", "500")),
+                tpm=float(os.getenv("LLM_TPM", "200000")),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+                min_concurrency=int(os.getenv("LLM_MIN_CONCURRENCY", "1")),
+                latency_target=float(os.getenv("LLM_LATENCY_TARGET", "20")),
+            )
+        return _limiter
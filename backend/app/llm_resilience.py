@@ -0,0 +1,249 @@
+"""
+LLM 调用的截止时间、对冲请求与熔断
+
+服务商卡住时，没有上限的请求会一直占着 watcher 工作线程，少数慢请求决定了整体吞吐：
+- 截止时间：每次 extract 的总耗时（限流排队 + 各次重试 + 退避）不超过 LLM_DEADLINE 秒，
+  单次请求的超时取 min(timeout, 剩余时间)；请求在独立线程中发出，调用方到期即返回，不会被挂起的连接卡住
+- 对冲请求：按模型记录最近成功请求的延迟，样本数达到 LLM_HEDGE_MIN_SAMPLES 后，
+  请求超过 p95（不低于 LLM_HEDGE_MIN_DELAY 秒）仍未返回时再发一份相同请求，取先成功者；
+  对冲请求不排队，限流器没有空闲名额或熔断器未闭合时不发。LLM_HEDGE_ENABLED=0 关闭
+- 熔断：同一服务商连续 LLM_BREAKER_FAILURES 次请求失败（超时、网络错误、5xx）后打开，
+  LLM_BREAKER_COOLDOWN 秒内所有调用直接返回 None，parse_resume 改走规则路径；
+  冷却结束后放行一个探测请求，成功则闭合，失败则重新打开
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+logger = logging.getLogger("llm")
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，未发出请求。"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """本次调用超过截止时间。"""
+
+
+class CircuitBreaker:
+    """连续失败计数熔断器（closed -> open -> half_open -> closed），线程安全。"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self._opened = 0
+        self._rejected = 0
+
+    def allow(self) -> bool:
+        """是否放行一次请求；半开状态下每个冷却周期只放行一个探测请求。"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probe_at = 0.0
+            # 探测请求丢失（如排队超时未发出）时，下一个冷却周期再放行一个
+            if self.state == self.HALF_OPEN and now - self._probe_at >= self.cooldown:
+                self._probe_at = now
+                return True
+            self._rejected += 1
+            return False
+
+    def is_open(self) -> bool:
+        """熔断中且尚未到探测时间（不改变状态）。"""
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.cooldown
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self.state != self.CLOSED:
+                logger.info(f"[breaker] {self.name} 探测成功，恢复调用")
+                self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._opened += 1
+                logger.warning(
+                    f"[breaker] {self.name} 连续失败 {self._failures} 次，熔断 {self.cooldown:g}s，期间走规则路径"
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "opened": self._opened,
+                "rejected": self._rejected,
+            }
+
+
+class LatencyTracker:
+    """最近成功请求的延迟窗口，用于计算对冲阈值（p95）。"""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _HedgeStats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+
+_hedge_stats = _HedgeStats()
+
+
+def hedged_call(
+    send: Callable[[float], Any],
+    deadline: float,
+    hedge_after: Optional[float],
+    try_hedge: Callable[[], bool],
+    executor: ThreadPoolExecutor,
+) -> Any:
+    """在 executor 中发出请求 send(单次超时)，最迟在 deadline（monotonic）返回。
+
+    hedge_after 秒后仍未返回且 try_hedge() 为真时发出一份对冲请求，返回先成功的结果；
+    全部失败时抛出最后一个异常，到期仍无结果时抛出 DeadlineExceeded（在途请求在后台自行结束）。
+    """
+    started = time.monotonic()
+    primary = executor.submit(send, max(0.0, deadline - started))
+    pending = {primary}
+    hedged = hedge_after is None
+    last_exc: Optional[BaseException] = None
+    while pending:
+        now = time.monotonic()
+        remaining = deadline - now
+        if remaining <= 0:
+            with _hedge_stats.lock:
+                _hedge_stats.deadline_exceeded += 1
+            raise DeadlineExceeded(f"LLM 请求超过截止时间（{deadline - started:.1f}s）")
+        timeout = remaining if hedged else min(remaining, max(0.0, started + hedge_after - now))
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in done:
+            if fut.exception() is None:
+                if fut is not primary:
+                    with _hedge_stats.lock:
+                        _hedge_stats.hedge_wins += 1
+                return fut.result()
+            last_exc = fut.exception()
+        if not hedged and pending and time.monotonic() - started >= hedge_after:
+            hedged = True
+            if try_hedge():
+                with _hedge_stats.lock:
+                    _hedge_stats.hedged += 1
+                logger.info(f"[hedge] 请求超过 {hedge_after:.2f}s 未返回，发出对冲请求")
+                pending.add(executor.submit(send, max(0.0, deadline - time.monotonic())))
+    assert last_exc is not None
+    raise last_exc
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[str, LatencyTracker] = {}
+_registry_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    with _registry_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "30")),
+            )
+        return breaker
+
+
+def get_latency_tracker(model: str) -> LatencyTracker:
+    with _registry_lock:
+        tracker = _latencies.get(model)
+        if tracker is None:
+            tracker = _latencies[model] = LatencyTracker()
+        return tracker
+
+
+def get_request_executor() -> ThreadPoolExecutor:
+    """发出 LLM 请求的线程池；并发实际由限流器控制，这里只需留出对冲与到期后仍在途请求的余量。"""
+    global _executor
+    with _registry_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(4, int(os.getenv("LLM_MAX_CONCURRENCY", "16")) * 2),
+                thread_name_prefix="llm-request",
+            )
+        return _executor
+
+
+def call_deadline(seconds: Optional[float] = None) -> float:
+    """本次调用的截止时刻（monotonic）；seconds 缺省使用 LLM_DEADLINE。"""
+    if seconds is None:
+        seconds = float(os.getenv("LLM_DEADLINE", "90"))
+    return time.monotonic() + seconds
+
+
+def hedge_delay(model: str) -> Optional[float]:
+    """该模型的对冲等待时间（p95）；关闭对冲或样本不足时返回 None。"""
+    if os.getenv("LLM_HEDGE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    p95 = get_latency_tracker(model).percentile(0.95, int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")))
+    if p95 is None:
+        return None
+    return max(float(os.getenv("LLM_HEDGE_MIN_DELAY", "2")), p95)
+
+
+def resilience_stats() -> Dict[str, Any]:
+    with _registry_lock:
+        breakers = dict(_breakers)
+        latencies = dict(_latencies)
+    with _hedge_stats.lock:
+        out: Dict[str, Any] = {
+            "hedged": _hedge_stats.hedged,
+            "hedge_wins": _hedge_stats.hedge_wins,
+            "deadline_exceeded": _hedge_stats.deadline_exceeded,
+        }
+    out["breakers"] = {name: b.stats() for name, b in breakers.items()}
+    p95 = {}
+    for model, tracker in latencies.items():
+        value = tracker.percentile(0.95)
+        if value is not None:
+            p95[model] = round(value, 3)
+    out["p95_latency"] = p95
+    return out
@@ -4,20 +4,28 @@
 import os
 import time
 import uuid
+import hashlib
 import logging
 from typing import List, Literal
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Query, Path, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from supabase import Client, create_client
 
+from .aho_corasick import compile_patterns
 from .config import get_app_settings
+from .db import get_supabase_client
 from . import UPLOAD_DIRS, build_r2_public_url
-from .watcher import start_watcher_in_background
-import boto3
-from botocore.client import Config as _BotoConfig
-import certifi
+from .dedup import content_sha256_supported, get_fingerprint_store
+from .jobqueue import get_job_queue
+from .llm import llm_pool_stats
+from .llm_batch import micro_batch_stats
+from .parser import experience_parse_stats
+from .llm_cache import get_llm_cache
+from .model_router import routing_stats
+from .storage import get_r2_client
+from .tag_dictionary import get_tag_dictionary, tag_dictionary_stats
+from .watcher import PART_SUFFIX, get_pipeline_stats, notify_resume_file, start_watcher_in_background, stop_puller
 
 # 确保环境变量加载
 load_dotenv()
@@ -40,12 +48,6 @@ app.add_middleware(
 )
 
 
-def get_supabase_client() -> Client:
-    """获取 Supabase 客户端实例"""
-    settings = get_app_settings()
-    return create_client(settings.supabase_url, settings.supabase_key)
-
-
 # ===== Pydantic 模型定义 =====
 from pydantic import BaseModel
 
@@ -86,6 +88,8 @@ async def startup_event():
     try:
         client = get_supabase_client()
         print("✅ 数据库连接成功")
+        # 检测 content_sha256 列（未执行迁移时记录警告并停用按库去重，不影响上传）
+        content_sha256_supported()
     except Exception as e:
         print(f"❌ 数据库连接失败: {e}")
 
@@ -116,6 +120,22 @@ def health() -> dict:
     return info
 
 
+@app.get("/stats")
+def stats() -> dict:
+    """处理管线统计：内容去重节省的 OCR 时间与 LLM token 等。"""
+    cache = get_llm_cache()
+    return {
+        "dedup": get_fingerprint_store().stats(),
+        "pipeline": get_pipeline_stats(),
+        "llm": llm_pool_stats(),
+        "llm_cache": cache.stats() if cache is not None else None,
+        "llm_batch": micro_batch_stats(),
+        "experience": experience_parse_stats(),
+        "routing": routing_stats(),
+        "tag_dictionary": tag_dictionary_stats(),
+    }
+
+
 @app.post("/upload")
 async def upload_resumes(
     uploaded_by: str = Form(..., description="上传者姓名"),
@@ -134,13 +154,16 @@ async def upload_resumes(
         target = UPLOAD_DIRS["processing"] / safe_name
         base, ext = os.path.splitext(target.name)
         counter = 1
-        while target.exists():
+        while target.exists() or target.with_name(target.name + PART_SUFFIX).exists():
             target = UPLOAD_DIRS["processing"] / f"{base}_{counter}{ext}"
             counter += 1
+        # 先写临时文件，入库成功后再原子重命名为正式文件名（watcher 不会处理写到一半的文件）
+        part = target.with_name(target.name + PART_SUFFIX)
         try:
-            with open(target, "wb") as f:
+            with open(part, "wb") as f:
                 content = await file.read()
                 f.write(content)
+            content_sha256 = hashlib.sha256(content).hexdigest()
             logger.info(f"[upload] 保存文件到本地 processing: {target}")
         except Exception as e:
             logger.error(f"[upload] 保存文件失败: {file.filename}: {e}")
@@ -155,6 +178,8 @@ async def upload_resumes(
             "file_path": str(target),
             "status": "待处理",
         }
+        if content_sha256_supported():
+            data["content_sha256"] = content_sha256
 
         try:
             logger.info(f"[upload] 向 resume_files 写入记录: file_name={data['file_name']}, uploaded_by={data['uploaded_by']}")
@@ -162,18 +187,21 @@ async def upload_resumes(
             if getattr(res, "data", None):
                 rid = res.data[0]["id"]
                 logger.info(f"[upload] 写入 resume_files 成功: id={rid}, path={data['file_path']}")
+                os.replace(part, target)
+                # 直接入队（携带记录 id），无需等待目录扫描
+                get_job_queue().enqueue(target, resume_file_id=rid)
                 results.append({"filename": file.filename, "status": "success", "id": rid})
             else:
                 logger.error(f"[upload] 写入 resume_files 失败（无返回 data）: {file.filename}")
                 try:
-                    os.remove(target)
+                    os.remove(part)
                 except Exception:
                     pass
                 results.append({"filename": file.filename, "status": "failed", "error": "插入失败"})
         except Exception as e:
             logger.error(f"[upload] 写入 resume_files 异常: {file.filename}: {e}")
             try:
-                os.remove(target)
+                os.remove(part)
             except Exception:
                 pass
             results.append({"filename": file.filename, "status": "failed", "error": str(e)})
@@ -198,20 +226,7 @@ def presign_upload(req: PresignRequest) -> PresignResponse:
     if not (settings.r2_account_id and settings.r2_access_key_id and settings.r2_secret_access_key and settings.r2_bucket):
         raise HTTPException(status_code=400, detail="未配置 R2，无法生成预签名URL")
 
-    endpoint = f"https://{settings.r2_account_id}.r2.cloudflarestorage.com"
-    s3 = boto3.client(
-        "s3",
-        endpoint_url=endpoint,
-        aws_access_key_id=settings.r2_access_key_id,
-        aws_secret_access_key=settings.r2_secret_access_key,
-        region_name="auto",
-        config=_BotoConfig(
-            signature_version="s3v4",
-            s3={"addressing_style": "path"},
-            retries={"max_attempts": 2, "mode": "standard"},
-        ),
-        verify=certifi.where(),
-    )
+    s3 = get_r2_client()
 
     safe_name = req.file_name.replace("/", "_").replace("\\", "_")
     uniq = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
@@ -272,6 +287,8 @@ def upload_complete(body: UploadCompleteRequest) -> dict:
         raise HTTPException(status_code=500, detail=str(exc))
     if not data:
         raise HTTPException(status_code=500, detail="写入数据库失败")
+    # 直接通知拉取任务，无需等待周期查询
+    notify_resume_file(data[0])
     return {"item": data[0]}
 
 
@@ -292,22 +309,19 @@ def _on_shutdown():
         if _observer is not None:
             _observer.stop()
             _observer.join(timeout=5)
+        stop_puller(timeout=10)
     finally:
         _observer = None
 
 
 @app.get("/tags")
 def list_tags(category: str | None = Query(None, description="标签类别筛选"), limit: int = Query(100, ge=1, le=500)) -> dict:
-    """获取标签列表"""
-    client = get_supabase_client()
-    query = client.table("tags").select("*").order("tag_name")
-    if category:
-        query = query.eq("category", category)
+    """获取标签列表（读取与解析器共用的标签字典缓存，先比对版本保证新写入的标签可见）"""
     try:
-        res = query.limit(limit).execute()
+        tags = get_tag_dictionary(force_check=True)
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc))
-    return {"items": getattr(res, "data", [])}
+    return {"items": tags.list_rows(category, limit)}
 
 
 @app.get("/keywords")
@@ -462,6 +476,7 @@ def match_resumes_for_position(
     # 3. 简单匹配：统计关键词命中
     required_keywords = position.get("required_keywords") or []
     match_type = position.get("match_type", "any")
+    keyword_matcher = compile_patterns(required_keywords)
 
     def compute_match(resume: dict) -> dict:
         """计算单个简历的匹配结果"""
@@ -476,13 +491,11 @@ def match_resumes_for_position(
             vals = resume.get(key) or []
             if isinstance(vals, list):
                 parts.extend([str(x) for x in vals])
-        blob = "\n".join(parts).lower()
+        blob = "\n".join(parts)
 
-        # 统计命中
-        matched_keywords = []
-        for kw in required_keywords:
-            if kw.lower() in blob:
-                matched_keywords.append(kw)
+        # 统计命中：所有关键词一次扫描
+        hits = keyword_matcher.matched(blob)
+        matched_keywords = [kw for kw in required_keywords if kw in hits]
 
         hit_count = len(matched_keywords)
         if match_type == "all" and hit_count < len(required_keywords):
@@ -0,0 +1,216 @@
+"""
+常驻 MinerU 进程池
+
+每个 worker 进程只加载一次 MinerU（布局/OCR 模型常驻内存），之后通过 Pipe 逐个接收文档。
+- 健康检查：取用前确认进程存活；空闲较久的 worker 先 ping 一次
+- 回收：单个 worker 处理满 MINERU_POOL_MAX_DOCS 份文档后重启，限制内存增长
+- 超时/崩溃：终止并重建该 worker，本次返回失败，由 MinerUProcessor 回退到 CLI
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+logger = logging.getLogger("mineru_pool")
+
+_PING_TIMEOUT = 10.0
+_PING_IDLE_SECONDS = 60.0
+
+
+def _worker_main(conn, output_root: str, device: str, backend: str) -> None:
+    """子进程入口：加载一次 MinerU，然后循环处理文档。"""
+    os.environ["MINERU_DEVICE"] = device
+    os.environ["MINERU_DEVICE_MODE"] = device
+    os.environ.setdefault("MINERU_VIRTUAL_VRAM_SIZE", "8")
+    try:
+        from mineru.cli.common import do_parse, read_fn  # type: ignore
+    except Exception as e:
+        conn.send(("error", f"加载 MinerU 失败: {e}"))
+        return
+    conn.send(("ready", None))
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return  # 父进程已退出
+        kind = msg[0]
+        if kind == "stop":
+            return
+        if kind == "ping":
+            conn.send(("pong", None))
+            continue
+        pdf_path = Path(msg[1])
+        try:
+            pdf_bytes = read_fn(pdf_path)
+            do_parse(output_root, [pdf_path.stem], [pdf_bytes], ["ch"], backend=backend, parse_method="auto")
+            conn.send(("ok", None))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class _Worker:
+    def __init__(self, ctx, output_root: Path, device: str, backend: str) -> None:
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, str(output_root), device, backend),
+            name="mineru-worker",
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.docs = 0
+        self.last_used = time.monotonic()
+
+    def wait_ready(self, timeout: float) -> bool:
+        if self.ready:
+            return True
+        try:
+            if not self.conn.poll(timeout):
+                return False
+            status, err = self.conn.recv()
+        except (EOFError, OSError):
+            logger.error("[pool] worker 启动过程中退出")
+            return False
+        if status != "ready":
+            logger.error(f"[pool] worker 启动失败: {err}")
+            return False
+        self.ready = True
+        return True
+
+    def is_healthy(self) -> bool:
+        if not self.process.is_alive():
+            return False
+        if time.monotonic() - self.last_used < _PING_IDLE_SECONDS:
+            return True
+        try:
+            self.conn.send(("ping",))
+            return self.conn.poll(_PING_TIMEOUT) and self.conn.recv()[0] == "pong"
+        except (EOFError, OSError):
+            return False
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(("stop",))
+        except (EOFError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        self.conn.close()
+
+
+class MinerUWorkerPool:
+    """固定大小的 MinerU 常驻进程池，线程安全（watcher 多线程共享）。"""
+
+    def __init__(
+        self,
+        size: int,
+        output_root: Path,
+        *,
+        device: str,
+        backend: str,
+        max_docs: int = 50,
+        timeout: float = 300.0,
+        startup_timeout: float = 600.0,
+    ) -> None:
+        self.size = max(1, size)
+        self.output_root = output_root
+        self.device = device
+        self.backend = backend
+        self.max_docs = max(1, max_docs)
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._disabled = False
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+
+    @property
+    def available(self) -> bool:
+        return not self._disabled
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self.output_root, self.device, self.backend)
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.stop()
+        return self._spawn()
+
+    def process(self, pdf_path: Path) -> bool:
+        """交给空闲 worker 处理，成功返回 True（输出写入 output_root/<stem>）。"""
+        if self._disabled:
+            return False
+        worker = self._idle.get()
+        try:
+            if not worker.wait_ready(self.startup_timeout):
+                # MinerU 无法以库方式加载（未安装或初始化失败），整体停用进程池
+                self._disabled = True
+                logger.error("[pool] MinerU worker 无法就绪，停用进程池，回退 CLI")
+                return False
+            if not worker.is_healthy():
+                logger.warning("[pool] worker 健康检查失败，重建")
+                worker = self._replace(worker)
+                if not worker.wait_ready(self.startup_timeout):
+                    return False
+            worker.conn.send(("parse", str(pdf_path)))
+            if not worker.conn.poll(self.timeout):
+                logger.error(f"[pool] MinerU 处理超时，重建 worker: {pdf_path}")
+                worker = self._replace(worker)
+                return False
+            status, err = worker.conn.recv()
+            worker.docs += 1
+            worker.last_used = time.monotonic()
+            if worker.docs >= self.max_docs:
+                logger.info(f"[pool] worker 已处理 {worker.docs} 份文档，回收重启")
+                worker = self._replace(worker)
+            if status != "ok":
+                logger.error(f"[pool] MinerU 处理失败: {pdf_path}, 错误: {err}")
+                return False
+            return True
+        except (EOFError, OSError) as e:
+            logger.error(f"[pool] worker 通信异常，重建: {e}")
+            worker = self._replace(worker)
+            return False
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        self._disabled = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+
+_pool: Optional[MinerUWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_mineru_pool(output_root: Path) -> MinerUWorkerPool:
+    """进程内共享的 MinerU 进程池（按环境变量配置，首次调用时启动）。"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = MinerUWorkerPool(
+                size=int(os.getenv("MINERU_POOL_SIZE", "2")),
+                output_root=output_root,
+                device=os.getenv("MINERU_DEVICE", "cuda:0").strip(),
+                backend=os.getenv("MINERU_BACKEND", "pipeline"),
+                max_docs=int(os.getenv("MINERU_POOL_MAX_DOCS", "50")),
+                timeout=float(os.getenv("MINERU_TIMEOUT", "300")),
+            )
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,133 @@
+"""
+按简历复杂度选择模型
+
+parse_resume 开始时为每份文档打分，并把路由结果放入上下文（ContextVar，run_graph 的各步骤会继承）：
+- 长度：字符数，LLM_ROUTE_LONG_CHARS（默认 12000）记满分
+- 中英混排：拉丁字母与汉字各占一半时最难
+- 表格密度：MinerU 输出中 <table> 内文本占比
+- 段落数：未识别出任何段落（无结构）记满分，段落越多越复杂
+得分低于 LLM_ROUTE_SIMPLE_MAX 走 simple，高于 LLM_ROUTE_COMPLEX_MIN 走 complex，其余 standard：
+- simple：主抽取用 LLM_MODEL_SIMPLE（默认 gpt-4o-mini）
+- standard：主抽取用 OPENAI_MODEL
+- complex：主抽取用 LLM_MODEL_COMPLEX（默认 OPENAI_MODEL），分类/标签/经历等辅助调用也升级到该模型
+其余情况辅助调用使用 LLM_MODEL_SMALL（默认 gpt-4o-mini）。LLM_ROUTING=0 关闭路由，行为与原先一致。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+from .sections import segment_resume
+
+
+logger = logging.getLogger("model_router")
+
+_TABLE_RE = re.compile(r"<table[\s\S]*?</table>", re.IGNORECASE)
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+_LATIN_RE = re.compile(r"[A-Za-z]")
+
+_WEIGHTS = {"length": 0.4, "language_mix": 0.2, "table_density": 0.25, "sections": 0.15}
+
+
+@dataclass
+class RouteDecision:
+    tier: str
+    model: str
+    aux_model: str
+    score: float
+    features: Dict[str, float] = field(default_factory=dict)
+
+
+def small_model() -> str:
+    return os.getenv("LLM_MODEL_SMALL", "gpt-4o-mini")
+
+
+def default_model() -> str:
+    return os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+
+def score_document(text: str) -> Dict[str, float]:
+    """返回各项复杂度特征（均归一到 0~1）与加权总分 score。"""
+    text = text or ""
+    n = max(1, len(text))
+    cjk = len(_CJK_RE.findall(text))
+    latin = len(_LATIN_RE.findall(text))
+    latin_ratio = latin / (cjk + latin) if cjk + latin else 0.0
+    table_chars = sum(len(m) for m in _TABLE_RE.findall(text))
+    sections = segment_resume(text)
+    section_count = len([s for s in sections.sections if s.kind != "header"])
+    features = {
+        "length": min(1.0, len(text) / float(os.getenv("LLM_ROUTE_LONG_CHARS", "12000"))),
+        "language_mix": 1.0 - abs(2 * latin_ratio - 1.0) if cjk + latin else 0.0,
+        "table_density": min(1.0, 2.0 * table_chars / n),
+        "sections": 1.0 if not sections.kinds else min(1.0, max(0.0, (section_count - 4) / 6.0)),
+    }
+    features["score"] = round(sum(features[k] * w for k, w in _WEIGHTS.items()), 3)
+    return {k: round(v, 3) for k, v in features.items()}
+
+
+def route_document(text: str) -> RouteDecision:
+    features = score_document(text)
+    score = features.pop("score")
+    if score < float(os.getenv("LLM_ROUTE_SIMPLE_MAX", "0.25")):
+        tier, model, aux = "simple", os.getenv("LLM_MODEL_SIMPLE", "gpt-4o-mini"), small_model()
+    elif score > float(os.getenv("LLM_ROUTE_COMPLEX_MIN", "0.6")):
+        complex_model = os.getenv("LLM_MODEL_COMPLEX") or default_model()
+        tier, model, aux = "complex", complex_model, complex_model
+    else:
+        tier, model, aux = "standard", default_model(), small_model()
+    return RouteDecision(tier=tier, model=model, aux_model=aux, score=score, features=features)
+
+
+_current: ContextVar[Optional[RouteDecision]] = ContextVar("llm_route", default=None)
+_tier_counts: Counter = Counter()
+_tier_lock = threading.Lock()
+
+
+def routing_enabled() -> bool:
+    return os.getenv("LLM_ROUTING", "1").lower() not in ("0", "false", "no")
+
+
+@contextmanager
+def routed(text: str, label: str = "") -> Iterator[Optional[RouteDecision]]:
+    """在 with 块内按文档复杂度路由模型；关闭路由时产出 None。"""
+    if not routing_enabled():
+        yield None
+        return
+    decision = route_document(text)
+    with _tier_lock:
+        _tier_counts[decision.tier] += 1
+    logger.info(
+        f"[router] {label} tier={decision.tier} model={decision.model} aux={decision.aux_model} "
+        f"score={decision.score} features={decision.features}"
+    )
+    token = _current.set(decision)
+    try:
+        yield decision
+    finally:
+        _current.reset(token)
+
+
+def main_model() -> str:
+    """主抽取（合并抽取、通用字段、学校）使用的模型。"""
+    decision = _current.get()
+    return decision.model if decision is not None else default_model()
+
+
+def aux_model() -> str:
+    """与文档相关的辅助调用（分类、标签、结构化经历）使用的模型。"""
+    decision = _current.get()
+    return decision.aux_model if decision is not None else small_model()
+
+
+def routing_stats() -> Dict[str, int]:
+    with _tier_lock:
+        return dict(_tier_counts)
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import json
 import logging
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import os
 from typing import Optional
 
 from . import UPLOAD_DIRS
+from .mineru_pool import get_mineru_pool
+from .sections import mark_headings
 
 
 logger = logging.getLogger("ocr_processor")
@@ -15,12 +19,26 @@ if not logger.handlers:
 
 
 class MinerUProcessor:
-    """使用 MinerU 进行 OCR 的处理器（基础环境直接调用）。"""
+    """使用 MinerU 进行 OCR 的处理器。
+
+    MINERU_MODE=cli（默认）每份文档启动一次 mineru 命令行；
+    MINERU_MODE=pool 使用常驻进程池（模型只加载一次），失败时回退到命令行。
+    """
 
     def __init__(self) -> None:
         # 永久输出目录
         self.output_root = UPLOAD_DIRS["ocr_output"]
         self.output_root.mkdir(parents=True, exist_ok=True)
+        self.mode = os.getenv("MINERU_MODE", "cli").strip().lower()
+        self.timeout = float(os.getenv("MINERU_TIMEOUT", "300"))
+        self.pool = get_mineru_pool(self.output_root) if self.mode == "pool" else None
+
+    def _process_via_pool(self, pdf_path: Path) -> Optional[str]:
+        if self.pool is None or not self.pool.available:
+            return None
+        if not self.pool.process(pdf_path):
+            return None
+        return self._extract_markdown_content(self.output_root / pdf_path.stem)
 
     def process_pdf(self, pdf_path: Path) -> Optional[str]:
         try:
@@ -29,6 +47,13 @@ class MinerUProcessor:
                 logger.error(f"文件不存在: {pdf_path}")
                 return None
 
+            if self.pool is not None:
+                markdown_text = self._process_via_pool(pdf_path)
+                if markdown_text:
+                    logger.info(f"进程池提取 markdown 成功，长度: {len(markdown_text)}")
+                    return markdown_text
+                logger.warning(f"进程池处理失败，回退 MinerU CLI: {pdf_path}")
+
             if not self.is_mineru_available():
                 logger.warning("MinerU 不可用")
                 return None
@@ -57,7 +82,7 @@ class MinerUProcessor:
                 check=True,
                 capture_output=True,
                 text=True,
-                timeout=300,
+                timeout=self.timeout,
                 shell=False,  # 使用直接执行，避免 Windows 下带空格路径被拆分
                 env=env_vars,
             )
@@ -92,6 +117,7 @@ class MinerUProcessor:
             for md in markdown_files:
                 try:
                     text = md.read_text(encoding="utf-8", errors="ignore")
+                    text = self._mark_layout_headings(md, text)
                     if text.strip():
                         parts.append(text)
                 except Exception as e:
@@ -101,6 +127,19 @@ class MinerUProcessor:
             logger.error(f"提取 markdown 失败: {e}")
             return None
 
+    @staticmethod
+    def _mark_layout_headings(md: Path, text: str) -> str:
+        """用同目录的 <stem>_content_list.json（text_level 标题）补全 markdown 标题标记，供简历分段使用。"""
+        content_list = md.with_name(f"{md.stem}_content_list.json")
+        if not content_list.exists():
+            return text
+        try:
+            items = json.loads(content_list.read_text(encoding="utf-8", errors="ignore"))
+        except Exception as e:
+            logger.debug(f"读取 content_list 失败 {content_list}: {e}")
+            return text
+        return mark_headings(text, items) if isinstance(items, list) else text
+
     # 不再提供回退提取，记录日志后返回 None 即可（上层会标记处理失败）
 
     def cleanup_temp_files(self, pdf_path: Path) -> None:
@@ -123,6 +162,12 @@ class MinerUProcessor:
                 logger.error(f"批次目录不存在: {batch_dir}")
                 return {}
 
+            # 进程池模式下模型已常驻，无需凑批，直接并行分发给各 worker
+            if self.pool is not None and self.pool.available:
+                pdfs = list(batch_dir.glob("*.pdf"))
+                with ThreadPoolExecutor(max_workers=self.pool.size) as ex:
+                    return dict(zip(pdfs, ex.map(self._process_via_pool, pdfs)))
+
             output_base_dir = self.output_root
             output_base_dir.mkdir(exist_ok=True)
 
@@ -141,12 +186,14 @@ class MinerUProcessor:
             if "MINERU_VIRTUAL_VRAM_SIZE" not in env_vars:
                 env_vars["MINERU_VIRTUAL_VRAM_SIZE"] = "8"
 
+            # 批次超时随文件数放大（单文件与 process_pdf 保持同一量级）
+            pdf_count = sum(1 for _ in batch_dir.glob("*.pdf"))
             result = subprocess.run(
                 cmd,
                 check=True,
                 capture_output=True,
                 text=True,
-                timeout=600,
+                timeout=max(600, 150 * pdf_count),
                 shell=False,
                 env=env_vars,
             )
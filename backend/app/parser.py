@@ -2,14 +2,24 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import AbstractSet, Any, Dict, List, Optional, Tuple
 from datetime import datetime, date
 
-from .llm import LLMClient
+from .aho_corasick import compile_patterns
+from .llm import LLMClient, llm_circuit_open
+from .llm_batch import batching_enabled, get_micro_batcher, indexed_input, parse_indexed_answers
+from .llm_limiter import PRIORITY_LOW
+from .model_router import aux_model, main_model, routed, small_model
 from .education import analyze_highest_education_level, classify_education_background
-from .db import get_supabase_client
+from .pipeline import run_graph
+from .sections import segment_resume
+from .tag_dictionary import TagDictionary, get_tag_dictionary
+from .tag_index import prefilter_tags
 
 
 logger = logging.getLogger("resume_parser")
@@ -220,11 +230,9 @@ SCHOOL_JSON_PROMPT = (
 
 def _windows_around_keywords(text: str, keywords: List[str], window: int = 20, max_windows: int = 200) -> List[str]:
     spans: List[tuple[int, int]] = []
-    for kw in keywords:
-        for m in re.finditer(re.escape(kw), text, flags=re.IGNORECASE):
-            a = max(0, m.start() - window)
-            b = min(len(text), m.end() + window)
-            spans.append((a, b))
+    # 所有关键词一次扫描（大小写不敏感）
+    for m in compile_patterns(keywords).iter_matches(text):
+        spans.append((max(0, m.start - window), min(len(text), m.end + window)))
     if not spans:
         return []
     # 合并重叠窗口
@@ -256,7 +264,7 @@ def _windows_around_keywords(text: str, keywords: List[str], window: int = 20, m
 
 
 def extract_schools_via_llm(text: str) -> Optional[List[str]]:
-    llm = LLMClient.from_env()
+    llm = LLMClient.from_env_with_model(main_model())
     if not llm:
         return None
 
@@ -265,20 +273,22 @@ def extract_schools_via_llm(text: str) -> Optional[List[str]]:
         "大学", "学院", "学校",
         "University", "College", "Institute", "Polytechnic", "Academy", "School",
     ]
+    # 优先只投教育背景段；未识别出该段或调用失败时，再用全文关键词窗口重试一次
+    contexts: List[str] = []
+    education = segment_resume(text).text_for("education")
+    if education:
+        contexts.append(education)
     snippets = _windows_around_keywords(text, keywords, window=20)
-    if not snippets:
-        return None
-
-    # 组织成紧凑上下文，避免过长
-    context = "\n---\n".join(snippets[:200])
-    content = llm.extract(SCHOOL_JSON_PROMPT, context, max_tokens=600)
+    if snippets:
+        # 组织成紧凑上下文，避免过长
+        contexts.append("\n---\n".join(snippets[:200]))
+    content = None
+    for i, context in enumerate(contexts):
+        content = llm.extract(SCHOOL_JSON_PROMPT, context, max_tokens=600 if i == 0 else 900, cache_site="schools")
+        if content:
+            break
     if not content:
-        # 一次重试：仅投工作/项目经历相关片段
-        brief_lines = [ln for ln in entries if isinstance(ln, str)]
-        brief = "\n".join(brief_lines)[:16000]
-        content = llm.extract(schema, brief, max_tokens=900)
-        if not content:
-            return None
+        return None
     # JSON repair：去围栏、截取首尾花/方括号、去尾逗号
     fixed = _strip_code_fences(content)
     fixed = re.sub(r",\s*([\]}])", r"\1", fixed)
@@ -374,15 +384,253 @@ def _normalize_string_list(values: Any, max_items: int = 50) -> Optional[List[st
     return None
 
 
-def parse_resume(text: str, resume_file_id: Optional[int], file_name: Optional[str] = None) -> ParsedResume:
-    # 1) 先用正则抓联系方式/学历（学校交由 LLM 为主）
-    email_val = extract_first_email(text) or None
-    phone_val = extract_first_phone(text) or None
-    degree = extract_degree(text) or None
-    schools: Optional[List[str]] = None
+# ============== 合并抽取（一次/两次结构化输出调用） ==============
+# LLM_EXTRACTION_MODE（默认 legacy，合并调用需显式开启）：
+# - single：一次调用返回全部字段、学校（含中文名与海外判断）、结构化经历、分类与标签
+# - dual：拆为“基本信息/学校/分类标签”与“结构化经历”两次调用，单次输出更短
+# - legacy：逐字段多次调用的原有路径
+# 合并调用失败（未配置、模型不支持结构化输出、返回不合法）时自动回退 legacy。
+
+def _nullable(schema_type: str) -> Dict[str, Any]:
+    return {"type": [schema_type, "null"]}
+
+
+def _nullable_str_list() -> Dict[str, Any]:
+    return {"type": ["array", "null"], "items": {"type": "string"}}
+
+
+def _object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+
+_EXPERIENCE_ITEM_SCHEMA = _object({
+    "start": _nullable("string"),
+    "end": _nullable("string"),
+    "company": _nullable("string"),
+    "title_en": _nullable("string"),
+    "title": _nullable("string"),
+    "description_en": _nullable("string"),
+    "description": _nullable("string"),
+    "details_en": _nullable_str_list(),
+    "details": _nullable_str_list(),
+})
+
+_PROFILE_PROPERTIES: Dict[str, Any] = {
+    "name": _nullable("string"),
+    "education_school": {
+        "type": "array",
+        "items": _object({
+            "name": {"type": "string"},
+            "name_zh": _nullable("string"),
+            "overseas": _nullable("boolean"),
+        }),
+    },
+    "education_major": _nullable("string"),
+    "education_major_zh": _nullable("string"),
+    "skills": _nullable_str_list(),
+    "internship_experience": _nullable_str_list(),
+    "self_evaluation": _nullable("string"),
+    "other": _nullable("string"),
+    "category": {"type": ["string", "null"], "enum": ["技术类", "非技术类", None]},
+    "tags": {"type": "array", "items": {"type": "string"}},
+}
+
+_EXPERIENCE_PROPERTIES: Dict[str, Any] = {
+    "work_experience_items": {"type": "array", "items": _EXPERIENCE_ITEM_SCHEMA},
+    "project_experience_items": {"type": "array", "items": _EXPERIENCE_ITEM_SCHEMA},
+}
+
+_PROFILE_RULES = (
+    "基本信息规则：\n"
+    "- name 为候选人姓名；无法确定填 null，不要杜撰。\n"
+    "- education_school：文中出现的每所学校一项；name 为学校主名（原文，不含括号注释/排名/QS 文案），去重；"
+    "name_zh 为英文校名的简体中文译名（中文校名填 null）；overseas 表示是否海外院校（国内为 false，无法判断为 null）。\n"
+    "- education_major 为专业（原文）；若为英文，education_major_zh 填简体中文译名，否则填 null。\n"
+    "- skills 为去重后的技能关键词数组（如 Java、Python、SpringBoot、微服务），不含句号或多余符号。\n"
+    "- internship_experience 为实习经历数组，每个元素为一段完整条目（时间范围、公司、职位、职责要点）。\n"
+    "- category 判断简历属于 '技术类' 还是 '非技术类'。\n"
+    "- tags 只能从下方候选标签中选择与简历相关的标签，不得新增，不要重复；无候选或无相关时返回空数组。\n"
+)
+
+_EXPERIENCE_RULES = (
+    "经历规则：\n"
+    "- work_experience_items 为工作经历，project_experience_items 为项目经历，每段经历一项。\n"
+    "- start/end 格式 'YYYY-MM'；end 为至今时填 'present'；支持 YYYY.MM / YYYY年MM月 / 英文月份等输入写法；"
+    "括号中的时间段也要抽取为 start/end，并从公司/职位中移除。\n"
+    "- company 与 title 不得包含日期或括号时间；公司名保持原文。\n"
+    "- *_en 为原文（仅当原文为英文时填写，否则 null），对应的无 _en 字段为简体中文直译。\n"
+    "- description / details 逐句保留，不要总结，不要省略；details 承载具体要点（项目符号/多行）。\n"
+)
+
+_CONSOLIDATED_HEADER = (
+    "任务：从输入的中文/英文简历文本中一次性抽取结构化信息，按给定 JSON Schema 输出。\n"
+    "通用规则：忽略 HTML 标签保留内容；不要杜撰缺失信息；专有名词（公司/学校/产品/技术等）保持原文。\n"
+)
+
+
+def _consolidated_prompt(parts: Tuple[str, ...], tag_candidates: List[str]) -> str:
+    prompt = _CONSOLIDATED_HEADER
+    if "profile" in parts:
+        prompt += _PROFILE_RULES
+        candidate_str = "\n".join(f"- {t}" for t in tag_candidates) or "（无）"
+        prompt += f"候选标签（仅可从中选择）：\n{candidate_str}\n"
+    if "experience" in parts:
+        prompt += _EXPERIENCE_RULES
+    return prompt
+
+
+def _consolidated_call(llm: LLMClient, text: str, parts: Tuple[str, ...], tag_candidates: List[str], max_tokens: int) -> Optional[Dict[str, Any]]:
+    properties: Dict[str, Any] = {}
+    if "profile" in parts:
+        properties.update(_PROFILE_PROPERTIES)
+    if "experience" in parts:
+        properties.update(_EXPERIENCE_PROPERTIES)
+    content = llm.extract(
+        _consolidated_prompt(parts, tag_candidates),
+        text,
+        max_tokens=max_tokens,
+        json_schema={"name": "resume_" + "_".join(parts), "schema": _object(properties)},
+        cache_site="consolidated",
+    )
+    if not content:
+        return None
+    obj = _extract_json_object(content)
+    if not isinstance(obj, dict) or any(k not in obj for k in properties):
+        logger.warning(f"合并抽取返回不符合 schema，回退逐字段抽取: parts={parts}")
+        return None
+    return obj
+
+
+def _experience_item_to_text(item: Dict[str, Any]) -> str:
+    """把结构化经历还原为与逐字段路径一致的文本条目（时间  公司  职位\\n描述），保留原文。"""
+    start = item.get("start")
+    end = item.get("end")
+    period = f"{start} - {end}" if start and end else (start or "")
+    head = "  ".join(x for x in [period, item.get("company"), item.get("title_en") or item.get("title")] if x)
+    details = item.get("details_en") or item.get("details") or []
+    body = item.get("description_en") or item.get("description") or ""
+    if details:
+        body = "\n".join([body] + [str(d) for d in details]) if body else "\n".join(str(d) for d in details)
+    return "\n".join(x for x in [head, body] if x).strip()
+
+
+def extract_consolidated(text: str, tag_candidates: List[str], mode: str) -> Optional[Dict[str, Any]]:
+    """合并抽取：mode 为 single（一次调用）或 dual（两次调用）。任一调用失败返回 None，由调用方回退。"""
+    llm = LLMClient.from_env_with_model(main_model())
+    if not llm:
+        return None
+    if mode == "dual":
+        # 两次调用互不依赖，并发执行；各自只投相关段落（未识别出时回退全文）
+        sections = segment_resume(text)
+        profile_text = sections.text_for(
+            "header", "summary", "education", "skills", "internship", "other", digest=("work", "projects")
+        ) or text
+        experience_text = sections.text_for("work", "projects") or text
+        r = run_graph(
+            {
+                "profile": (lambda: _consolidated_call(llm, profile_text, ("profile",), tag_candidates, max_tokens=1500), ()),
+                "experience": (lambda: _consolidated_call(llm, experience_text, ("experience",), tag_candidates, max_tokens=3000), ()),
+            },
+            _get_stage_executor(),
+        )
+        if r["profile"] is None or r["experience"] is None:
+            return None
+        return {**r["profile"], **r["experience"]}
+    return _consolidated_call(llm, text, ("profile", "experience"), tag_candidates, max_tokens=4000)
+
+
+def _merge_bilingual(name: str, zh: Optional[str]) -> str:
+    zh = (zh or "").strip()
+    if zh and _is_mostly_english(name) and zh != name:
+        return f"{name} {zh}"
+    return name
+
+
+def _education_tiers(school_entries: List[Dict[str, Any]]) -> Tuple[Optional[str], Optional[List[str]]]:
+    """基于已抽取的学校集合进行分类，返回 (最高层次, 多值层次)。"""
+    if not school_entries:
+        return None, None
+    cls = classify_education_background(school_entries)
+    code = (cls or {}).get("highest_education_level")
+    code_to_cn = {
+        "985": "985",
+        "211": "211",
+        "double_first_class": "双一流",
+        "overseas": "海外",
+        "regular": "普通本科",
+        "unknown": "未知",
+        None: None,
+    }
+    # 多值并存
+    levels = (cls or {}).get("education_levels") or []
+    return code_to_cn.get(code, "未知"), [code_to_cn.get(lv, lv) for lv in levels]
+
 
-    # 2) 调用 LLM 抽取姓名/专业/技能/经历/自评/其他
-    llm = LLMClient.from_env()
+def _parse_consolidated(text: str, tag_table: Optional[TagDictionary], mode: str) -> Optional[Dict[str, Any]]:
+    """合并抽取路径：返回与逐字段路径相同键的结果字典；失败返回 None。"""
+    direct_matched = tag_table.direct_matches(text) if tag_table is not None else set()
+    remaining = (
+        prefilter_tags(text, tag_table.tags, sorted(tag_table.tag_set - direct_matched), tag_table.version)
+        if tag_table is not None else []
+    )
+    obj = extract_consolidated(text, remaining, mode)
+    if obj is None:
+        return None
+
+    school_entries: List[Dict[str, Any]] = []
+    schools: List[str] = []
+    seen = set()
+    for it in obj.get("education_school") or []:
+        name = (it.get("name") or "").strip() if isinstance(it, dict) else ""
+        if not name or name in seen:
+            continue
+        seen.add(name)
+        school_entries.append({"school": name, "overseas": it.get("overseas"), "name_zh": it.get("name_zh")})
+        schools.append(name)
+    if not schools:
+        # 模型未给出学校：回退正则
+        schools = extract_schools(text) or []
+        school_entries = [{"school": s} for s in schools]
+    education_tier, education_tiers = _education_tiers(school_entries)
+    schools = [_merge_bilingual(e["school"], e.get("name_zh")) for e in school_entries]
+
+    major = obj.get("education_major")
+    major = major.strip() if isinstance(major, str) else None
+    if major:
+        major = _merge_bilingual(major, obj.get("education_major_zh"))
+
+    category = obj.get("category") if obj.get("category") in ("技术类", "非技术类") else None
+    tag_names: Optional[List[str]] = None
+    if tag_table is not None:
+        tags_set = set(direct_matched)
+        tags_set.update(t for t in obj.get("tags") or [] if isinstance(t, str) and t in tag_table.tag_set)
+        tags_set = _filter_tags_by_category(tags_set, category, tag_table.tech, tag_table.nontech)
+        tag_names = sorted(tags_set) if tags_set else None
+
+    work_items = _clean_experience_items(obj.get("work_experience_items") or []) or None
+    proj_items = _clean_experience_items(obj.get("project_experience_items") or []) or None
+    return {
+        "name": obj.get("name"),
+        "schools": schools or None,
+        "education_tier": education_tier,
+        "education_tiers": education_tiers,
+        "education_major": major or None,
+        "skills": _normalize_string_list(obj.get("skills")),
+        "work_experience": _normalize_string_list([_experience_item_to_text(it) for it in work_items or []]),
+        "internship_experience": _normalize_string_list(obj.get("internship_experience")),
+        "project_experience": _normalize_string_list([_experience_item_to_text(it) for it in proj_items or []]),
+        "work_items": work_items,
+        "proj_items": proj_items,
+        "self_evaluation": obj.get("self_evaluation"),
+        "other": obj.get("other"),
+        "category": category,
+        "tag_names": tag_names,
+    }
+
+
+def _llm_general_fields(text: str) -> Dict[str, Any]:
+    """通用字段：调用 LLM 抽取姓名/专业/技能/经历/自评/其他。"""
+    llm = LLMClient.from_env_with_model(main_model())
     llm_json: Dict[str, Any] = {
         "name": None,
         "education_major": None,
@@ -395,83 +643,159 @@ def parse_resume(text: str, resume_file_id: Optional[int], file_name: Optional[s
     }
 
     if llm:
-        content = llm.extract(LLM_JSON_PROMPT, text)
+        content = llm.extract(LLM_JSON_PROMPT, text, cache_site="general")
         if content:
             parsed = _extract_json_object(content)
             if isinstance(parsed, dict):
                 llm_json.update(parsed)
             else:
                 logger.warning("LLM 返回非 JSON，忽略")
+    return llm_json
 
-    # 3) 姓名兜底：LLM -> 文本 -> 文件名 -> 默认
-    name_fallback = (
-        (llm_json.get("name") or None)
-        or extract_name_from_text(text)
-        or extract_name_from_filename(file_name)
-        or "未知"
-    )
-
-    # 4) 规范化数组字段
-    skills = _normalize_string_list(llm_json.get("skills"))
-    work_ex = _normalize_string_list(llm_json.get("work_experience"))
-    intern_ex = _normalize_string_list(llm_json.get("internship_experience"))
-    proj_ex = _normalize_string_list(llm_json.get("project_experience"))
 
-    # 结构化解析：优先用小模型 LLM（gpt-4o-mini），失败再回退规则
-    work_items = extract_experience_via_llm(work_ex or []) or parse_experience_items(work_ex or []) or None
-    proj_items = extract_experience_via_llm(proj_ex or []) or parse_experience_items(proj_ex or []) or None
-
-    # 5) 学校：单独 LLM 抽取（基于关键词窗口）；若不可用/为空，再尝试通用 LLM 字段；最后回退正则
-    schools_llm_windows = extract_schools_via_llm(text)
+def _resolve_schools(text: str, llm_json: Dict[str, Any], schools_llm_windows: Optional[List[str]]) -> Dict[str, Any]:
+    """学校：关键词窗口 LLM 结果优先；若为空，再尝试通用 LLM 字段；最后回退正则。随后分层次并做中英并存。"""
     if schools_llm_windows:
         schools = schools_llm_windows
     else:
-        schools_llm_general = _normalize_string_list(llm_json.get("education_school"))
-        if schools_llm_general:
-            schools = schools_llm_general
-        else:
-            schools = extract_schools(text)
+        schools = _normalize_string_list(llm_json.get("education_school")) or extract_schools(text)
 
-    # 6) 学校层次：基于已抽取的学校集合进行分类，取最高层次
-    education_tier: Optional[str] = None
-    education_tiers: Optional[List[str]] = None
-    if schools:
-        cls = classify_education_background([{ "school": s } for s in schools])
-        code = (cls or {}).get("highest_education_level")
-        code_to_cn = {
-            "985": "985",
-            "211": "211",
-            "double_first_class": "双一流",
-            "overseas": "海外",
-            "regular": "普通本科",
-            "unknown": "未知",
-            None: None,
-        }
-        education_tier = code_to_cn.get(code, "未知")
-        # 多值并存
-        levels = (cls or {}).get("education_levels") or []
-        education_tiers = [code_to_cn.get(lv, lv) for lv in levels]
+    # 学校层次：基于已抽取的学校集合进行分类，取最高层次
+    education_tier, education_tiers = _education_tiers([{"school": s} for s in schools or []])
 
-    # 6.1) 为学校/专业做中英并存：英文 -> 中文翻译后合并为 "en zh"
-    schools_bilingual: Optional[List[str]] = None
+    # 英文学校 -> 中文翻译后合并为 "en zh"
     if schools:
         schools_bilingual = _bilingual_schools(schools)
         if schools_bilingual:
             schools = schools_bilingual
+    return {"schools": schools, "education_tier": education_tier, "education_tiers": education_tiers}
+
+
+def _resolve_major(llm_json: Dict[str, Any]) -> Optional[str]:
+    major = llm_json.get("education_major")
+    if isinstance(major, str) and major.strip():
+        return _bilingual_major(major.strip()) or major
+    return major
+
+
+def _parse_legacy(text: str) -> Dict[str, Any]:
+    """逐字段抽取路径：通用字段、学校、经历、翻译、分类标签分别调用 LLM。
+
+    各步骤按依赖关系并发执行，耗时接近最长依赖链（通用字段 -> 结构化经历）而非各次调用之和。
+    """
+    graph = {
+        "general": (lambda: _llm_general_fields(text), ()),
+        "school_windows": (lambda: extract_schools_via_llm(text), ()),
+        "tag_table": (_load_tag_table, ()),
+        "category": (lambda: _classify_category(text), ()),
+        "tags": (lambda table: _pick_tags(text, table) if table is not None else None, ("tag_table",)),
+        "work_items": (lambda g: _structured_items(_normalize_string_list(g.get("work_experience"))), ("general",)),
+        "proj_items": (lambda g: _structured_items(_normalize_string_list(g.get("project_experience"))), ("general",)),
+        "schools": (lambda g, w: _resolve_schools(text, g, w), ("general", "school_windows")),
+        "major": (_resolve_major, ("general",)),
+    }
+    r = run_graph(graph, _get_stage_executor())
+    llm_json = r["general"]
+
+    # 分类与标签
+    if r["tag_table"] is None:
+        category, tag_names = None, None
+    else:
+        category, tag_names = _finalize_tags(r["category"], r["tags"], r["tag_table"])
+
+    return {
+        "name": llm_json.get("name"),
+        **r["schools"],
+        "education_major": r["major"],
+        "skills": _normalize_string_list(llm_json.get("skills")),
+        "work_experience": _normalize_string_list(llm_json.get("work_experience")),
+        "internship_experience": _normalize_string_list(llm_json.get("internship_experience")),
+        "project_experience": _normalize_string_list(llm_json.get("project_experience")),
+        "work_items": r["work_items"],
+        "proj_items": r["proj_items"],
+        "self_evaluation": llm_json.get("self_evaluation"),
+        "other": llm_json.get("other"),
+        "category": category,
+        "tag_names": tag_names,
+    }
+
+
+def _parse_rules(text: str) -> Dict[str, Any]:
+    """纯规则路径（LLM 熔断期间）：学校走正则，经历按段落切条后规则解析，标签只取正文直接命中的。"""
+    schools = extract_schools(text)
+    education_tier, education_tiers = _education_tiers([{"school": s} for s in schools or []])
+    sections = segment_resume(text)
+    work = sections.entries("work")
+    internship = sections.entries("internship")
+    projects = sections.entries("projects")
+    tag_table = _load_tag_table()
+    if tag_table is None:
+        category, tag_names = None, None
+    else:
+        category, tag_names = _finalize_tags(None, tag_table.direct_matches(text), tag_table)
+    return {
+        "name": None,
+        "schools": schools,
+        "education_tier": education_tier,
+        "education_tiers": education_tiers,
+        "education_major": None,
+        "skills": None,
+        "work_experience": work or None,
+        "internship_experience": internship or None,
+        "project_experience": projects or None,
+        "work_items": parse_experience_items(work) or None,
+        "proj_items": parse_experience_items(projects) or None,
+        "self_evaluation": None,
+        "other": None,
+        "category": category,
+        "tag_names": tag_names,
+    }
+
 
-    if isinstance(llm_json.get("education_major"), str):
-        education_major_val = (llm_json.get("education_major") or "").strip()
-        if education_major_val:
-            llm_major = _bilingual_major(education_major_val)
-            if llm_major:
-                llm_json["education_major"] = llm_major
+_stage_executor: Optional[ThreadPoolExecutor] = None
+_stage_executor_lock = threading.Lock()
 
-    # 7) 分类与标签
-    category, tag_names = classify_category_and_tags(text)
 
-    # 7.1) 经历项中文化（title/description 翻译为中文；公司名保持原文）
-    # 在生成 structured items 后统一处理
-    # 8) 纯规则提取工作年限（写入 work_years）
+def _get_stage_executor() -> ThreadPoolExecutor:
+    """parse_resume 内部各步骤共享的有界线程池（PARSE_STAGE_CONCURRENCY）。"""
+    global _stage_executor
+    with _stage_executor_lock:
+        if _stage_executor is None:
+            _stage_executor = ThreadPoolExecutor(
+                max_workers=max(1, int(os.getenv("PARSE_STAGE_CONCURRENCY", "8"))),
+                thread_name_prefix="parse-stage",
+            )
+        return _stage_executor
+
+
+def parse_resume(text: str, resume_file_id: Optional[int], file_name: Optional[str] = None) -> ParsedResume:
+    # 1) 先用正则抓联系方式/学历（学校交由 LLM 为主）
+    email_val = extract_first_email(text) or None
+    phone_val = extract_first_phone(text) or None
+    degree = extract_degree(text) or None
+
+    # 2) LLM 抽取：合并调用优先，失败回退逐字段路径；按文档复杂度选择模型
+    result: Optional[Dict[str, Any]] = None
+    mode = os.getenv("LLM_EXTRACTION_MODE", "legacy").strip().lower()
+    with routed(text, label=file_name or str(resume_file_id)):
+        if llm_circuit_open():
+            # 服务商熔断中：LLM 调用会立即失败，直接走规则路径
+            logger.warning(f"LLM 熔断中，{file_name or resume_file_id} 使用规则解析")
+            result = _parse_rules(text)
+        elif mode in ("single", "dual"):
+            result = _parse_consolidated(text, _load_tag_table(), mode)
+        if result is None:
+            result = _parse_legacy(text)
+
+    # 3) 姓名兜底：LLM -> 文本 -> 文件名 -> 默认
+    name_fallback = (
+        (result.get("name") or None)
+        or extract_name_from_text(text)
+        or extract_name_from_filename(file_name)
+        or "未知"
+    )
+
+    # 4) 纯规则提取工作年限（写入 work_years）
     work_years = extract_work_years(text)
 
     pr = ParsedResume(
@@ -480,22 +804,22 @@ def parse_resume(text: str, resume_file_id: Optional[int], file_name: Optional[s
         email=email_val,
         phone=phone_val,
         education_degree=degree,
-        education_school=schools,
-        education_major=(llm_json.get("education_major") or None),
+        education_school=result["schools"],
+        education_major=(result.get("education_major") or None),
         education_graduation_year=None,   # 暂不处理
-        education_tier=education_tier,
-        education_tiers=education_tiers,
-        category=category,
-        tag_names=tag_names,
-        skills=skills,
-        work_experience=work_ex,
-        internship_experience=intern_ex,
-        project_experience=proj_ex,
-        self_evaluation=(llm_json.get("self_evaluation") or None),
-        other=(llm_json.get("other") or None),
+        education_tier=result["education_tier"],
+        education_tiers=result["education_tiers"],
+        category=result["category"],
+        tag_names=result["tag_names"],
+        skills=result["skills"],
+        work_experience=result["work_experience"],
+        internship_experience=result["internship_experience"],
+        project_experience=result["project_experience"],
+        self_evaluation=(result.get("self_evaluation") or None),
+        other=(result.get("other") or None),
         work_years=work_years,
-        work_experience_items=work_items,
-        project_experience_items=proj_items,
+        work_experience_items=result["work_items"],
+        project_experience_items=result["proj_items"],
     )
 
     # 经历项中文化：将 title/description 翻成中文（若主要为英文）
@@ -663,23 +987,19 @@ def classify_category_and_tags(text: str) -> tuple[Optional[str], Optional[list[
     """分类与标签：
     1) 使用 gpt-4o-mini 判定 技术类/非技术类；
     2) 在 markdown 文本中大小写不敏感地直接匹配 tags.tag_name，命中即加入标签；
-    3) 再用 gpt-4o-mini 从“未命中”的候选集中补充相关标签（仅可从候选集选择）。
+    3) 再用 gpt-4o-mini 从“未命中”的候选集中补充相关标签（仅可从候选集选择；候选集先按相似度预筛前 K 个，见 tag_index）。
     返回：category('技术类'|'非技术类'|None), tag_names(list[str]|None)
     """
-    client = get_supabase_client()
-    try:
-        tags_res = client.table("tags").select("tag_name, category").execute()
-        rows = getattr(tags_res, "data", []) or []
-        all_tags = [str(t.get("tag_name", "")).strip() for t in rows if t.get("tag_name")]
-        all_tags_set = set(all_tags)
-        tech_tag_set = {str(t.get("tag_name")).strip() for t in rows if t.get("category") == "技术类"}
-        nontech_tag_set = {str(t.get("tag_name")).strip() for t in rows if t.get("category") == "非技术类"}
-    except Exception:
+    table = _load_tag_table()
+    if table is None:
         return None, None
+    category = _classify_category(text)
+    return _finalize_tags(category, _pick_tags(text, table), table)
 
-    # 1) 分类：gpt-4o-mini
-    from .llm import LLMClient as _LLM
-    cat_llm = _LLM.from_env_with_model("gpt-4o-mini")
+
+def _classify_category(text: str) -> Optional[str]:
+    """分类：gpt-4o-mini 判定 技术类/非技术类。"""
+    cat_llm = LLMClient.from_env_with_model(aux_model())
     category: Optional[str] = None
     if cat_llm:
         cat_prompt = (
@@ -687,7 +1007,8 @@ def classify_category_and_tags(text: str) -> tuple[Optional[str], Optional[list[
             "示例1 文本: '5年Java后端开发，微服务，K8s与Docker' -> {\"category\": \"技术类\"}\n"
             "示例2 文本: '内容策划与品牌运营，活动组织' -> {\"category\": \"非技术类\"}\n"
         )
-        cat_content = cat_llm.extract(cat_prompt, text)
+        # 分类只需摘要（自评、技能与经历开头），不必投全文
+        cat_content = cat_llm.extract(cat_prompt, segment_resume(text).summary(), cache_site="category")
         if cat_content:
             try:
                 cat_obj = json.loads(cat_content.strip().strip('`'))
@@ -696,16 +1017,16 @@ def classify_category_and_tags(text: str) -> tuple[Optional[str], Optional[list[
                     category = cat_val
             except Exception:
                 category = None
+    return category
+
 
-    # 2) 文本直接匹配（大小写不敏感）
-    text_lower = text.lower()
-    direct_matched = {t for t in all_tags if t and t.lower() in text_lower}
+def _pick_tags(text: str, table: TagDictionary) -> set:
+    """标签：文本直接匹配（大小写不敏感），再让 gpt-4o-mini 从“未命中”的候选集中补充。"""
+    direct_matched = table.direct_matches(text)
 
-    # 3) 让 gpt-4o-mini 从“未命中”的候选集中补充
-    tag_names: Optional[list[str]] = None
-    tag_llm = _LLM.from_env_with_model("gpt-4o-mini")
+    tag_llm = LLMClient.from_env_with_model(aux_model())
     tags_set = set(direct_matched)
-    remaining = sorted(list(all_tags_set - tags_set))
+    remaining = prefilter_tags(text, table.tags, sorted(table.tag_set - tags_set), table.version)
     if tag_llm and remaining:
         candidate_str = "\n".join(f"- {t}" for t in remaining)
         tag_prompt = (
@@ -718,7 +1039,9 @@ def classify_category_and_tags(text: str) -> tuple[Optional[str], Optional[list[
             "输入: '内容策划、品牌运营，新媒体运营'（已直接命中: 无）\n"
             "输出: {\"tags\": [\"内容运营\", \"品牌运营\"]}\n"
         )
-        tag_content = tag_llm.extract(tag_prompt, text)
+        # 直接匹配仍用全文；补充标签只投技能、自评与经历段
+        tag_text = segment_resume(text).text_for("summary", "skills", "work", "internship", "projects") or text
+        tag_content = tag_llm.extract(tag_prompt, tag_text, cache_site="tags")
         add_data = None
         if tag_content:
             try:
@@ -728,18 +1051,33 @@ def classify_category_and_tags(text: str) -> tuple[Optional[str], Optional[list[
         if isinstance(add_data, dict):
             sel_tags = add_data.get("tags") if isinstance(add_data.get("tags"), list) else []
             for t in sel_tags:
-                if isinstance(t, str) and t in all_tags_set:
+                if isinstance(t, str) and t in table.tag_set:
                     tags_set.add(t)
+    return tags_set
 
-    if category == "技术类":
-        tags_set = {t for t in tags_set if (t in tech_tag_set) or (t not in nontech_tag_set)}
-    elif category == "非技术类":
-        tags_set = {t for t in tags_set if (t in nontech_tag_set) or (t not in tech_tag_set)}
-    # 若无法判定类别，则不做类别过滤
 
+def _finalize_tags(category: Optional[str], tags_set: set, table: TagDictionary) -> tuple[Optional[str], Optional[list[str]]]:
+    tags_set = _filter_tags_by_category(tags_set, category, table.tech, table.nontech)
     return category, (sorted(tags_set) if tags_set else None)
 
 
+def _load_tag_table() -> Optional[TagDictionary]:
+    """取进程内共享的标签字典（见 tag_dictionary，按版本/TTL 刷新）；首次加载失败返回 None。"""
+    try:
+        return get_tag_dictionary()
+    except Exception:
+        return None
+
+
+def _filter_tags_by_category(tags_set: set, category: Optional[str], tech_tag_set: AbstractSet[str], nontech_tag_set: AbstractSet[str]) -> set:
+    if category == "技术类":
+        return {t for t in tags_set if (t in tech_tag_set) or (t not in nontech_tag_set)}
+    if category == "非技术类":
+        return {t for t in tags_set if (t in nontech_tag_set) or (t not in tech_tag_set)}
+    # 若无法判定类别，则不做类别过滤
+    return tags_set
+
+
 # ============== 结构化经历解析 ==============
 
 _ROLE_KEYWORDS = [
@@ -924,7 +1262,7 @@ def _bilingual_schools(schools: List[str]) -> List[str]:
     en_list = [s for s in schools if _is_mostly_english(s)]
     zh_map: Dict[str, str] = {}
     if en_list:
-        tr = _translate_to_zh_batch(en_list, instruction="只翻译学校名称为简体中文，保持专有名词准确；仅输出 JSON 数组")
+        tr = _translate_to_zh_batch(en_list, instruction="只翻译学校名称为简体中文，保持专有名词准确")
         if tr:
             for en, zh in zip(en_list, tr):
                 zh_map[en] = zh
@@ -940,23 +1278,39 @@ def _bilingual_schools(schools: List[str]) -> List[str]:
 def _bilingual_major(major: str) -> Optional[str]:
     if not _is_mostly_english(major):
         return None
-    tr = _translate_to_zh_batch([major], instruction="只翻译专业名称为简体中文；仅输出 JSON 数组")
+    tr = _translate_to_zh_batch([major], instruction="只翻译专业名称为简体中文")
     if tr and tr[0]:
         return f"{major} {tr[0]}"
     return None
 
 
-def _translate_to_zh_batch(items: List[str], instruction: str) -> Optional[List[str]]:
-    llm = LLMClient.from_env_with_model("gpt-4o-mini")
+# 单项不超过该长度（职位/专业/校名等）时走跨简历微批处理；描述类长文本仍单独调用
+_TINY_TRANSLATE_CHARS = 80
+
+
+def _translate_to_zh_batch(items: List[str], instruction: str, output_format: str = "仅输出 JSON 数组") -> Optional[List[str]]:
+    """instruction 为翻译说明，output_format 为逐个调用时的输出格式要求；微批时改用按编号返回的格式。"""
+    llm = LLMClient.from_env_with_model(small_model())
     if not llm or not items:
         return None
+    if batching_enabled() and all(len(x) <= _TINY_TRANSLATE_CHARS for x in items):
+        batcher = get_micro_batcher(
+            f"translate:{instruction}",
+            lambda xs: _translate_indexed(xs, instruction),
+            prompt=_translate_indexed_prompt(instruction),
+            model=small_model,
+        )
+        out = batcher.submit_many(items)
+        if not any(out):
+            return None
+        return [x if isinstance(x, str) else "" for x in out]
     prompt = (
-        instruction
+        f"{instruction}；{output_format}"
         + "\n要求：逐句直译，不要总结，不要省略，不要融合句子，保证原文信息完整；只翻译为简体中文。"
         + "\n返回严格 JSON 数组，元素与输入一一对应；不得返回 Markdown 或多余文字。\n输入：\n"
         + "\n".join(f"- {x}" for x in items)
     )
-    content = llm.extract(prompt, "")
+    content = llm.extract(prompt, "", cache_site="translate", priority=PRIORITY_LOW)
     if not content:
         return None
     fixed = _strip_code_fences(content)
@@ -969,77 +1323,189 @@ def _translate_to_zh_batch(items: List[str], instruction: str) -> Optional[List[
     return None
 
 
+def _translate_indexed_prompt(instruction: str) -> str:
+    return (
+        instruction
+        + "\n要求：逐项直译，不要总结，不要省略；只翻译为简体中文。"
+        + "\n输入为 JSON 对象 {编号: 原文}；返回严格 JSON 对象 {编号: 译文}，每个编号都必须给出；不得返回 Markdown 或多余文字。"
+    )
+
+
+def _translate_indexed(items: List[str], instruction: str) -> Optional[Dict[str, Any]]:
+    """微批翻译：输入 {编号: 原文}，返回 {原文: 译文}。"""
+    llm = LLMClient.from_env_with_model(small_model())
+    if not llm:
+        return None
+    content = llm.extract(_translate_indexed_prompt(instruction), indexed_input(items), priority=PRIORITY_LOW)
+    return parse_indexed_answers(content, items)
+
+
 def _localize_experience_items(pr: "ParsedResume") -> None:
-    def localize(items: Optional[List[Dict[str, Any]]]) -> None:
-        if not items:
-            return
-        titles = [it.get("title") or "" for it in items]
-        descs = [it.get("description") or "" for it in items]
-        need_t = [i for i, t in enumerate(titles) if _is_mostly_english(t)]
-        need_d = [i for i, d in enumerate(descs) if _is_mostly_english(d)]
-        # 批量翻译（逐句直译，不省略）
-        titles_zh = _translate_to_zh_batch([titles[i] for i in need_t], instruction="将职位名称翻译为简体中文；仅输出 JSON 数组") or []
-        descs_zh = _translate_to_zh_batch([descs[i] for i in need_d], instruction="将描述翻译为简体中文；仅输出 JSON 数组") or []
-        for k, i in enumerate(need_t):
-            if k < len(titles_zh) and titles_zh[k]:
-                items[i]["title_en"] = titles[i]
-                items[i]["title"] = titles_zh[k]
-        for k, i in enumerate(need_d):
-            if k < len(descs_zh) and descs_zh[k]:
-                items[i]["description_en"] = descs[i]
-                items[i]["description"] = descs_zh[k]
-
-    localize(pr.work_experience_items)
-    localize(pr.project_experience_items)
-    # 实习经历若结构化后扩展，这里同样调用
+    """经历项中文化：收集工作/项目经历中主要为英文的 title/description，两类各一次批量翻译，并发执行。"""
+    items = (pr.work_experience_items or []) + (pr.project_experience_items or [])
+    # 实习经历若结构化后扩展，这里同样加入
+    if not items:
+        return
+    titles = [it.get("title") or "" for it in items]
+    descs = [it.get("description") or "" for it in items]
+    need_t = [i for i, t in enumerate(titles) if _is_mostly_english(t)]
+    need_d = [i for i, d in enumerate(descs) if _is_mostly_english(d)]
+    if not need_t and not need_d:
+        return
+    # 批量翻译（逐句直译，不省略）
+    r = run_graph(
+        {
+            "titles": (lambda: _translate_to_zh_batch([titles[i] for i in need_t], instruction="将职位名称翻译为简体中文") or [], ()),
+            "descs": (lambda: _translate_to_zh_batch([descs[i] for i in need_d], instruction="将描述翻译为简体中文") or [], ()),
+        },
+        _get_stage_executor(),
+    )
+    titles_zh, descs_zh = r["titles"], r["descs"]
+    for k, i in enumerate(need_t):
+        if k < len(titles_zh) and titles_zh[k]:
+            items[i]["title_en"] = titles[i]
+            items[i]["title"] = titles_zh[k]
+    for k, i in enumerate(need_d):
+        if k < len(descs_zh) and descs_zh[k]:
+            items[i]["description_en"] = descs[i]
+            items[i]["description"] = descs_zh[k]
+
 
 def parse_experience_items(entries: List[str]) -> List[Dict[str, Any]]:
     # 兜底：若 entries 为空，尝试从整段 markdown 中切出经历块（按常见标题拆分）
     items: List[Dict[str, Any]] = []
     for raw in entries:
-        if not raw or not isinstance(raw, str):
-            continue
-        text = raw.strip()
-        if not text:
-            continue
-        # 分割头部与描述（第一行作为头部）
-        head, sep, tail_block = text.partition("\n")
-        header = _normalize_text_line(head)
-        desc = tail_block.strip()
-
-        start_dt, end_dt, rest, _s_tok, _e_tok = _extract_time_range_from_header(header)
-        company, title, tail_after = _split_company_title(rest)
-        extra = tail_after.strip()
-        description = " ".join(x for x in [extra, desc] if x).strip() or None
-
-        # 若都为空，尝试把 header 直接当作描述
-        if not (company or title) and not start_dt and not end_dt:
-            description = text
-
-        # 计算时长
-        duration_months: Optional[int] = None
-        if start_dt:
-            end_for_calc = end_dt or date.today()
-            try:
-                duration_months = _months_between(start_dt, end_for_calc)
-            except Exception:
-                duration_months = None
-
-        items.append({
-            "start": _format_ym(start_dt),
-            "end": (_format_ym(end_dt) if end_dt else ("present" if start_dt else None)),
-            "company": company,
-            "title": title,
-            "description": description,
-            "duration_months": duration_months,
-        })
+        parsed = _parse_experience_entry(raw)
+        if parsed is not None:
+            items.append(parsed[0])
     return items
 
 
+def _has_role_keyword(title: str) -> bool:
+    low = title.lower()
+    return any(kw in title for kw in _ROLE_KEYWORDS) or any(kw in low for kw in _ROLE_KEYWORDS_EN)
+
+
+def _parse_experience_entry(raw: Any) -> Optional[Tuple[Dict[str, Any], float]]:
+    """规则解析单条经历，返回 (结构化经历, 置信度 0~1)；空条目返回 None。
+
+    置信度：头部以时间范围开头 0.4（括号内时间 0.3）；公司与职位均切分出 0.3；
+    职位含岗位关键词 0.2；有描述 0.1；公司/职位过长或职位含句读（疑似把整句当成字段）扣 0.3。
+    """
+    if not raw or not isinstance(raw, str):
+        return None
+    text = raw.strip()
+    if not text:
+        return None
+    # 分割头部与描述（第一行作为头部）
+    head, sep, tail_block = text.partition("\n")
+    header = _normalize_text_line(head)
+    desc = tail_block.strip()
+
+    start_dt, end_dt, rest, _s_tok, _e_tok = _extract_time_range_from_header(header)
+    company, title, tail_after = _split_company_title(rest)
+    extra = tail_after.strip()
+    description = " ".join(x for x in [extra, desc] if x).strip() or None
+
+    # 若都为空，尝试把 header 直接当作描述
+    if not (company or title) and not start_dt and not end_dt:
+        description = text
+
+    # 计算时长
+    duration_months: Optional[int] = None
+    if start_dt:
+        end_for_calc = end_dt or date.today()
+        try:
+            duration_months = _months_between(start_dt, end_for_calc)
+        except Exception:
+            duration_months = None
+
+    confidence = 0.0
+    if start_dt:
+        confidence += 0.4 if _s_tok and header.startswith(_s_tok) else 0.3
+    if company and title:
+        confidence += 0.3
+        if _has_role_keyword(title):
+            confidence += 0.2
+        if len(company) > 40 or len(title) > 40 or re.search(r"[。，；,;]", title):
+            confidence -= 0.3
+    if description:
+        confidence += 0.1
+
+    item = {
+        "start": _format_ym(start_dt),
+        "end": (_format_ym(end_dt) if end_dt else ("present" if start_dt else None)),
+        "company": company,
+        "title": title,
+        "description": description,
+        "duration_months": duration_months,
+    }
+    return item, round(max(0.0, min(1.0, confidence)), 2)
+
+
+def _structured_items(entries: Optional[List[str]]) -> Optional[List[Dict[str, Any]]]:
+    """结构化解析：规则置信度足够（EXPERIENCE_RULE_CONFIDENCE）的条目直接采用规则结果，
+    其余条目合并为一次 gpt-4o-mini 调用；LLM 失败时这些条目回退规则结果。"""
+    entries = [e for e in entries or [] if isinstance(e, str) and e.strip()]
+    if not entries:
+        return None
+    threshold = float(os.getenv("EXPERIENCE_RULE_CONFIDENCE", "0.8"))
+    parsed = [_parse_experience_entry(e) for e in entries]
+    low = [i for i, p in enumerate(parsed) if p is not None and p[1] < threshold]
+    _record_experience_stats(len(entries), len(entries) - len(low))
+    llm_items = extract_experience_via_llm([entries[i] for i in low]) if low else None
+
+    # 规则结果补齐与 LLM 结果相同的字段
+    parsed = [
+        ({"title_en": None, "description_en": None, "details_en": None, "details": None, **p[0]}, p[1]) if p else None
+        for p in parsed
+    ]
+    items: List[Dict[str, Any]] = []
+    if llm_items and len(llm_items) != len(low):
+        # 条目数与输入不一致（模型拆分/合并了经历）：整体放在第一条低置信度条目的位置
+        for i, p in enumerate(parsed):
+            if i == low[0]:
+                items.extend(llm_items)
+            elif p is not None and i not in low:
+                items.append(p[0])
+        return items or None
+    for i, p in enumerate(parsed):
+        if p is None:
+            continue
+        if llm_items and i in low:
+            items.append(llm_items[low.index(i)])
+        else:
+            items.append(p[0])
+    return items or None
+
+
+_experience_stats = {"entries": 0, "rule_only": 0}
+_experience_stats_lock = threading.Lock()
+
+
+def _record_experience_stats(entries: int, rule_only: int) -> None:
+    with _experience_stats_lock:
+        _experience_stats["entries"] += entries
+        _experience_stats["rule_only"] += rule_only
+    if entries:
+        logger.info(f"经历解析：{rule_only}/{entries} 条规则置信度足够，跳过 LLM")
+
+
+def experience_parse_stats() -> Dict[str, Any]:
+    """结构化经历解析中跳过 LLM 的条目占比。"""
+    with _experience_stats_lock:
+        entries, rule_only = _experience_stats["entries"], _experience_stats["rule_only"]
+    return {
+        "entries": entries,
+        "rule_only": rule_only,
+        "skipped_llm_ratio": round(rule_only / entries, 3) if entries else 0.0,
+    }
+
+
 def extract_experience_via_llm(entries: List[str]) -> Optional[List[Dict[str, Any]]]:
     if not entries:
         return None
-    llm = LLMClient.from_env_with_model("gpt-4o-mini")
+    llm = LLMClient.from_env_with_model(aux_model())
     if not llm:
         return None
     schema = (
@@ -1065,12 +1531,17 @@ def extract_experience_via_llm(entries: List[str]) -> Optional[List[Dict[str, An
         "[{\"start\": \"2024-11\", \"end\": \"2025-02\", \"company\": \"XT Future 2.0\", \"title_en\": null, \"title\": \"项目负责人\", \"description_en\": null, \"description\": \"统一账户模型规划与实施\", \"details_en\": null, \"details\": [\"统一账户模型规划与实施\"]}]\n"
     )
     content = "\n---\n".join(str(x) for x in entries)
-    out = llm.extract(schema, content, max_tokens=1200)
+    out = llm.extract(schema, content, max_tokens=1200, cache_site="experience")
     if not out:
         return None
     obj = _extract_json_object(out)
     if not isinstance(obj, list):
         return None
+    return _clean_experience_items(obj)
+
+
+def _clean_experience_items(obj: List[Any]) -> List[Dict[str, Any]]:
+    """清洗 LLM 返回的结构化经历：去日期噪声、规范 *_en 字段、计算时长。"""
     cleaned: List[Dict[str, Any]] = []
     for it in obj:
         if not isinstance(it, dict):
@@ -0,0 +1,153 @@
+"""
+分阶段流水线的基础构件
+
+每个阶段拥有独立的 worker 线程数与有界输入队列：下游队列满时上游 put 会阻塞，
+从而把背压逐级传回任务出队处，避免 CPU 密集的 OCR 与 I/O 密集的 LLM/上传相互占用线程。
+
+run_graph 用于单个任务内部：按依赖关系并发执行互不依赖的步骤（如 parse_resume 的各次 LLM 调用）。
+SingleFlight 用于跨任务：多个工作线程同时发起的相同调用只执行一次并共享结果。
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Sequence, Tuple, TypeVar
+
+
+logger = logging.getLogger("pipeline")
+
+T = TypeVar("T")
+
+
+class Stage(Generic[T]):
+    """流水线中的一个阶段：workers 个线程从有界队列取任务并调用 handler。
+
+    handler 负责把结果交给下一阶段（调用其 put）；抛出的异常交给 on_error 处理。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[T], None],
+        *,
+        workers: int,
+        maxsize: int,
+        on_error: Callable[[T, Exception], None],
+    ) -> None:
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.on_error = on_error
+        self._queue: "queue.Queue[T]" = queue.Queue(maxsize=max(1, maxsize))
+        self._threads: List[threading.Thread] = []
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def put(self, item: T) -> None:
+        """提交任务；队列已满时阻塞（背压）。"""
+        self._queue.put(item)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            with self._busy_lock:
+                self._busy += 1
+            try:
+                self.handler(item)
+            except Exception as e:
+                logger.error(f"[{self.name}] 阶段处理异常: {e}")
+                try:
+                    self.on_error(item, e)
+                except Exception as ee:
+                    logger.error(f"[{self.name}] 错误处理异常: {ee}")
+            finally:
+                with self._busy_lock:
+                    self._busy -= 1
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "busy": self._busy, "queued": self._queue.qsize()}
+
+
+def run_graph(
+    nodes: Dict[str, Tuple[Callable[..., Any], Sequence[str]]],
+    executor: Executor,
+) -> Dict[str, Any]:
+    """按依赖关系并发执行一组任务，返回 {名称: 结果}。
+
+    nodes 形如 {名称: (函数, 依赖名称列表)}，函数按依赖顺序接收依赖的结果作为参数；
+    依赖全部完成后立即提交到 executor。每个任务在调用方 contextvars 的副本中运行
+    （如 LLM token 统计可跨线程生效）。任一任务抛出异常时等待已提交的任务结束后重新抛出。
+    """
+    results: Dict[str, Any] = {}
+    running: Dict[Future, str] = {}
+    pending = dict(nodes)
+    error: Optional[BaseException] = None
+    while pending or running:
+        if error is None:
+            for name, (fn, deps) in list(pending.items()):
+                if all(d in results for d in deps):
+                    ctx = contextvars.copy_context()
+                    running[executor.submit(ctx.run, fn, *(results[d] for d in deps))] = name
+                    del pending[name]
+        if not running:
+            if pending and error is None:
+                raise ValueError(f"依赖无法满足: {sorted(pending)}")
+            break
+        done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        for fut in done:
+            name = running.pop(fut)
+            try:
+                results[name] = fut.result()
+            except BaseException as e:
+                error = error or e
+    if error is not None:
+        raise error
+    return results
+
+
+class SingleFlight:
+    """合并并发的相同调用：同一 key 同时只执行一次，其余调用等待并共享其结果（含异常）。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            self.calls += 1
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return fut.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            self._calls.pop(key, None)
+        fut.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "inflight": len(self._calls)}
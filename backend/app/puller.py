@@ -0,0 +1,276 @@
+"""
+远程简历拉取（asyncio）
+
+从 resume_files 领取状态为 未处理/已上传/待处理 的远程 URL 记录，并发下载到 processing 目录：
+- 共享一个 httpx.AsyncClient：连接池 + keep-alive，可选 HTTP/2（PULL_HTTP2）
+- 全局并发 PULL_CONCURRENCY，单个主机并发 PULL_PER_HOST_CONCURRENCY
+- 重试与退避沿用原策略：PULL_DOWNLOAD_RETRIES 次，等待 min(20, 1.5 * attempt) 秒
+- 校验：Content-Length 与实际字节数一致；记录已有 content_sha256 时比对 SHA-256；
+  ETag 为单段 MD5 时比对 MD5。校验失败视为下载失败并重试
+下载先写入 .part 临时文件，校验通过后再重命名为正式文件名并入队。
+
+新记录由 /uploads/complete 通过 notify() 直接推送，立即领取下载；
+按 PULL_UNPROCESSED_INTERVAL 周期查询数据库仅作为兜底对账（其他进程写入、推送丢失等）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Optional, Set
+from urllib.parse import urlsplit
+
+import certifi
+import httpx
+
+from .db import get_supabase_client
+from .dedup import content_sha256_supported
+
+
+logger = logging.getLogger("upload_watcher")
+
+_PENDING_STATUSES = ["未处理", "已上传", "待处理"]
+_REMOTE_URL_FILTER = "file_path.ilike.http://%,file_path.ilike.https://%"
+_CHUNK_SIZE = 65536
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+class AsyncPuller:
+    """并发拉取远程文件；下载完成后调用 enqueue(path, resume_file_id) 交给处理队列。"""
+
+    def __init__(self, processing_dir: Path, enqueue: Callable[[Path, int], None]) -> None:
+        self.processing_dir = processing_dir
+        self.enqueue = enqueue
+        self.poll_interval = max(3, int(os.getenv("PULL_UNPROCESSED_INTERVAL", "60")))
+        self.batch_size = max(1, int(os.getenv("PULL_BATCH_SIZE", "20")))
+        self.max_attempts = max(1, int(os.getenv("PULL_DOWNLOAD_RETRIES", "3")))
+        self.concurrency = max(1, int(os.getenv("PULL_CONCURRENCY", "8")))
+        self.per_host = max(1, int(os.getenv("PULL_PER_HOST_CONCURRENCY", "4")))
+        self.http2 = os.getenv("PULL_HTTP2", "0").lower() in ("1", "true", "yes")
+        self._global_limit = asyncio.Semaphore(self.concurrency)
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._reserved: Set[Path] = set()
+        self._inflight: Set[int] = set()
+        # 在途下载任务的强引用：事件循环只弱引用任务，不保存的话下载可能中途被回收，记录卡在 拉取中
+        self._tasks: Set[asyncio.Task] = set()
+        self._pushed: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def notify(self, item: dict) -> None:
+        """推送新写入的 resume_files 记录（线程安全），唤醒拉取循环立即处理。"""
+        self._pushed.append(item)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return sem
+
+    def _reserve_target(self, fname: str) -> Path:
+        """计算保存路径，若重名（含正在下载的）则追加后缀。"""
+        target = self.processing_dir / fname
+        base, ext = target.stem, target.suffix
+        counter = 0
+        while target.exists() or target in self._reserved:
+            counter += 1
+            target = self.processing_dir / f"{base}_{counter}{ext}"
+        self._reserved.add(target)
+        return target
+
+    @staticmethod
+    def _verify(resp: httpx.Response, size: int, sha256: str, md5: str, expected_sha256: Optional[str]) -> None:
+        length = resp.headers.get("content-length")
+        # 压缩传输时 Content-Length 为压缩后大小，不参与比对
+        if length and not resp.headers.get("content-encoding") and int(length) != size:
+            raise ChecksumMismatch(f"长度不一致: {size} != {length}")
+        if expected_sha256 and expected_sha256 != sha256:
+            raise ChecksumMismatch("SHA-256 与记录不一致")
+        etag = (resp.headers.get("etag") or "").strip('W/"')
+        if len(etag) == 32 and "-" not in etag and etag.lower() != md5:
+            raise ChecksumMismatch("MD5 与 ETag 不一致")
+
+    async def _download(self, http: httpx.AsyncClient, url: str, part: Path, expected_sha256: Optional[str]) -> str:
+        sha = hashlib.sha256()
+        md5 = hashlib.md5()
+        size = 0
+        async with self._global_limit, self._host_limit(url):
+            async with http.stream("GET", url) as resp:
+                if resp.status_code >= 400:
+                    raise httpx.HTTPStatusError(f"bad status: {resp.status_code}", request=resp.request, response=resp)
+                with open(part, "wb") as f:
+                    async for chunk in resp.aiter_bytes(_CHUNK_SIZE):
+                        f.write(chunk)
+                        sha.update(chunk)
+                        md5.update(chunk)
+                        size += len(chunk)
+                digest = sha.hexdigest()
+                self._verify(resp, size, digest, md5.hexdigest(), expected_sha256)
+        return digest
+
+    async def _pull_one(self, http: httpx.AsyncClient, item: dict) -> None:
+        rid = item["id"]
+        url = item["file_path"].strip()
+        target = self._reserve_target(item["file_name"].strip())
+        part = target.with_name(target.name + ".part")
+        try:
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    digest = await self._download(http, url, part, item.get("content_sha256"))
+                    break
+                except Exception as de:
+                    if attempt >= self.max_attempts:
+                        logger.error(f"[pull] 下载失败: id={rid}, url={url}, error={de}")
+                        part.unlink(missing_ok=True)
+                        await self._update(rid, {"status": "未处理"})
+                        return
+                    # 指数退避
+                    backoff = min(20.0, 1.5 * attempt)
+                    logger.warning(f"[pull] 下载失败，退避重试({attempt}/{self.max_attempts})，等待 {backoff:.1f}s: id={rid}, url={url}")
+                    await asyncio.sleep(backoff)
+            os.replace(part, target)
+            logger.info(f"[pull] 下载成功: id={rid}, file={target.name}")
+            # 下载完成后先置为 处理中（同时记录内容指纹），再入队交给处理循环
+            payload = {"status": "处理中"}
+            if content_sha256_supported():
+                payload["content_sha256"] = digest
+            await self._update(rid, payload)
+            self.enqueue(target, rid)
+        except asyncio.CancelledError:
+            # 退出时被取消：清理半成品并退回待拉取状态，由对账查询重新领取
+            part.unlink(missing_ok=True)
+            await self._update(rid, {"status": "未处理"})
+            raise
+        finally:
+            self._reserved.discard(target)
+            self._inflight.discard(rid)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        # 任务结束后唤醒循环：积压时尽快领取下一批
+        self._wakeup.set()
+
+    @contextlib.asynccontextmanager
+    async def _task_scope(self) -> AsyncIterator[None]:
+        """退出拉取循环（如事件循环被取消）时取消在途下载并等待其清理完毕。"""
+        try:
+            yield
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _update(self, rid: int, payload: dict) -> None:
+        try:
+            await asyncio.to_thread(
+                lambda: get_supabase_client().table("resume_files").update(payload).eq("id", rid).execute()
+            )
+        except Exception:
+            pass
+
+    def _claim(self, rid: int) -> bool:
+        """抢占：将状态 从(未处理/已上传/待处理) -> 拉取中，避免重复并发拉取。"""
+        try:
+            upd = (
+                get_supabase_client()
+                .table("resume_files")
+                .update({"status": "拉取中"})
+                .eq("id", rid)
+                .in_("status", _PENDING_STATUSES)
+                .execute()
+            )
+            return bool(getattr(upd, "data", []) or [])
+        except Exception:
+            return False
+
+    def _fetch_pending(self) -> list:
+        # 允许多来源写入的不同初始状态：未处理/已上传/待处理，统一当作待拉取
+        columns = "id,file_name,file_path,status"
+        if content_sha256_supported():
+            columns += ",content_sha256"
+        res = (
+            get_supabase_client()
+            .table("resume_files")
+            .select(columns)
+            .in_("status", _PENDING_STATUSES)
+            # /upload 写入的本地路径记录由接口直接入队，在查询中排除，避免占满批次挡住远程记录
+            .or_(_REMOTE_URL_FILTER)
+            .order("id")
+            .limit(self.batch_size)
+            .execute()
+        )
+        return getattr(res, "data", []) or []
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.processing_dir.mkdir(parents=True, exist_ok=True)
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency,
+            keepalive_expiry=60.0,
+        )
+        async with httpx.AsyncClient(
+            timeout=30.0,
+            follow_redirects=True,
+            http2=self.http2,
+            verify=certifi.where(),
+            limits=limits,
+            headers={"User-Agent": "AIResumeFetcher/1.0"},
+        ) as http, self._task_scope():
+            next_poll = 0.0
+            backlog = False
+            while True:
+                try:
+                    self._wakeup.clear()
+                    items = []
+                    while self._pushed:
+                        items.append(self._pushed.popleft())
+                    # 兜底对账：到期或上次查询仍有积压时查询；在途任务占满一批时暂缓，避免无限堆积
+                    polled: Set[int] = set()
+                    if (backlog or time.monotonic() >= next_poll) and len(self._inflight) < self.batch_size:
+                        pending = await asyncio.to_thread(self._fetch_pending)
+                        polled = {item.get("id") for item in pending}
+                        items.extend(pending)
+                        next_poll = time.monotonic() + self.poll_interval
+                        # 查询满一批且本轮确有领取时才视为积压；领取不到（被其他进程抢占等）时等下次对账，避免空转
+                        backlog = False
+                    for item in items:
+                        rid = item.get("id")
+                        fname = (item.get("file_name") or "").strip()
+                        url = (item.get("file_path") or "").strip()
+                        if not rid or not fname or not url or rid in self._inflight:
+                            continue
+                        # /upload 写入的是本地路径，已由接口直接入队，这里只拉取远程 URL
+                        if not url.lower().startswith(("http://", "https://")):
+                            continue
+                        if await asyncio.to_thread(self._claim, rid):
+                            self._inflight.add(rid)
+                            task = asyncio.create_task(self._pull_one(http, item))
+                            self._tasks.add(task)
+                            task.add_done_callback(self._on_task_done)
+                            if rid in polled and len(polled) >= self.batch_size:
+                                backlog = True
+                    if self._pushed:
+                        continue
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, next_poll - time.monotonic()))
+                    except asyncio.TimeoutError:
+                        pass
+                except Exception as e:
+                    logger.error(f"[pull] 拉取循环异常: {e}")
+                    await asyncio.sleep(3)
@@ -0,0 +1,193 @@
+"""
+简历分段（基于规则）
+
+把 OCR 得到的 markdown 切分为 教育/工作/实习/项目/技能/自评/其他 等段落，
+使各 LLM 步骤只接收与之相关的部分，减少输入 token 与延迟：
+- 学校抽取只需要教育背景
+- 技术类/非技术类分类只需要摘要（自评 + 技能 + 经历开头）
+- 标签补充只需要技能与经历
+识别的标题：markdown `#` 标题行，或整行为已知标题词的短行（中英文，如 工作经历 / Work Experience），
+以及 MinerU content_list.json 中 text_level 标记的标题（见 mark_headings）。
+未识别出所需段落时调用方应回退为全文。
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# 段落类型 -> 标题词（归一化后整行匹配；英文小写）
+_HEADINGS: Dict[str, Tuple[str, ...]] = {
+    "education": (
+        "教育背景", "教育经历", "教育经验", "学历背景", "教育",
+        "education", "education background", "educational background", "academic background",
+    ),
+    "work": (
+        "工作经历", "工作经验", "职业经历", "任职经历", "工作履历",
+        "work experience", "professional experience", "employment history", "employment", "experience",
+        "work history", "career history",
+    ),
+    "internship": (
+        "实习经历", "实习经验", "实践经历", "校园经历",
+        "internship", "internships", "internship experience",
+    ),
+    "projects": (
+        "项目经历", "项目经验", "项目", "主要项目", "项目介绍",
+        "projects", "project", "project experience", "selected projects", "key projects",
+    ),
+    "skills": (
+        "专业技能", "技能", "技能特长", "个人技能", "技术栈", "专业能力", "技能专长",
+        "skills", "technical skills", "core skills", "skill set", "skills and tools", "technologies",
+    ),
+    "summary": (
+        "自我评价", "个人简介", "个人总结", "个人优势", "求职意向", "自我介绍", "个人评价",
+        "summary", "profile", "about me", "objective", "career objective", "professional summary",
+    ),
+    "other": (
+        "证书", "资格证书", "荣誉奖项", "获奖情况", "荣誉", "语言能力", "兴趣爱好", "其他",
+        "certifications", "certificates", "awards", "honors", "languages", "publications", "interests",
+    ),
+}
+
+_HEADING_INDEX: Dict[str, str] = {word: kind for kind, words in _HEADINGS.items() for word in words}
+# 前缀匹配时优先较长的标题词（"项目经历" 先于 "项目"）
+_PREFIX_WORDS = sorted(_HEADING_INDEX, key=len, reverse=True)
+
+# 标题行的装饰：markdown 标记、编号、括号、冒号等
+_DECOR_RE = re.compile(r"^\s*(?:#{1,6}\s*)?(?:[一二三四五六七八九十]+[、.．]|\d+[、.．)]\s*)?")
+_STRIP_RE = re.compile(r"[\*_`【】\[\]<>《》:：|｜/／&＆\-—·•]+")
+_CHUNK_RE = re.compile(r"[\u4e00-\u9fff]+|[a-z][a-z ]*[a-z]|[a-z]")
+# 经历条目的起始行：以年份开头（可带列表符号/括号），如 "2020.07 - 至今 ..." "- (2019-2021) ..."
+_ENTRY_START_RE = re.compile(r"^[\s\-*•#>（(]*(?:19|20)\d{2}\s*(?:[./\-年]|$|\s*[-–—~至])")
+_MAX_HEADING_LEN = 40
+
+
+@dataclass(frozen=True)
+class Section:
+    kind: str
+    heading: str
+    text: str
+
+
+def _heading_kind(line: str) -> Optional[str]:
+    """若该行是已知段落标题，返回段落类型。
+
+    普通行须整行为标题词；已标记为标题的行（markdown `#`）允许标题词后带括号说明，如 "# 项目经历（近三年）"。
+    """
+    if len(line) > _MAX_HEADING_LEN:
+        return None
+    marked = line.startswith("#")
+    norm = _STRIP_RE.sub(" ", _DECOR_RE.sub("", line)).strip().lower()
+    norm = re.sub(r"\s+", " ", norm)
+    if not norm:
+        return None
+    kind = _HEADING_INDEX.get(norm)
+    if kind:
+        return kind
+    # 中英并列的标题（如 "工作经历 Work Experience"）：每一部分都须指向同一类型
+    chunks = _CHUNK_RE.findall(norm)
+    if len(chunks) >= 2 and "".join(chunks).replace(" ", "") == norm.replace(" ", ""):
+        kinds = {_HEADING_INDEX.get(c.strip()) for c in chunks}
+        if len(kinds) == 1 and None not in kinds:
+            return kinds.pop()
+    if marked:
+        for word in _PREFIX_WORDS:
+            # 仅接受括号补充说明，避免 "# Project Manager" 之类的经历标题被误判
+            if norm.startswith(word) and norm[len(word):].lstrip()[:1] in ("(", "（"):
+                return _HEADING_INDEX[word]
+    return None
+
+
+class ResumeSections:
+    """分段结果；header 为第一个已识别标题之前的内容（姓名、联系方式等）。"""
+
+    def __init__(self, text: str, sections: List[Section]) -> None:
+        self.text = text
+        self.sections = sections
+        self.kinds = {s.kind for s in sections if s.kind != "header"}
+
+    def has(self, *kinds: str) -> bool:
+        return any(k in self.kinds for k in kinds)
+
+    def _join(self, kinds: Sequence[str], digest: Sequence[str], digest_chars: int) -> str:
+        parts: List[str] = []
+        for s in self.sections:
+            if s.kind in kinds:
+                parts.append(s.text)
+            elif s.kind in digest:
+                parts.append(s.text[:digest_chars])
+        return "\n\n".join(p for p in parts if p.strip())
+
+    def text_for(self, *kinds: str, digest: Sequence[str] = (), digest_chars: int = 600) -> Optional[str]:
+        """按原文顺序拼接指定类型的段落；digest 中的类型只保留开头 digest_chars 个字符。
+
+        所需段落一个都未识别出时返回 None，由调用方回退全文。
+        """
+        if not self.has(*kinds):
+            return None
+        return self._join(kinds, digest, digest_chars) or None
+
+    def entries(self, *kinds: str) -> List[str]:
+        """把指定类型段落按条目切分（去掉标题行）：以年份开头的行开始新条目，其余行并入当前条目。"""
+        out: List[str] = []
+        for s in self.sections:
+            if s.kind not in kinds:
+                continue
+            buf: List[str] = []
+            for line in s.text.splitlines()[1:] if s.heading else s.text.splitlines():
+                if not line.strip():
+                    continue
+                if _ENTRY_START_RE.match(line) and buf:
+                    out.append("\n".join(buf))
+                    buf = []
+                buf.append(line.strip())
+            if buf:
+                out.append("\n".join(buf))
+        return out
+
+    def summary(self, max_chars: int = 2000) -> str:
+        """分类用摘要：开头信息 + 自评 + 技能 + 各段经历开头；未分段时取全文开头。"""
+        if not self.kinds:
+            return self.text[:max_chars]
+        out = self._join(("header", "summary", "skills"), ("work", "internship", "projects"), 400)
+        return (out or self.text)[:max_chars]
+
+
+def segment_resume(text: str) -> ResumeSections:
+    """按标题行切分 markdown 简历。"""
+    sections: List[Section] = []
+    kind, heading, buf = "header", "", []
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        # 未知标题（如经历中的公司名被排版为标题）不切段，留在当前段落
+        new_kind = _heading_kind(stripped) if stripped else None
+        if new_kind is not None:
+            if buf or heading:
+                sections.append(Section(kind, heading, "\n".join(buf).strip()))
+            kind, heading, buf = new_kind, stripped, [line]
+            continue
+        buf.append(line)
+    if buf:
+        sections.append(Section(kind, heading, "\n".join(buf).strip()))
+    return ResumeSections(text or "", [s for s in sections if s.text])
+
+
+def mark_headings(markdown: str, content_list: Iterable[Dict[str, Any]]) -> str:
+    """按 MinerU content_list.json 中 text_level 标记的标题，为 markdown 中对应行补上 `#`，
+    使分段时能识别版式上的标题（如 "项目经历（近三年）" 这类带补充说明的标题）。"""
+    titles = {
+        str(item.get("text") or "").strip()
+        for item in content_list
+        if isinstance(item, dict) and item.get("type") == "text" and item.get("text_level")
+    }
+    titles.discard("")
+    if not titles:
+        return markdown
+    lines = markdown.splitlines()
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped in titles and not stripped.startswith("#"):
+            lines[i] = "# " + stripped
+    return "\n".join(lines)
@@ -0,0 +1,272 @@
+"""
+原件上传（Supabase Storage / Cloudflare R2）
+
+所有上传都从磁盘分块流式读取，不把整个文件读入内存：
+- Supabase：小文件走标准上传（请求体直接流式读取文件）；超过 STORAGE_RESUMABLE_THRESHOLD
+  的文件走 TUS 可续传上传，按 6MB 分片 PATCH，分片失败时先 HEAD 查询服务端偏移再续传
+- R2（S3 兼容）：boto3 upload_file + TransferConfig，超过阈值自动分段并发上传，
+  分段级重试由 botocore 重试策略负责
+分片重试次数 STORAGE_PART_RETRIES，R2 分段并发数 STORAGE_UPLOAD_CONCURRENCY。
+watcher 的原件只上传到 Supabase Storage；STORAGE_R2_FALLBACK=1 时未配置桶名才改为上传到 R2。
+"""
+
+from __future__ import annotations
+
+import base64
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import boto3
+import certifi
+import httpx
+from boto3.s3.transfer import TransferConfig
+from botocore.client import Config as _BotoConfig
+
+from . import build_r2_public_url, build_supabase_public_url
+from .config import get_app_settings
+
+
+logger = logging.getLogger("storage")
+
+# Supabase 可续传上传要求除最后一片外每片恰好 6MB
+_TUS_CHUNK_SIZE = 6 * 1024 * 1024
+_MB = 1024 * 1024
+
+
+class ObjectExistsError(Exception):
+    """目标对象键已存在（未开启 upsert）。"""
+
+
+def _part_retries() -> int:
+    return max(1, int(os.getenv("STORAGE_PART_RETRIES", "3")))
+
+
+def _backoff(attempt: int) -> float:
+    return min(20.0, 1.5 * attempt)
+
+
+_http: Optional[httpx.Client] = None
+_r2 = None
+_r2_upload = None
+_lock = threading.Lock()
+
+
+def _get_http() -> httpx.Client:
+    """上传共享的 HTTP 客户端（长连接复用）。"""
+    global _http
+    with _lock:
+        if _http is None:
+            _http = httpx.Client(
+                timeout=httpx.Timeout(120.0, connect=15.0),
+                verify=certifi.where(),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+            )
+        return _http
+
+
+def _r2_configured(settings) -> bool:
+    return bool(settings.r2_account_id and settings.r2_access_key_id and settings.r2_secret_access_key and settings.r2_bucket)
+
+
+def _make_r2_client(settings, retries: int, pool_size: int = 10):
+    return boto3.client(
+        "s3",
+        endpoint_url=f"https://{settings.r2_account_id}.r2.cloudflarestorage.com",
+        aws_access_key_id=settings.r2_access_key_id,
+        aws_secret_access_key=settings.r2_secret_access_key,
+        region_name="auto",
+        config=_BotoConfig(
+            signature_version="s3v4",
+            s3={"addressing_style": "path"},
+            retries={"max_attempts": retries, "mode": "standard"},
+            max_pool_connections=pool_size,
+        ),
+        verify=certifi.where(),
+    )
+
+
+def get_r2_client():
+    """共享的 R2 boto3 客户端（用于预签名）；未配置 R2 时返回 None。"""
+    global _r2
+    settings = get_app_settings()
+    if not _r2_configured(settings):
+        return None
+    with _lock:
+        if _r2 is None:
+            _r2 = _make_r2_client(settings, retries=2)
+        return _r2
+
+
+def _get_r2_upload_client():
+    """分段上传专用的 R2 客户端：重试次数取 STORAGE_PART_RETRIES，连接池按上传并发数放大。"""
+    global _r2_upload
+    settings = get_app_settings()
+    if not _r2_configured(settings):
+        return None
+    with _lock:
+        if _r2_upload is None:
+            _r2_upload = _make_r2_client(
+                settings,
+                retries=_part_retries(),
+                pool_size=max(10, int(os.getenv("STORAGE_UPLOAD_CONCURRENCY", "4")) * 2),
+            )
+        return _r2_upload
+
+
+def upload_to_r2(path: Path, object_key: str, content_type: str) -> str:
+    """流式上传到 R2，大文件自动分段并发上传，返回公开 URL。"""
+    settings = get_app_settings()
+    s3 = _get_r2_upload_client()
+    if s3 is None:
+        raise RuntimeError("未配置 R2")
+    threshold = int(float(os.getenv("STORAGE_MULTIPART_THRESHOLD_MB", "8")) * _MB)
+    config = TransferConfig(
+        multipart_threshold=threshold,
+        multipart_chunksize=max(5 * _MB, int(float(os.getenv("STORAGE_PART_SIZE_MB", "8")) * _MB)),
+        max_concurrency=max(1, int(os.getenv("STORAGE_UPLOAD_CONCURRENCY", "4"))),
+        use_threads=True,
+    )
+    s3.upload_file(str(path), settings.r2_bucket, object_key, ExtraArgs={"ContentType": content_type}, Config=config)
+    return build_r2_public_url(
+        object_key,
+        r2_public_base_url=settings.r2_public_base_url,
+        r2_bucket=settings.r2_bucket,
+        r2_account_id=settings.r2_account_id,
+    )
+
+
+def _is_conflict(resp: httpx.Response) -> bool:
+    if resp.status_code == 409:
+        return True
+    text = resp.text.lower() if resp.status_code == 400 else ""
+    return "duplicate" in text or "already exists" in text
+
+
+def _supabase_standard_upload(http: httpx.Client, base: str, headers: dict, bucket: str,
+                              path: Path, object_key: str, content_type: str, upsert: bool) -> None:
+    url = f"{base}/storage/v1/object/{bucket}/{object_key}"
+    req_headers = {**headers, "content-type": content_type, "x-upsert": "true" if upsert else "false"}
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            # 传入文件对象：httpx 按 64KB 分块读取，并根据文件大小设置 Content-Length
+            with open(path, "rb") as f:
+                resp = http.post(url, content=f, headers=req_headers)
+            if _is_conflict(resp):
+                raise ObjectExistsError(object_key)
+            resp.raise_for_status()
+            return
+        except ObjectExistsError:
+            raise
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            if attempt >= _part_retries() or (isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500):
+                raise
+            logger.warning(f"[storage] 上传失败，重试({attempt}): key={object_key}, error={e}")
+            time.sleep(_backoff(attempt))
+
+
+def _tus_metadata(**fields: str) -> str:
+    return ",".join(f"{k} {base64.b64encode(v.encode('utf-8')).decode('ascii')}" for k, v in fields.items())
+
+
+def _supabase_resumable_upload(http: httpx.Client, base: str, headers: dict, bucket: str,
+                               path: Path, object_key: str, content_type: str, upsert: bool) -> None:
+    size = path.stat().st_size
+    tus_headers = {**headers, "Tus-Resumable": "1.0.0"}
+    create = http.post(
+        f"{base}/storage/v1/upload/resumable",
+        headers={
+            **tus_headers,
+            "Upload-Length": str(size),
+            "Upload-Metadata": _tus_metadata(bucketName=bucket, objectName=object_key, contentType=content_type),
+            "x-upsert": "true" if upsert else "false",
+        },
+    )
+    if _is_conflict(create):
+        raise ObjectExistsError(object_key)
+    create.raise_for_status()
+    location = create.headers["location"]
+    if location.startswith("/"):
+        location = base + location
+
+    offset = 0
+    with open(path, "rb") as f:
+        while offset < size:
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    f.seek(offset)
+                    chunk = f.read(_TUS_CHUNK_SIZE)
+                    resp = http.patch(
+                        location,
+                        content=chunk,
+                        headers={
+                            **tus_headers,
+                            "Upload-Offset": str(offset),
+                            "Content-Type": "application/offset+octet-stream",
+                        },
+                    )
+                    if _is_conflict(resp):
+                        raise ObjectExistsError(object_key)
+                    resp.raise_for_status()
+                    offset = int(resp.headers.get("upload-offset", offset + len(chunk)))
+                    break
+                except ObjectExistsError:
+                    raise
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    if attempt >= _part_retries():
+                        raise
+                    logger.warning(f"[storage] 分片上传失败，重试({attempt}): key={object_key}, offset={offset}, error={e}")
+                    time.sleep(_backoff(attempt))
+                    # 服务端可能已收到部分数据：以服务端记录的偏移续传
+                    try:
+                        head = http.head(location, headers=tus_headers)
+                        if head.status_code < 400 and "upload-offset" in head.headers:
+                            offset = int(head.headers["upload-offset"])
+                    except httpx.HTTPError:
+                        pass
+
+
+def upload_to_supabase(path: Path, object_key: str, content_type: str, *,
+                       bucket: str, supabase_url: Optional[str] = None, key: Optional[str] = None,
+                       upsert: bool = False) -> str:
+    """流式上传到 Supabase Storage，大文件走可续传上传，返回公开 URL。
+
+    对象已存在时抛出 ObjectExistsError。
+    """
+    if supabase_url is None or key is None:
+        settings = get_app_settings()
+        supabase_url = supabase_url or settings.supabase_url
+        key = key or settings.supabase_key
+    base = supabase_url.rstrip("/")
+    headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+    http = _get_http()
+    threshold = int(float(os.getenv("STORAGE_RESUMABLE_THRESHOLD_MB", "6")) * _MB)
+    if path.stat().st_size > threshold:
+        _supabase_resumable_upload(http, base, headers, bucket, path, object_key, content_type, upsert)
+    else:
+        _supabase_standard_upload(http, base, headers, bucket, path, object_key, content_type, upsert)
+    return build_supabase_public_url(object_key, supabase_url=base, bucket=bucket)
+
+
+def _r2_fallback_enabled() -> bool:
+    return os.getenv("STORAGE_R2_FALLBACK", "0").lower() in ("1", "true", "yes")
+
+
+def upload_original(path: Path, object_key: str, content_type: str) -> Optional[str]:
+    """上传简历原件到 Supabase Storage（配置了桶名时）；未配置时返回 None。
+
+    STORAGE_R2_FALLBACK=1 且未配置桶名时改为上传到 R2。
+    """
+    settings = get_app_settings()
+    if settings.supabase_storage_bucket:
+        return upload_to_supabase(path, object_key, content_type, bucket=settings.supabase_storage_bucket)
+    if _r2_fallback_enabled() and _r2_configured(settings):
+        return upload_to_r2(path, object_key, content_type)
+    return None
@@ -0,0 +1,151 @@
+"""
+进程内标签字典（tags 表缓存）
+
+解析每份简历都要读取整张 tags 表并重建标签集合，/tags 接口也每次查库。这里把 tags 表加载为只读快照：
+- 预先计算 技术类/非技术类 集合与标签自动机（见 aho_corasick），解析器与 /tags 接口共用
+- 每隔 TAG_DICT_CHECK_SECONDS（默认 30）秒只查询 (行数, 最大 updated_at) 作为版本，变化时重新加载；
+  无论版本是否变化，快照存在超过 TAG_DICT_TTL（默认 600）秒都会重新加载
+- /tags 接口每次请求都立即比对版本，新写入的标签马上可见；行按数据库的 tag_name 排序保存
+- 重新加载期间其他线程继续使用旧快照；加载失败时沿用旧快照，首次加载失败则抛出异常
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from .aho_corasick import Automaton
+from .db import get_supabase_client
+
+
+logger = logging.getLogger("tag_dictionary")
+
+_PAGE_SIZE = 1000
+
+
+class TagDictionary:
+    """tags 表的只读快照。"""
+
+    def __init__(self, rows: List[Dict[str, Any]], version: str) -> None:
+        # 保持数据库返回的 tag_name 顺序（按库的排序规则，与原 /tags 接口一致）
+        self.rows = rows
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.tags: List[str] = [str(r["tag_name"]).strip() for r in self.rows if r.get("tag_name")]
+        self.tag_set: FrozenSet[str] = frozenset(self.tags)
+        self.tech: FrozenSet[str] = frozenset(
+            str(r["tag_name"]).strip() for r in self.rows if r.get("tag_name") and r.get("category") == "技术类"
+        )
+        self.nontech: FrozenSet[str] = frozenset(
+            str(r["tag_name"]).strip() for r in self.rows if r.get("tag_name") and r.get("category") == "非技术类"
+        )
+        self._automaton: Optional[Automaton] = None
+        self._automaton_lock = threading.Lock()
+
+    @property
+    def automaton(self) -> Automaton:
+        """全部标签编译成的多模式串自动机，每个快照首次使用时构建一次。"""
+        with self._automaton_lock:
+            if self._automaton is None:
+                self._automaton = Automaton(self.tags)
+            return self._automaton
+
+    def direct_matches(self, text: str) -> set:
+        """正文中直接出现（大小写、全半角不敏感）的标签，单次扫描全文。"""
+        return self.automaton.matched(text)
+
+    def list_rows(self, category: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按 tag_name 排序的行，供 /tags 接口使用。"""
+        rows = [r for r in self.rows if r.get("category") == category] if category else self.rows
+        return rows[:limit] if limit is not None else list(rows)
+
+
+def _fetch_version(client: Any) -> str:
+    counted = client.table("tags").select("id", count="exact").limit(1).execute()
+    # updated_at 可为空，降序时 NULL 排在最前；只在非空行中取最新时间
+    res = (
+        client.table("tags")
+        .select("updated_at")
+        .not_.is_("updated_at", "null")
+        .order("updated_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    data = getattr(res, "data", []) or []
+    return f"{getattr(counted, 'count', None)}:{data[0].get('updated_at') if data else None}"
+
+
+def _fetch_rows(client: Any) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    # 按页读取，避免服务端单次返回行数上限截断标签表
+    while True:
+        # 按 tag_name 排序（id 保证分页稳定），/tags 直接沿用该顺序
+        res = client.table("tags").select("*").order("tag_name").order("id").range(len(rows), len(rows) + _PAGE_SIZE - 1).execute()
+        page = getattr(res, "data", []) or []
+        rows.extend(page)
+        if len(page) < _PAGE_SIZE:
+            return rows
+
+
+_snapshot: Optional[TagDictionary] = None
+_checked_at = 0.0
+_state_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_reloads = 0
+
+
+def get_tag_dictionary(force_check: bool = False) -> TagDictionary:
+    """返回当前标签字典快照，必要时检查版本并重新加载。
+
+    force_check=True 时忽略检查间隔、立即比对版本（/tags 接口使用，保证新写入的标签立刻可见）。
+    """
+    global _snapshot, _checked_at, _reloads
+    check_every = 0.0 if force_check else float(os.getenv("TAG_DICT_CHECK_SECONDS", "30"))
+    ttl = float(os.getenv("TAG_DICT_TTL", "600"))
+    with _state_lock:
+        snapshot = _snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - _checked_at < check_every and now - snapshot.loaded_at < ttl:
+            return snapshot
+    # 已有快照时不等待正在进行的刷新，直接返回旧快照（force_check 时等待刷新完成）
+    if not _refresh_lock.acquire(blocking=snapshot is None or force_check):
+        return snapshot  # type: ignore[return-value]
+    try:
+        with _state_lock:
+            if _snapshot is not None and _snapshot is not snapshot:
+                return _snapshot
+        try:
+            client = get_supabase_client()
+            version = _fetch_version(client)
+            if snapshot is not None and version == snapshot.version and time.monotonic() - snapshot.loaded_at < ttl:
+                fresh = snapshot
+            else:
+                fresh = TagDictionary(_fetch_rows(client), version)
+                logger.info(f"标签字典已加载：{len(fresh.tags)} 个标签，版本 {version}")
+        except Exception as e:
+            if snapshot is None:
+                raise
+            logger.warning(f"标签字典刷新失败，沿用旧版本：{e}")
+            fresh = snapshot
+        with _state_lock:
+            if fresh is not snapshot:
+                _reloads += 1
+            _snapshot = fresh
+            _checked_at = time.monotonic()
+        return fresh
+    finally:
+        _refresh_lock.release()
+
+
+def tag_dictionary_stats() -> Dict[str, Any]:
+    with _state_lock:
+        snapshot = _snapshot
+        return {
+            "tags": len(snapshot.tags) if snapshot else 0,
+            "version": snapshot.version if snapshot else None,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+            "reloads": _reloads,
+        }
@@ -0,0 +1,139 @@
+"""
+标签候选预筛（字符 n-gram TF-IDF）
+
+tags 表增长到上千个标签后，把所有未直接命中的标签逐条放进提示词会让每份简历的输入 token
+与延迟线性增长。这里先在本地按与简历文本的相似度给标签排序，只把前 K 个交给 LLM：
+- 每个标签按字符 1~3-gram 建 TF-IDF 向量（IDF 以标签为文档计算），行向量 L2 归一化
+- 以倒排表（n-gram -> 标签下标、权重）存为 NumPy 数组，查询时 bincount 累加得分
+- 索引按标签表版本（内容哈希）缓存；版本变化后至少间隔 TAG_INDEX_REFRESH_SECONDS 才重建
+K 由 TAG_PREFILTER_TOP_K 配置（0 表示不预筛）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+_NGRAM_RANGE = (1, 3)
+_TOKEN_RE = re.compile(r"[\u4e00-\u9fff]+|[a-z0-9+#.]+")
+
+
+def _ngrams(text: str) -> Counter:
+    """中文按字符 1~3-gram；英文/数字按词内字符 2~3-gram（加边界符），并保留整词。"""
+    grams: Counter = Counter()
+    lo, hi = _NGRAM_RANGE
+    for tok in _TOKEN_RE.findall(text.lower()):
+        start = lo
+        if tok.isascii():
+            grams[tok] += 1
+            tok = f" {tok} "
+            start = max(lo, 2)
+        for n in range(start, hi + 1):
+            for i in range(len(tok) - n + 1):
+                gram = tok[i:i + n]
+                if gram.strip():
+                    grams[gram] += 1
+    return grams
+
+
+def tag_table_version(tags: Sequence[str]) -> str:
+    return hashlib.sha1("\n".join(sorted(tags)).encode("utf-8")).hexdigest()
+
+
+class TagIndex:
+    """标签 TF-IDF 倒排索引。"""
+
+    def __init__(self, tags: Sequence[str], version: Optional[str] = None) -> None:
+        self.tags: List[str] = list(tags)
+        self.version = version or tag_table_version(self.tags)
+        tag_grams = [_ngrams(t) for t in self.tags]
+        df: Counter = Counter()
+        for grams in tag_grams:
+            df.update(grams.keys())
+        n_docs = max(1, len(self.tags))
+        self.vocab: Dict[str, int] = {g: i for i, g in enumerate(df)}
+        self.idf = np.array([math.log((1 + n_docs) / (1 + df[g])) + 1.0 for g in self.vocab], dtype=np.float32)
+
+        # 倒排表：按 n-gram 分组的 (标签下标, 权重)，offsets[j]:offsets[j+1] 为第 j 个 n-gram 的区间
+        postings: List[List[tuple]] = [[] for _ in self.vocab]
+        for doc, grams in enumerate(tag_grams):
+            weights = {self.vocab[g]: (1.0 + math.log(c)) * self.idf[self.vocab[g]] for g, c in grams.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for j, w in weights.items():
+                postings[j].append((doc, w / norm))
+        counts = np.array([len(p) for p in postings], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        flat = [x for p in postings for x in p]
+        self.doc_ids = np.array([d for d, _ in flat], dtype=np.int32)
+        self.weights = np.array([w for _, w in flat], dtype=np.float32)
+
+    def scores(self, text: str) -> np.ndarray:
+        """各标签与文本的相似度（文本向量未归一化，不影响排序）。"""
+        grams = _ngrams(text)
+        cols, q = [], []
+        for g, c in grams.items():
+            j = self.vocab.get(g)
+            if j is not None:
+                cols.append(j)
+                q.append((1.0 + math.log(c)) * self.idf[j])
+        if not cols:
+            return np.zeros(len(self.tags), dtype=np.float32)
+        cols_arr = np.array(cols, dtype=np.int64)
+        starts, ends = self.offsets[cols_arr], self.offsets[cols_arr + 1]
+        lengths = ends - starts
+        # 展开所有命中 n-gram 的倒排区间
+        idx = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+        contrib = self.weights[idx] * np.repeat(np.array(q, dtype=np.float32), lengths)
+        return np.bincount(self.doc_ids[idx], weights=contrib, minlength=len(self.tags)).astype(np.float32)
+
+    def top_k(self, text: str, k: int, candidates: Optional[Iterable[str]] = None) -> List[str]:
+        """返回与文本最相关的 k 个标签（限定在 candidates 内，按得分降序，零分不返回）。"""
+        scores = self.scores(text)
+        if candidates is not None:
+            allowed = set(candidates)
+            mask = np.fromiter((t in allowed for t in self.tags), dtype=bool, count=len(self.tags))
+            scores = np.where(mask, scores, 0.0)
+        k = min(k, int((scores > 0).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.tags[i] for i in top]
+
+
+_index: Optional[TagIndex] = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_tag_index(tags: Sequence[str], version: Optional[str] = None) -> TagIndex:
+    """按标签表版本复用索引；版本变化且距上次构建超过 TAG_INDEX_REFRESH_SECONDS 时重建。
+
+    version 缺省时按标签内容哈希计算（标签字典传入其自身版本，省去每次哈希整张表）。
+    """
+    global _index, _index_built_at
+    refresh = float(os.getenv("TAG_INDEX_REFRESH_SECONDS", "0"))
+    version = version or tag_table_version(tags)
+    with _index_lock:
+        stale = _index is None or (_index.version != version and time.monotonic() - _index_built_at >= refresh)
+        if stale:
+            _index = TagIndex(tags, version)
+            _index_built_at = time.monotonic()
+        return _index
+
+
+def prefilter_tags(text: str, all_tags: Sequence[str], candidates: Sequence[str], version: Optional[str] = None) -> List[str]:
+    """从 candidates 中选出与简历最相关的 TAG_PREFILTER_TOP_K 个；候选不多于 K 时原样返回。"""
+    k = int(os.getenv("TAG_PREFILTER_TOP_K", "80"))
+    if k <= 0 or len(candidates) <= k:
+        return list(candidates)
+    return get_tag_index(all_tags, version).top_k(text, k, candidates)
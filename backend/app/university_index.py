@@ -0,0 +1,92 @@
+"""
+院校名单索引
+
+UniversityClassifier 原先对每所学校先在名单列表中逐个比较，再对 985/211/双一流 名单逐条计算
+difflib.SequenceMatcher 相似度，每份简历的每所学校都要做上百次平方复杂度的比较。这里预先建立：
+- 精确查找：名称（合并空白）-> 层次 的哈希表，别名表直接折叠进同一张表，一次查表即可
+- 模糊查找：按名单建立字符倒排索引，先用字符重合数给出候选短名单，只对短名单计算 SequenceMatcher
+SequenceMatcher.ratio() = 2M / (len(a) + len(b))，匹配字符数 M 不超过两串的字符多重集交集大小，
+因此交集算出的上界低于阈值的名称不可能达到阈值，剔除它们不会改变匹配结果。
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class FuzzyNameIndex:
+    """一份名单的字符倒排索引，best_match 与逐条 SequenceMatcher 比较的结果一致。"""
+
+    def __init__(self, names: Sequence[str]) -> None:
+        self.names = list(names)
+        self._lowered = [n.lower() for n in self.names]
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for i, name in enumerate(self._lowered):
+            for ch, count in Counter(name).items():
+                self._postings[ch].append((i, count))
+
+    def shortlist(self, target: str, threshold: float) -> List[int]:
+        """相似度上界不低于 threshold 的名称下标（按名单原顺序）。"""
+        target_l = target.lower()
+        common: Dict[int, int] = defaultdict(int)
+        for ch, count in Counter(target_l).items():
+            for i, c in self._postings.get(ch, ()):
+                common[i] += min(count, c)
+        total = len(target_l)
+        return sorted(i for i, m in common.items() if 2.0 * m / (total + len(self._lowered[i])) >= threshold)
+
+    def best_match(self, target: str, threshold: float = 0.8) -> Optional[str]:
+        target_l = target.lower()
+        best_ratio = 0.0
+        best_match = None
+        for i in self.shortlist(target, threshold):
+            r = SequenceMatcher(None, target_l, self._lowered[i]).ratio()
+            if r > best_ratio and r >= threshold:
+                best_ratio = r
+                best_match = self.names[i]
+        return best_match
+
+
+class UniversityLookup:
+    """按层次顺序（如 985 -> 211 -> 双一流）查找院校：先查精确表（含别名），再逐层模糊匹配。"""
+
+    def __init__(self, tiers: Sequence[Tuple[str, Sequence[str]]], aliases: Dict[str, str], threshold: float = 0.8) -> None:
+        self.aliases = dict(aliases)
+        self.threshold = threshold
+        self._exact: Dict[str, str] = {}
+        self._fuzzy: List[Tuple[str, FuzzyNameIndex]] = []
+        for tier, names in tiers:
+            for name in names:
+                # 同一所学校出现在多份名单时取靠前的层次
+                self._exact.setdefault(name, tier)
+            self._fuzzy.append((tier, FuzzyNameIndex(names)))
+        # 别名先于名单生效：别名的层次即其标准名称的层次（标准名称不在名单内时别名也不算精确命中）
+        for alias, canonical in self.aliases.items():
+            if canonical in self._exact:
+                self._exact[alias] = self._exact[canonical]
+            else:
+                self._exact.pop(alias, None)
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return re.sub(r'\s+', ' ', name.strip()) if name else ''
+
+    def normalize(self, name: str) -> str:
+        """合并空白并按别名表映射为标准名称。"""
+        key = self._key(name)
+        return self.aliases.get(key, key)
+
+    def lookup(self, name: str) -> Tuple[str, Optional[str]]:
+        """返回 (标准名称, 层次)；名单内无匹配时层次为 None。"""
+        key = self._key(name)
+        normalized = self.aliases.get(key, key)
+        tier = self._exact.get(key)
+        if tier is not None:
+            return normalized, tier
+        for tier, index in self._fuzzy:
+            if index.best_match(normalized, self.threshold):
+                return normalized, tier
+        return normalized, None
@@ -1,48 +1,100 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+import sys
 import threading
-import time
+from dataclasses import dataclass
 from pathlib import Path
 import shutil
 import time as _time
 
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import httpx
-import certifi
 
-from . import UPLOAD_DIRS, build_r2_public_url, build_supabase_public_url
+from . import UPLOAD_DIRS
 from .db import get_supabase_client
+from .dedup import content_sha256_supported, file_sha256, get_fingerprint_store
+from .jobqueue import Job, get_job_queue
+from .llm import track_llm_tokens
 from .ocr import MinerUProcessor
 from .parser import parse_resume
-from .config import get_app_settings
+from .pipeline import Stage
+from .puller import AsyncPuller
+from .storage import upload_original
 
 import mimetypes
 import unicodedata
 import re
 import time as _ts
 import uuid as _uuid
-from concurrent.futures import ThreadPoolExecutor
 
 
 logger = logging.getLogger("upload_watcher")
 if not logger.handlers:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
 
+SUPPORTED_EXTS = {".pdf", ".doc", ".docx", ".txt"}
+# 生产者写入中的临时文件后缀，写完后原子重命名为正式文件名
+PART_SUFFIX = ".part"
+# done/failed 任务保留 7 天，处理循环每小时清理一次
+_FINISHED_RETENTION = 7 * 24 * 3600
+_PURGE_INTERVAL = 3600.0
+_HAS_CLOSE_EVENTS = sys.platform.startswith("linux")
+
+
+@dataclass
+class FileTask:
+    """在各处理阶段之间传递的单个文件任务。"""
+    job: Job
+    path: Path
+    rf_id: int | None = None
+    sha256: str | None = None
+    text_content: str | None = None
+    ocr_seconds: float = 0.0
+    row: dict | None = None
+    uploaded_url: str | None = None
+    archived_path: Path | None = None
+    # OCR 阶段内已结束（成功/失败）或已交给解析阶段；批处理异常时不再标记失败
+    settled: bool = False
+
 
 class UploadDirEventHandler(FileSystemEventHandler):
     def __init__(self) -> None:
         super().__init__()
         self.processor = MinerUProcessor()
-        # 批处理触发信号：检测到新 PDF 或定时轮询触发
-        self.batch_signal = threading.Event()
-        # 并发设置
+        # 待处理文件统一由本地持久化队列驱动（/upload、拉取循环、目录事件均入队）
+        self.queue = get_job_queue()
+        # 内容指纹：重复文件直接复用已有 OCR 文本/解析结果
+        self.fingerprints = get_fingerprint_store()
+        # 并发设置：OCR → 解析 → 上传 → 写库 各阶段独立 worker 数，阶段间为有界队列（背压）
         self.max_workers = max(1, int(os.getenv("WATCHER_CONCURRENCY", "3")))
-        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
-        self._in_progress: set[str] = set()
-        self._in_progress_lock = threading.Lock()
+        queue_size = max(1, int(os.getenv("WATCHER_STAGE_QUEUE_SIZE", "16")))
+        # OCR 微批：在时间窗口内凑批（或达到批大小上限）后一次调用 MinerU；批大小为 1 时关闭
+        self.ocr_batch_size = max(1, int(os.getenv("WATCHER_OCR_BATCH_SIZE", "8")))
+        self.ocr_batch_window = max(0.0, float(os.getenv("WATCHER_OCR_BATCH_WINDOW", "2.0")))
+        self.ocr_stage: Stage[list[FileTask]] = Stage(
+            "ocr", self._stage_ocr,
+            workers=int(os.getenv("WATCHER_OCR_WORKERS", str(self.max_workers))),
+            maxsize=max(1, queue_size // self.ocr_batch_size),
+            on_error=lambda tasks, e: [self._fail(t, e) for t in tasks if not t.settled],
+        )
+        self.parse_stage: Stage[FileTask] = Stage(
+            "parse", self._stage_parse,
+            workers=int(os.getenv("WATCHER_PARSE_WORKERS", str(self.max_workers))),
+            maxsize=queue_size, on_error=self._fail,
+        )
+        self.upload_stage: Stage[FileTask] = Stage(
+            "upload", self._stage_upload,
+            workers=int(os.getenv("WATCHER_UPLOAD_WORKERS", "2")),
+            maxsize=queue_size, on_error=self._fail,
+        )
+        self.commit_stage: Stage[FileTask] = Stage(
+            "commit", self._stage_commit,
+            workers=int(os.getenv("WATCHER_COMMIT_WORKERS", "2")),
+            maxsize=queue_size, on_error=self._fail,
+        )
 
     @staticmethod
     def _sanitize_name(filename: str) -> tuple[str, str]:
@@ -65,204 +117,437 @@ class UploadDirEventHandler(FileSystemEventHandler):
         uniq = f"{int(_ts.time())}_{_uuid.uuid4().hex[:8]}"
         return f"original/{uniq}_{base_s}.{ext_s}"
 
+    # 写入完成判定：
+    # - 本系统的生产者（/upload、拉取任务）先写 <文件名>.part，写完后原子重命名并自行入队（带 resume_file_id），
+    #   因此由 .part 重命名而来的事件直接忽略
+    # - 其他方式放入的文件：Linux 下以 inotify IN_CLOSE_WRITE（on_closed）/ IN_MOVED_TO（on_moved）为准；
+    #   其他平台没有关闭事件，退回到 on_created
     def on_created(self, event):
+        if event.is_directory or _HAS_CLOSE_EVENTS:
+            return
+        self._enqueue_event_path(Path(event.src_path))
+
+    def on_closed(self, event):
         if event.is_directory:
             return
-        path = Path(event.src_path)
-        if path.suffix.lower() == ".pdf":
-            # 仅发出批处理信号，不做即时处理
-            self.batch_signal.set()
+        self._enqueue_event_path(Path(event.src_path))
 
     def on_moved(self, event):
         if getattr(event, "is_directory", False):
             return
-        path = Path(event.dest_path)
-        if path.suffix.lower() == ".pdf":
-            self.batch_signal.set()
-
-    def _handle_file(self, path: Path):
-        ext = path.suffix.lower()
-        if ext not in {".pdf", ".doc", ".docx", ".txt"}:
+        if str(event.src_path).endswith(PART_SUFFIX):
             return
-        # 等待写入完成
-        for _ in range(50):  # 最多等待 ~5s
-            try:
-                size_a = path.stat().st_size
-                time.sleep(0.1)
-                size_b = path.stat().st_size
-                if size_a == size_b:
-                    break
-            except FileNotFoundError:
-                return
+        self._enqueue_event_path(Path(event.dest_path))
+
+    def _enqueue_event_path(self, path: Path) -> None:
+        if path.suffix.lower() in SUPPORTED_EXTS and path.parent == UPLOAD_DIRS["processing"]:
+            self.queue.enqueue(path)
+
+    def enqueue_existing(self) -> int:
+        """启动时一次性对账：把 processing 目录中已存在的文件补入队列（已在队列中的会被忽略）。"""
+        processing_dir = UPLOAD_DIRS["processing"]
+        count = 0
+        for p in sorted(processing_dir.iterdir()):
+            if p.is_file() and p.name.endswith(PART_SUFFIX):
+                # 上次退出时未写完的临时文件：由生产者重新上传/拉取
+                p.unlink(missing_ok=True)
+            elif p.is_file() and p.suffix.lower() in SUPPORTED_EXTS:
+                self.queue.enqueue(p)
+                count += 1
+        return count
+
+    @staticmethod
+    def _archive_local(path: Path) -> Path:
+        """移动到 completed 目录作为本地备份（重名追加后缀），失败时返回原路径。"""
+        target_dir = UPLOAD_DIRS["completed"]
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target_path = target_dir / path.name
+        if target_path.exists():
+            base = target_path.stem
+            ext = target_path.suffix
+            counter = 1
+            while (target_dir / f"{base}_{counter}{ext}").exists():
+                counter += 1
+            target_path = target_dir / f"{base}_{counter}{ext}"
+        try:
+            path.replace(target_path)
+        except Exception:
+            target_path = path
+        return target_path
+
+    def _reuse_duplicate(self, client, path: Path, rf_id: int, sha256: str) -> bool:
+        """若相同内容已处理过且存在 resumes 行，则复制该行并直接完成，返回 True。"""
+        known = self.fingerprints.get(sha256)
+        src_rf_id: int | None = known.resume_file_id if known else None
+        src_file_path = ""
+        if src_rf_id == rf_id:
+            return False
+        if src_rf_id is None:
+            if not content_sha256_supported():
+                return False
+            res = (
+                client.table("resume_files")
+                .select("id,file_path")
+                .eq("content_sha256", sha256)
+                .eq("status", "已处理")
+                .neq("id", rf_id)
+                .order("id")
+                .limit(1)
+                .execute()
+            )
+            data = getattr(res, "data", []) or []
+            if not data:
+                return False
+            src_rf_id = data[0]["id"]
+            src_file_path = data[0].get("file_path") or ""
+        else:
+            res = client.table("resume_files").select("file_path").eq("id", src_rf_id).limit(1).execute()
+            data = getattr(res, "data", []) or []
+            src_file_path = (data[0].get("file_path") or "") if data else ""
+
+        res = client.table("resumes").select("*").eq("resume_file_id", src_rf_id).limit(1).execute()
+        rows = getattr(res, "data", []) or []
+        if not rows:
+            return False
+        row = {k: v for k, v in rows[0].items() if k not in ("id", "created_at", "updated_at")}
+        row["resume_file_id"] = rf_id
+
+        target_path = self._archive_local(path)
+        update_payload = {"status": "已处理", "file_path": src_file_path}
+        if content_sha256_supported():
+            update_payload["content_sha256"] = sha256
+        if target_path.name != path.name:
+            update_payload["file_name"] = target_path.name
+        client.table("resume_files").update(update_payload).eq("id", rf_id).execute()
+        exists = client.table("resumes").select("id").eq("resume_file_id", rf_id).limit(1).execute()
+        if not (getattr(exists, "data", []) or []):
+            client.table("resumes").insert(row).execute()
+
+        self.fingerprints.add_savings(
+            ocr_seconds=known.ocr_seconds if known else 0.0,
+            llm_tokens=known.llm_tokens if known else 0,
+        )
+        logger.info(f"[watcher] 内容重复，复用 resume_file_id={src_rf_id} 的解析结果: file={path.name}, rf_id={rf_id}")
+        return True
+
+    def _prepare(self, task: FileTask) -> bool:
+        """定位 resume_files 记录并标记处理中、指纹去重。返回是否需要继续后续阶段。
+
+        入队的文件都已写入完成（见 on_closed / on_moved），无需再等待。
+        """
+        path = task.path
+        if not path.exists():
+            self._finish(task, False, "文件不存在")
+            return False
         logger.info(f"检测到新文件: {path.name}")
 
         # 仅处理来源于数据库/远程拉取的文件：要求 resume_files 已存在
         client = get_supabase_client()
-        rf_id: int | None = None
         try:
-            rf = client.table("resume_files").select("id").eq("file_name", path.name).limit(1).execute()
-            data = getattr(rf, "data", []) or []
-            if data:
-                rf_id = data[0]["id"]
-                client.table("resume_files").update({"status": "处理中"}).eq("id", rf_id).execute()
+            if task.rf_id is None:
+                rf = client.table("resume_files").select("id").eq("file_name", path.name).limit(1).execute()
+                data = getattr(rf, "data", []) or []
+                if data:
+                    task.rf_id = data[0]["id"]
+            if task.rf_id is not None:
+                client.table("resume_files").update({"status": "处理中"}).eq("id", task.rf_id).execute()
             else:
                 logger.warning(f"[watcher] 跳过本地孤立文件（无对应 resume_files 记录）: {path.name}")
-                return
-            logger.info(f"[watcher] 标记处理中: file={path.name}, rf_id={rf_id}")
+                self.queue.mark_failed(task.job.id, "无对应 resume_files 记录")
+                return False
+            logger.info(f"[watcher] 标记处理中: file={path.name}, rf_id={task.rf_id}")
         except Exception as e:
             logger.error(f"[watcher] 标记/创建处理中失败: file={path.name}, error={e}")
 
-        # OCR 提取 → 解析 → 上传存储 → 写库
+        # 内容指纹：重复内容直接复用已有结果 / OCR 文本
         try:
-            # 若上面未成功拿到 rf_id，这里再兜底查一次
-            if rf_id is None:
-                rf = client.table("resume_files").select("id").eq("file_name", path.name).limit(1).execute()
-                data = getattr(rf, "data", [])
-                if data:
-                    rf_id = data[0]["id"]
-
-            # 1) OCR / 读取
-            text_content: str | None = None
-            if ext == ".pdf":
-                text_content = self.processor.process_pdf(path)
-                self.processor.cleanup_temp_files(path)
+            task.sha256 = file_sha256(path)
+            if task.rf_id is not None and self._reuse_duplicate(client, path, task.rf_id, task.sha256):
+                self._finish(task, True)
+                return False
+        except Exception as de:
+            logger.warning(f"[watcher] 指纹去重检查失败，按新文件处理: file={path.name}, error={de}")
+        known = self.fingerprints.get(task.sha256) if task.sha256 else None
+        if known and known.ocr_text:
+            task.text_content = known.ocr_text
+            task.ocr_seconds = known.ocr_seconds
+            self.fingerprints.add_savings(ocr_seconds=known.ocr_seconds)
+            logger.info(f"[watcher] 内容重复，复用已有 OCR 文本: file={path.name}")
+        return True
+
+    def _stage_ocr(self, tasks: list[FileTask]) -> None:
+        """OCR 阶段：准备 → （多个 PDF 时）批量 OCR → 单文件 OCR/读取兜底 → 交给解析阶段。"""
+        ready = []
+        for t in tasks:
+            if self._guard(t, self._prepare):
+                ready.append(t)
             else:
-                try:
-                    text_content = path.read_text(encoding="utf-8", errors="ignore")
-                except Exception:
-                    text_content = None
-
-            if text_content is None:
-                try:
-                    client.table("resume_files").update({"status": "处理失败"}).eq("file_name", path.name).execute()
-                    logger.error(f"[watcher] OCR/读取失败，标记处理失败: file={path.name}")
-                except Exception:
-                    pass
-                return
-
-            # 2) 结构化解析
-            logger.info(f"[watcher] 解析完成，准备上传并写入: file={path.name}, resume_file_id={rf_id}")
-            parsed = parse_resume(text_content, rf_id, file_name=path.name)
-            row = parsed.to_row()
-
-            # 3) 先上传，再写简历
-
-            # 上传到 Supabase Storage（仅当配置了桶名）
-            settings = get_app_settings()
-            uploaded_url: str | None = None
-            if settings.supabase_storage_bucket:
-                client_storage = get_supabase_client().storage.from_(settings.supabase_storage_bucket)
-                # 对象键：original/<文件名>（若冲突自动加后缀）
-                object_key = self._make_unique_object_key(path.name)
-                content_type = mimetypes.guess_type(path.name)[0] or ("application/pdf" if ext == ".pdf" else "application/octet-stream")
-                try:
-                    with open(path, "rb") as fsrc:
-                        data = fsrc.read()
-                    up = client_storage.upload(object_key, data, {"content-type": content_type, "x-upsert": "false"})
-                    if up is False:
-                        raise RuntimeError("upload failed")
-                    uploaded_url = build_supabase_public_url(object_key, supabase_url=settings.supabase_url, bucket=settings.supabase_storage_bucket)
-                    logger.info(f"[watcher] 上传 Supabase Storage 成功: url={uploaded_url}")
-                except Exception as ue:
-                    logger.error(f"[watcher] 上传 Supabase Storage 失败: file={path.name}, error={ue}")
-                    uploaded_url = None
-            else:
-                logger.warning("[watcher] 未配置 SUPABASE_STORAGE_BUCKET，跳过上传，记录将使用本地归档路径")
-
-            # 本地归档（作为备份，可选）
-            target_dir = UPLOAD_DIRS["completed"]
-            target_dir.mkdir(parents=True, exist_ok=True)
-            target_path = target_dir / path.name
-            if target_path.exists():
-                base = target_path.stem
-                ext = target_path.suffix
-                counter = 1
-                while (target_dir / f"{base}_{counter}{ext}").exists():
-                    counter += 1
-                target_path = target_dir / f"{base}_{counter}{ext}"
+                t.settled = True
+        pending_pdfs = [t for t in ready if t.text_content is None and t.path.suffix.lower() == ".pdf"]
+        if len(pending_pdfs) > 1:
+            texts, per_file_seconds = self._ocr_batch([t.path for t in pending_pdfs])
+            for t in pending_pdfs:
+                if t.path in texts:
+                    t.text_content = texts[t.path]
+                    t.ocr_seconds = per_file_seconds
+        for t in ready:
+            if self._guard(t, self._ocr_single):
+                self.parse_stage.put(t)
+            t.settled = True
+
+    def _ocr_single(self, task: FileTask) -> bool:
+        path = task.path
+        if task.text_content is not None:
+            pass
+        elif path.suffix.lower() == ".pdf":
+            started = _time.monotonic()
+            task.text_content = self.processor.process_pdf(path)
+            task.ocr_seconds = _time.monotonic() - started
+            self.processor.cleanup_temp_files(path)
+        else:
             try:
-                path.replace(target_path)
+                task.text_content = path.read_text(encoding="utf-8", errors="ignore")
             except Exception:
-                target_path = path
-
-            # 不论上传是否成功，只要解析成功都要写入 resumes。
-            # files 表统一记录：status 置为已处理，file_path 写入 URL 或空串。
-            update_payload = {"status": "已处理", "file_path": uploaded_url or ""}
-            if rf_id is not None and target_path.name != path.name:
-                update_payload["file_name"] = target_path.name
-
-            if rf_id is not None:
-                client.table("resume_files").update(update_payload).eq("id", rf_id).execute()
+                task.text_content = None
+
+        if task.text_content is None:
+            logger.error(f"[watcher] OCR/读取失败，标记处理失败: file={path.name}")
+            self._finish(task, False, "OCR/读取失败", retry=True)
+            return False
+        return True
+
+    def _stage_parse(self, task: FileTask) -> None:
+        """解析阶段：LLM 结构化解析，并记录指纹对应的 OCR 文本与成本。"""
+        path = task.path
+        with track_llm_tokens() as meter:
+            parsed = parse_resume(task.text_content or "", task.rf_id, file_name=path.name)
+        task.row = parsed.to_row()
+        logger.info(f"[watcher] 解析完成，准备上传并写入: file={path.name}, resume_file_id={task.rf_id}")
+        if task.sha256:
+            self.fingerprints.record(
+                task.sha256,
+                resume_file_id=task.rf_id,
+                ocr_text=task.text_content,
+                ocr_seconds=task.ocr_seconds,
+                llm_tokens=meter.total_tokens,
+            )
+        self.upload_stage.put(task)
+
+    def _stage_upload(self, task: FileTask) -> None:
+        """上传阶段：原件流式上传到 Supabase Storage 或 R2（已配置时），随后本地归档。"""
+        path = task.path
+        ext = path.suffix.lower()
+        # 对象键：original/<时间戳>_<随机>_<文件名>
+        object_key = self._make_unique_object_key(path.name)
+        content_type = mimetypes.guess_type(path.name)[0] or ("application/pdf" if ext == ".pdf" else "application/octet-stream")
+        try:
+            # 从磁盘流式上传，大文件分片/分段上传
+            task.uploaded_url = upload_original(path, object_key, content_type)
+            if task.uploaded_url:
+                logger.info(f"[watcher] 上传存储成功: url={task.uploaded_url}")
             else:
-                client.table("resume_files").update(update_payload).eq("file_name", path.name).execute()
-            logger.info(f"[watcher] 更新 resume_files 成功: file={path.name}, url={uploaded_url or ''}")
+                logger.warning("[watcher] 未配置 SUPABASE_STORAGE_BUCKET 或 R2，跳过上传，记录将使用本地归档路径")
+        except Exception as ue:
+            logger.error(f"[watcher] 上传存储失败: file={path.name}, error={ue}")
+            task.uploaded_url = None
+
+        # 本地归档（作为备份，可选）
+        task.archived_path = self._archive_local(path)
+        self.commit_stage.put(task)
+
+    def _stage_commit(self, task: FileTask) -> None:
+        """写库阶段：更新 resume_files，写入 resumes（若已存在则不重复写入）。"""
+        path = task.path
+        client = get_supabase_client()
+        target_path = task.archived_path or path
+
+        # 不论上传是否成功，只要解析成功都要写入 resumes。
+        # files 表统一记录：status 置为已处理，file_path 写入 URL 或空串。
+        update_payload = {"status": "已处理", "file_path": task.uploaded_url or ""}
+        if task.sha256 and content_sha256_supported():
+            update_payload["content_sha256"] = task.sha256
+        if task.rf_id is not None and target_path.name != path.name:
+            update_payload["file_name"] = target_path.name
+
+        if task.rf_id is not None:
+            client.table("resume_files").update(update_payload).eq("id", task.rf_id).execute()
+        else:
+            client.table("resume_files").update(update_payload).eq("file_name", path.name).execute()
+        logger.info(f"[watcher] 更新 resume_files 成功: file={path.name}, url={task.uploaded_url or ''}")
 
-            # 4) 写入 resumes（若已存在则不重复写入）
-            try:
-                if rf_id is not None:
-                    exists = client.table("resumes").select("id").eq("resume_file_id", rf_id).limit(1).execute()
-                    if not (getattr(exists, "data", []) or []):
-                        client.table("resumes").insert(row).execute()
-                        logger.info(f"[watcher] 写入 resumes 成功: file={path.name}")
-                else:
-                    client.table("resumes").insert(row).execute()
-                    logger.info(f"[watcher] 写入 resumes 成功(无rf_id): file={path.name}")
-            except Exception as ie:
-                logger.error(f"[watcher] 写入 resumes 失败: {path.name}: {ie}")
+        try:
+            if task.rf_id is not None:
+                exists = client.table("resumes").select("id").eq("resume_file_id", task.rf_id).limit(1).execute()
+                if not (getattr(exists, "data", []) or []):
+                    client.table("resumes").insert(task.row).execute()
+                    logger.info(f"[watcher] 写入 resumes 成功: file={path.name}")
+            else:
+                client.table("resumes").insert(task.row).execute()
+                logger.info(f"[watcher] 写入 resumes 成功(无rf_id): file={path.name}")
+        except Exception as ie:
+            logger.error(f"[watcher] 写入 resumes 失败: {path.name}: {ie}")
+        self._finish(task, True)
+
+    def _guard(self, task: FileTask, fn) -> bool:
+        """在批内逐个执行，单个文件的异常不影响同批其他文件。"""
+        try:
+            return fn(task)
         except Exception as e:
-            logger.error(f"[watcher] 处理失败: file={path.name}, error={e}")
+            self._fail(task, e)
+            return False
+
+    def _fail(self, task: FileTask, error: Exception) -> None:
+        logger.error(f"[watcher] 处理失败: file={task.path.name}, error={error}")
+        self._finish(task, False, str(error), retry=True)
+
+    def _finish(self, task: FileTask, ok: bool, error: str | None = None, retry: bool = False) -> None:
+        """结束任务：更新队列状态；失败时把 resume_files 标记为处理失败。
+
+        retry=True 表示可重试的失败：未达最大尝试次数时任务退避后重新入队，resume_files 保持处理中。
+        """
+        if ok:
+            self.queue.mark_done(task.job.id)
             try:
-                client.table("resume_files").update({"status": "处理失败"}).eq("file_name", path.name).execute()
+                logger.info(f"剩余待处理文件: {self.queue.counts()['pending']}")
             except Exception:
                 pass
+            return
+        # 原件已归档（不在 processing 目录）时无法重试，直接置为失败
+        if retry and task.path.exists():
+            if self.queue.retry_or_fail(task.job.id, error):
+                return
         else:
-            # 打印剩余待处理 PDF 数量（processing 目录中）
-            try:
-                processing_dir = UPLOAD_DIRS["processing"]
-                remaining = sum(1 for _ in processing_dir.glob("*.pdf"))
-                logger.info(f"剩余待处理 PDF: {remaining}")
-            except Exception:
-                pass
+            self.queue.mark_failed(task.job.id, error)
+        try:
+            client = get_supabase_client()
+            if task.rf_id is not None:
+                client.table("resume_files").update({"status": "处理失败"}).eq("id", task.rf_id).execute()
+            else:
+                client.table("resume_files").update({"status": "处理失败"}).eq("file_name", task.path.name).execute()
+        except Exception:
+            pass
+
+    def _ocr_batch(self, paths: list[Path]) -> tuple[dict[Path, str], float]:
+        """把一批 PDF 链接到临时批次目录，单次调用 MinerU。
+
+        返回 ({原始路径: 文本}, 每个文件分摊的耗时)，失败的文件不在结果中。
+        """
+        batch_dir = UPLOAD_DIRS["ocr_batches"] / _uuid.uuid4().hex
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        by_name: dict[str, Path] = {}
+        try:
+            for path in paths:
+                link = batch_dir / path.name
+                try:
+                    os.link(path, link)
+                except OSError:
+                    shutil.copy2(path, link)
+                by_name[link.name] = path
+            started = _time.monotonic()
+            outputs = self.processor.process_batch(batch_dir)
+            texts = {by_name[p.name]: text for p, text in outputs.items() if text and p.name in by_name}
+            elapsed = _time.monotonic() - started
+            logger.info(f"[watcher] 批量 OCR 完成: 成功 {len(texts)}/{len(paths)}，耗时 {elapsed:.1f}s")
+            return texts, elapsed / len(paths)
+        except Exception as e:
+            logger.error(f"[watcher] 批量 OCR 异常: {e}")
+            return {}, 0.0
+        finally:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+
+    def _purge_finished(self) -> None:
+        try:
+            purged = self.queue.purge_finished(older_than_seconds=_FINISHED_RETENTION)
+            if purged:
+                logger.info(f"[watcher] 清理已结束任务: {purged}")
+        except Exception as e:
+            logger.warning(f"[watcher] 清理已结束任务失败: {e}")
+
+    def start_stages(self) -> None:
+        for stage in (self.commit_stage, self.upload_stage, self.parse_stage, self.ocr_stage):
+            stage.start()
+
+    def stage_stats(self) -> dict:
+        return {s.name: s.stats() for s in (self.ocr_stage, self.parse_stage, self.upload_stage, self.commit_stage)}
 
     def run_processing_loop(self) -> None:
-        """后台循环：检测 processing 目录是否存在 PDF；逐个调用 _handle_file 处理。"""
+        """后台循环：从任务队列出队，送入 OCR 阶段；PDF 先凑成微批。
+
+        OCR 阶段队列满时 put 阻塞，出队随之暂停（背压）；队列为空时阻塞等待新任务。
+        """
+        batch: list[FileTask] = []
+        deadline = 0.0
+        next_purge = _time.monotonic() + _PURGE_INTERVAL
         while True:
-            self.batch_signal.wait(timeout=3)
-            self.batch_signal.clear()
-            processing_dir = UPLOAD_DIRS["processing"]
-            try:
-                # 支持多种后缀：pdf/doc/docx/txt
-                candidates = []
-                for pattern in ("*.pdf", "*.doc", "*.docx", "*.txt"):
-                    candidates.extend([p for p in processing_dir.glob(pattern) if p.is_file()])
-                pdfs = sorted(candidates)
-            except Exception:
-                pdfs = []
-            for p in pdfs:
-                name = p.name
-                with self._in_progress_lock:
-                    if name in self._in_progress:
-                        continue
-                    self._in_progress.add(name)
+            if _time.monotonic() >= next_purge:
+                self._purge_finished()
+                next_purge = _time.monotonic() + _PURGE_INTERVAL
+            if batch and (len(batch) >= self.ocr_batch_size or _time.monotonic() >= deadline):
+                self.ocr_stage.put(batch)
+                batch = []
+                continue
+            job = self.queue.dequeue()
+            if job is None:
+                self.queue.wait(timeout=max(0.0, deadline - _time.monotonic()) if batch else 30)
+                continue
+            task = FileTask(job=job, path=job.path, rf_id=job.resume_file_id)
+            if not job.path.exists() or job.path.suffix.lower() not in SUPPORTED_EXTS:
+                self.queue.mark_failed(job.id, "文件不存在或类型不支持")
+                continue
+            if self.ocr_batch_size > 1 and job.path.suffix.lower() == ".pdf":
+                if not batch:
+                    deadline = _time.monotonic() + self.ocr_batch_window
+                batch.append(task)
+            else:
+                self.ocr_stage.put([task])
+
+
+_handler: UploadDirEventHandler | None = None
+_puller: AsyncPuller | None = None
+_puller_thread: threading.Thread | None = None
+_puller_loop: asyncio.AbstractEventLoop | None = None
+_puller_task: asyncio.Task | None = None
+
+
+def get_pipeline_stats() -> dict:
+    """各处理阶段的 worker 数、忙碌数与排队数（watcher 未启动时为空）。"""
+    return _handler.stage_stats() if _handler is not None else {}
 
-                def _worker(path: Path, fname: str) -> None:
-                    try:
-                        self._handle_file(path)
-                    except Exception as e:
-                        logger.error(f"[watcher] 处理文件异常: {path}: {e}")
-                    finally:
-                        with self._in_progress_lock:
-                            self._in_progress.discard(fname)
 
-                self.executor.submit(_worker, p, name)
+def notify_resume_file(item: dict) -> None:
+    """新写入 resume_files 的远程记录：推送给拉取任务立即下载（watcher 未启动时由对账查询兜底）。"""
+    if _puller is not None:
+        _puller.notify(item)
 
-    # 删除批处理逻辑
+
+def stop_puller(timeout: float = 10.0) -> None:
+    """取消拉取主任务并等待线程退出：在途下载删除 .part 并把记录退回 未处理。"""
+    global _puller, _puller_thread, _puller_loop, _puller_task
+    loop, task, thread = _puller_loop, _puller_task, _puller_thread
+    _puller = _puller_thread = _puller_loop = _puller_task = None
+    if loop is None or task is None or thread is None:
+        return
+    try:
+        loop.call_soon_threadsafe(task.cancel)
+    except RuntimeError:
+        # 循环已关闭（拉取任务异常退出），无需取消
+        pass
+    thread.join(timeout)
+    if thread.is_alive():
+        logger.warning(f"拉取任务未在 {timeout:.0f}s 内退出")
 
 
 def start_watcher_in_background() -> Observer:
     """启动目录监听（后台线程）。"""
+    global _handler, _puller, _puller_thread, _puller_loop, _puller_task
     handler = UploadDirEventHandler()
-    observer = Observer()
+    _handler = handler
+    handler.queue.recover_running()
+    handler.queue.purge_finished(older_than_seconds=_FINISHED_RETENTION)
+    handler.enqueue_existing()
+    handler.start_stages()
+    # Linux 下开启完整事件：从目录外移入的文件报告为 moved（IN_MOVED_TO）而不是 created
+    observer = Observer(generate_full_events=True) if _HAS_CLOSE_EVENTS else Observer()
     observer.schedule(handler, str(UPLOAD_DIRS["processing"]) , recursive=False)
     observer.daemon = True
     observer.start()
@@ -271,116 +556,29 @@ def start_watcher_in_background() -> Observer:
     t.start()
     logger.info(f"已启动目录监听: {UPLOAD_DIRS['processing']}")
     
-    # 启动周期拉取任务：从数据库查询 status='未处理' 的记录并下载到 processing
-    def _pull_loop() -> None:
-        poll_interval = max(3, int(os.getenv("PULL_UNPROCESSED_INTERVAL", "10")))
-        client = get_supabase_client()
-        processing_dir = UPLOAD_DIRS["processing"]
-        processing_dir.mkdir(parents=True, exist_ok=True)
-        # HTTP 客户端：禁用 HTTP/2，关闭 keep-alive，允许重定向，设置 UA
-        http_limits = httpx.Limits(max_keepalive_connections=0, max_connections=10)
-        http_client = httpx.Client(
-            timeout=30.0,
-            follow_redirects=True,
-            http2=False,
-            verify=certifi.where(),
-            limits=http_limits,
-            headers={"User-Agent": "AIResumeFetcher/1.0"},
-        )
-        while True:
-            try:
-                # 拉取一批待处理（未处理）的记录
-                # 允许多来源写入的不同初始状态：未处理/已上传/待处理
-                res = (
-                    client
-                    .table("resume_files")
-                    .select("id,file_name,file_path,status")
-                    .in_("status", ["未处理", "已上传", "待处理"])  # 统一当作待拉取
-                    .order("id")
-                    .limit(20)
-                    .execute()
-                )
-                items = getattr(res, "data", []) or []
-                if not items:
-                    _time.sleep(poll_interval)
-                    continue
-                for item in items:
-                    rid = item.get("id")
-                    fname = (item.get("file_name") or "").strip()
-                    url = (item.get("file_path") or "").strip()
-                    if not rid or not fname or not url:
-                        continue
-                    # 抢占：将状态 从(未处理/已上传/待处理) -> 拉取中，避免重复并发拉取
-                    try:
-                        upd = (
-                            client
-                            .table("resume_files")
-                            .update({"status": "拉取中"})
-                            .eq("id", rid)
-                            .in_("status", ["未处理", "已上传", "待处理"]) 
-                            .execute()
-                        )
-                        updated_rows = getattr(upd, "data", []) or []
-                        if not updated_rows:
-                            continue  # 未能抢到
-                    except Exception:
-                        continue
-
-                    # 计算保存路径，若重名则追加后缀
-                    target_path = processing_dir / fname
-                    if target_path.exists():
-                        base = target_path.stem
-                        ext = target_path.suffix
-                        counter = 1
-                        while (processing_dir / f"{base}_{counter}{ext}").exists():
-                            counter += 1
-                        target_path = processing_dir / f"{base}_{counter}{ext}"
-
-                    # 下载文件到 processing 目录（带重试与退避）
-                    max_attempts = max(1, int(os.getenv("PULL_DOWNLOAD_RETRIES", "3")))
-                    attempt = 0
-                    while True:
-                        attempt += 1
-                        try:
-                            with http_client.stream("GET", url) as resp:
-                                status = resp.status_code
-                                if status >= 400:
-                                    raise httpx.HTTPStatusError(
-                                        f"bad status: {status}", request=resp.request, response=resp
-                                    )
-                                with open(target_path, "wb") as f:
-                                    for chunk in resp.iter_bytes(65536):
-                                        if chunk:
-                                            f.write(chunk)
-                            logger.info(f"[pull] 下载成功: id={rid}, file={target_path.name}")
-                            # 放到目录后，目录监听/扫描会自动处理。先置为 处理中。
-                            try:
-                                client.table("resume_files").update({"status": "处理中"}).eq("id", rid).execute()
-                            except Exception:
-                                pass
-                            # 触发处理循环，尽快消费新下载的文件
-                            handler.batch_signal.set()
-                            # 触发批处理信号，尽快扫描
-                            handler.batch_signal.set()
-                            break
-                        except Exception as de:
-                            if attempt >= max_attempts:
-                                logger.error(f"[pull] 下载失败: id={rid}, url={url}, error={de}")
-                                try:
-                                    client.table("resume_files").update({"status": "未处理"}).eq("id", rid).execute()
-                                except Exception:
-                                    pass
-                                break
-                            # 指数退避
-                            backoff = min(20.0, 1.5 * attempt)
-                            logger.warning(f"[pull] 下载失败，退避重试({attempt}/{max_attempts})，等待 {backoff:.1f}s: id={rid}, url={url}")
-                            _time.sleep(backoff)
-                _time.sleep(0.5)
-            except Exception as e:
-                logger.error(f"[pull] 拉取循环异常: {e}")
-                _time.sleep(poll_interval)
-
-    tp = threading.Thread(target=_pull_loop, daemon=True)
+    # 启动拉取任务：接收 /uploads/complete 推送的新记录并发下载到 processing，周期查询仅用于对账
+    _puller = puller = AsyncPuller(
+        UPLOAD_DIRS["processing"],
+        lambda path, rid: handler.queue.enqueue(path, resume_file_id=rid),
+    )
+    # 保留事件循环与主任务的句柄，关闭时由 stop_puller 取消并触发在途下载的清理
+    _puller_loop = loop = asyncio.new_event_loop()
+    _puller_task = main_task = loop.create_task(puller.run())
+
+    def _run_puller() -> None:
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(main_task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"拉取任务异常退出: {e}")
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+
+    _puller_thread = tp = threading.Thread(target=_run_puller, name="puller", daemon=True)
     tp.start()
     
     return observer
\ No newline at end of file
@@ -0,0 +1,8 @@
+-- 为 resume_files 增加内容指纹列，用于重复文件去重
+-- 相同 SHA-256 且已处理的文件，watcher 会直接复用其 resumes 解析结果
+
+ALTER TABLE resume_files
+    ADD COLUMN IF NOT EXISTS content_sha256 char(64);
+
+CREATE INDEX IF NOT EXISTS idx_resume_files_content_sha256
+    ON resume_files (content_sha256);
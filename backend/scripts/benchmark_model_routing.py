@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+模型路由基准
+
+默认只统计路由：读取 OCR 输出的 markdown，打印每份文档的复杂度特征、分档与路由耗时，以及各档占比。
+加 --compare 时对每份文档分别以 路由开启 / 关闭（LLM_ROUTING=0）运行 parse_resume，
+对比耗时、token 消耗与关键字段（姓名、学校、分类、标签、经历条数）是否一致。
+--compare 会真实调用 LLM（并关闭响应缓存以免命中），需要配置 OPENAI_API_KEY 与 Supabase。
+
+使用方法：
+  python backend/scripts/benchmark_model_routing.py --dir backend/uploads/ocr_output --limit 50
+  python backend/scripts/benchmark_model_routing.py --limit 10 --compare
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.model_router import route_document
+
+
+def load_documents(root: Path, limit: int) -> List[Path]:
+    files = sorted(p for p in root.glob("**/*.md") if p.is_file())
+    return files[:limit] if limit > 0 else files
+
+
+def bench_routing(files: List[Path]) -> None:
+    tiers: Counter = Counter()
+    timings: List[float] = []
+    print(f"{'tier':<9} {'score':>6} {'len':>6} {'mix':>5} {'table':>6} {'sect':>5} {'ms':>6}  file")
+    for path in files:
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        t0 = time.perf_counter()
+        d = route_document(text)
+        ms = (time.perf_counter() - t0) * 1000
+        timings.append(ms)
+        tiers[d.tier] += 1
+        f = d.features
+        print(
+            f"{d.tier:<9} {d.score:>6.3f} {f['length']:>6.2f} {f['language_mix']:>5.2f} "
+            f"{f['table_density']:>6.2f} {f['sections']:>5.2f} {ms:>6.2f}  {path.name}"
+        )
+    if not files:
+        print("未找到 markdown 文件")
+        return
+    total = len(files)
+    print("\n分档占比：" + "，".join(f"{t} {c}/{total} ({c / total:.0%})" for t, c in sorted(tiers.items())))
+    print(f"路由耗时：平均 {statistics.mean(timings):.2f} ms，最大 {max(timings):.2f} ms")
+
+
+def _summary(pr: Any) -> Dict[str, Any]:
+    return {
+        "name": pr.name,
+        "schools": sorted(pr.education_school or []),
+        "category": pr.category,
+        "tags": set(pr.tag_names or []),
+        "work_items": len(pr.work_experience_items or []),
+    }
+
+
+def bench_compare(files: List[Path]) -> None:
+    from backend.app.llm import track_llm_tokens
+    from backend.app.parser import parse_resume
+
+    os.environ["LLM_CACHE_ENABLED"] = "0"
+    totals = {"routed": [0.0, 0], "baseline": [0.0, 0]}
+    agree: Counter = Counter()
+    for path in files:
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        runs: Dict[str, Dict[str, Any]] = {}
+        for label, flag in (("routed", "1"), ("baseline", "0")):
+            os.environ["LLM_ROUTING"] = flag
+            with track_llm_tokens() as meter:
+                t0 = time.perf_counter()
+                pr = parse_resume(text, None, path.name)
+                elapsed = time.perf_counter() - t0
+            totals[label][0] += elapsed
+            totals[label][1] += meter.total_tokens
+            runs[label] = {"seconds": elapsed, "tokens": meter.total_tokens, **_summary(pr)}
+        r, b = runs["routed"], runs["baseline"]
+        union = r["tags"] | b["tags"]
+        tag_jaccard = len(r["tags"] & b["tags"]) / len(union) if union else 1.0
+        for key in ("name", "schools", "category", "work_items"):
+            agree[key] += r[key] == b[key]
+        agree["tags"] += tag_jaccard
+        print(
+            f"{path.name}: routed {r['seconds']:.1f}s/{r['tokens']} tok, baseline {b['seconds']:.1f}s/{b['tokens']} tok, "
+            f"tags jaccard {tag_jaccard:.2f}"
+        )
+    n = len(files)
+    if not n:
+        print("未找到 markdown 文件")
+        return
+    print("\n汇总：")
+    for label, (secs, toks) in totals.items():
+        print(f"  {label:<8} 总耗时 {secs:.1f}s，平均 {secs / n:.1f}s，token {toks}")
+    print("  字段一致率：" + "，".join(f"{k} {v / n:.0%}" for k, v in agree.items()))
+    os.environ.pop("LLM_ROUTING", None)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="模型路由基准：分档统计，或对比路由开启/关闭时的耗时、token 与结果")
+    parser.add_argument("--dir", default=str(Path(__file__).parent.parent / "uploads" / "ocr_output"), help="OCR markdown 目录")
+    parser.add_argument("--limit", type=int, default=0, help="最多处理的文档数（0 为全部）")
+    parser.add_argument("--compare", action="store_true", help="实际运行 parse_resume 对比路由开启/关闭")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent.parent.parent / ".env")
+    documents = load_documents(Path(args.dir), args.limit)
+    bench_routing(documents)
+    if args.compare:
+        print()
+        bench_compare(documents)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多模式串匹配基准：Aho-Corasick 自动机 vs 逐个关键词扫描
+
+生成 --tags 个中英文混合标签（默认 10000），对每份文本比较：
+- 逐标签子串查找：{t for t in tags if t.lower() in text_lower}（原标签直接匹配）
+- 逐关键词 re.finditer（原学校关键词窗口）
+- 自动机单次扫描：Automaton.matched / iter_matches
+并校验两种方式的命中结果一致；最后给出不同模式串数量下 逐个子串查找 与 自动机扫描 的耗时交叉点（用于确定 _DIRECT_SCAN_MAX）。
+文本默认取 --dir 下的 OCR markdown，没有时使用合成简历。
+
+使用方法：
+  python backend/scripts/benchmark_tag_matching.py
+  python backend/scripts/benchmark_tag_matching.py --tags 20000 --dir backend/uploads/ocr_output --limit 20
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app import aho_corasick
+from backend.app.aho_corasick import Automaton, fold
+
+
+_ZH_WORDS = ["开发", "运营", "数据", "后端", "前端", "产品", "设计", "安全", "交易", "风控", "支付", "算法", "测试", "增长", "品牌", "合约"]
+_EN_WORDS = ["java", "go", "python", "react", "kafka", "redis", "solidity", "defi", "k8s", "docker", "spark", "rust", "node", "sql", "aws", "web3"]
+
+
+def synthetic_tags(n: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    tags = set(_ZH_WORDS) | {w.capitalize() for w in _EN_WORDS}
+    while len(tags) < n:
+        kind = rng.random()
+        if kind < 0.4:
+            tag = "".join(rng.sample(_ZH_WORDS, 2))
+        elif kind < 0.8:
+            tag = " ".join(rng.sample(_EN_WORDS, 2)).title()
+        else:
+            tag = rng.choice(_EN_WORDS).upper() + rng.choice(_ZH_WORDS) + str(rng.randint(1, 99))
+        tags.add(tag)
+    return sorted(tags)
+
+
+def synthetic_resume(seed: int = 11, paragraphs: int = 60) -> str:
+    rng = random.Random(seed)
+    lines = ["# 张三", "北京大学 计算机科学与技术", "## 工作经历"]
+    for _ in range(paragraphs):
+        words = rng.sample(_ZH_WORDS, 4) + rng.sample(_EN_WORDS, 3)
+        rng.shuffle(words)
+        lines.append(f"2020.0{rng.randint(1, 9)} - 至今 负责" + "、".join(words) + "相关工作，Ｋ８Ｓ 集群运维。")
+    return "\n".join(lines)
+
+
+def load_texts(root: Path, limit: int) -> List[str]:
+    files = sorted(root.glob("**/*.md"))[:limit] if root.exists() else []
+    texts = [p.read_text(encoding="utf-8", errors="ignore") for p in files]
+    return texts or [synthetic_resume(seed) for seed in range(max(1, min(limit, 10)))]
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aho-Corasick 与逐关键词扫描的匹配耗时对比")
+    parser.add_argument("--tags", type=int, default=10000, help="标签数量")
+    parser.add_argument("--dir", default=str(Path(__file__).parent.parent / "uploads" / "ocr_output"), help="OCR markdown 目录")
+    parser.add_argument("--limit", type=int, default=10, help="最多使用的文本数")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数（取中位数）")
+    args = parser.parse_args()
+
+    tags = synthetic_tags(args.tags)
+    texts = load_texts(Path(args.dir), args.limit)
+
+    t0 = time.perf_counter()
+    automaton = Automaton(tags)
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"标签 {len(tags)} 个，文本 {len(texts)} 份（平均 {statistics.mean(len(t) for t in texts):.0f} 字符）")
+    print(f"自动机构建：{build_ms:.1f} ms（每个标签字典版本一次）\n")
+
+    loop_ms, ac_ms = [], []
+    for text in texts:
+        # 逐标签子串查找与自动机使用相同的折叠，结果应完全一致
+        text_folded = fold(text)
+        expected = {t for t in tags if fold(t) in text_folded}
+        assert automaton.matched(text) == expected, "命中结果不一致"
+        text_lower = text.lower()
+        loop_ms.append(timed(lambda: {t for t in tags if t.lower() in text_lower}, args.repeat))
+        ac_ms.append(timed(lambda: automaton.matched(text), args.repeat))
+    print("标签直接匹配（每份文本，ms）")
+    print(f"  逐标签 in      平均 {statistics.mean(loop_ms):8.2f}  最大 {max(loop_ms):8.2f}")
+    print(f"  Aho-Corasick   平均 {statistics.mean(ac_ms):8.2f}  最大 {max(ac_ms):8.2f}")
+    print(f"  加速比 {statistics.mean(loop_ms) / statistics.mean(ac_ms):.1f}x\n")
+
+    keywords = ["大学", "学院", "学校", "University", "College", "Institute", "Polytechnic", "Academy", "School"]
+    kw_automaton = Automaton(keywords)
+    re_ms, kw_ms = [], []
+    for text in texts:
+        re_ms.append(timed(lambda: [m.span() for kw in keywords for m in re.finditer(re.escape(kw), text, re.IGNORECASE)], args.repeat))
+        kw_ms.append(timed(lambda: kw_automaton.find_all(text), args.repeat))
+    print("学校关键词定位（每份文本，ms）")
+    print(f"  逐关键词 finditer 平均 {statistics.mean(re_ms):8.3f}")
+    print(f"  Aho-Corasick      平均 {statistics.mean(kw_ms):8.3f}（{len(keywords)} 个关键词，走逐个查找）\n")
+
+    print("模式串数量 vs 每份文本耗时（ms）：逐个子串查找 / 自动机")
+    text = texts[0]
+    for n in (16, 64, 256, 1024, len(tags)):
+        sample = tags[:: max(1, len(tags) // n)][:n]
+        limit = aho_corasick._DIRECT_SCAN_MAX
+        try:
+            aho_corasick._DIRECT_SCAN_MAX = len(sample)
+            direct = Automaton(sample)
+            aho_corasick._DIRECT_SCAN_MAX = 0
+            trie = Automaton(sample)
+        finally:
+            aho_corasick._DIRECT_SCAN_MAX = limit
+        print(f"  {n:>6}  {timed(lambda: direct.matched(text), args.repeat):8.3f} / {timed(lambda: trie.matched(text), args.repeat):8.3f}")
+
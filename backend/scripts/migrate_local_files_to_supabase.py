@@ -25,7 +25,13 @@ import unicodedata
 import re
 
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import Client
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.db import get_supabase_client
+from backend.app.storage import ObjectExistsError, upload_to_supabase
 
 
 def is_probably_local_path(p: str) -> bool:
@@ -69,10 +75,12 @@ def ensure_env(var: str) -> str:
     return val
 
 
+def get_supabase_key() -> str:
+    return os.getenv("SUPABASE_SERVICE_ROLE_KEY") or ensure_env("SUPABASE_KEY")
+
+
 def get_supabase() -> Client:
-    url = ensure_env("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or ensure_env("SUPABASE_KEY")
-    return create_client(url, key)
+    return get_supabase_client(ensure_env("SUPABASE_URL"), get_supabase_key())
 
 
 def migrate(limit: Optional[int] = None) -> None:
@@ -80,6 +88,7 @@ def migrate(limit: Optional[int] = None) -> None:
     client = get_supabase()
     bucket = ensure_env("SUPABASE_STORAGE_BUCKET")
     supabase_url = ensure_env("SUPABASE_URL").rstrip("/")
+    supabase_key = get_supabase_key()
 
     # 拉取 resume_files
     print("[INFO] 读取 resume_files...")
@@ -112,46 +121,24 @@ def migrate(limit: Optional[int] = None) -> None:
         base, ext = sanitize_name(local_path.name)
         # 对象键：original/<base>；若冲突则追加计数
         object_key = f"original/{base}.{ext}"
-        storage = client.storage.from_(bucket)
-
-        # 读取文件内容
-        try:
-            data = local_path.read_bytes()
-        except Exception as e:
-            print(f"[ERROR] 读取失败 id={rid}: {e}")
-            failed += 1
-            continue
 
         # 猜测 Content-Type
         content_type = (mimetypes.guess_type(local_path.name)[0] or "application/octet-stream")
 
-        # 冲突规避：最多尝试 20 次
+        # 冲突规避：最多尝试 20 次；从磁盘流式上传，大文件走可续传上传
         for i in range(20):
             key_try = object_key if i == 0 else f"original/{base}_{i}.{ext}"
             try:
                 # 打印一次将要上传的键，便于排查
                 if i == 0:
                     print(f"[INFO] 上传对象键: {key_try}")
-                # supabase-py v2: file_options 需要使用 HTTP 头形式，值为字符串
-                # 参考 JS SDK：x-upsert: 'false'
-                up = storage.upload(
-                    key_try,
-                    data,
-                    {
-                        "content-type": content_type,
-                        "x-upsert": "false",
-                    },
-                )
-                # supabase-py v2 返回 dict: { data, error }
-                # 检查错误（supabase-py v2 上传失败通常抛异常；某些版本也可能返回 False/True）
-                if up is False:
-                    raise Exception("upload returned False")
+                upload_to_supabase(local_path, key_try, content_type, bucket=bucket, supabase_url=supabase_url, key=supabase_key)
                 object_key = key_try
                 break
-            except Exception as e:
+            except ObjectExistsError:
                 # 若已存在则换名重试
-                if "exists" in str(e).lower() or "duplicate" in str(e).lower():
-                    continue
+                continue
+            except Exception as e:
                 print(f"[ERROR] 上传失败 id={rid}: {e}")
                 failed += 1
                 object_key = None
@@ -0,0 +1,35 @@
+import random
+import re
+
+import pytest
+
+from backend.app import aho_corasick
+from backend.app.aho_corasick import Automaton, fold
+
+
+@pytest.mark.parametrize("direct_max", [0, 1000])
+def test_matches_equal_per_pattern_search(monkeypatch, direct_max: int) -> None:
+    # 0 强制走自动机，1000 走逐个子串查找，两者结果须与朴素查找一致
+    monkeypatch.setattr(aho_corasick, "_DIRECT_SCAN_MAX", direct_max)
+    rng = random.Random(3)
+    alphabet = "abAB大学院校"
+    for _ in range(200):
+        patterns = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 10))]
+        text = "".join(rng.choice(alphabet + "ＡＢ ") for _ in range(rng.randint(0, 50)))
+        folded = fold(text)
+        expected = {
+            (m.start(), m.start() + len(fold(p)), p)
+            for p in patterns
+            for m in re.finditer(f"(?={re.escape(fold(p))})", folded)
+        }
+        automaton = Automaton(patterns)
+        assert set(automaton.find_all(text)) == expected
+        assert automaton.matched(text) == {p for p in patterns if fold(p) in folded}
+
+
+def test_case_and_fullwidth_folding_keeps_offsets() -> None:
+    automaton = Automaton(["Java", "JAVA", "C++", "北京大学"])
+    text = "精通 ＪＡＶＡ 与 ｃ＋＋，毕业于北京大学"
+    hits = automaton.find_all(text)
+    assert {m.pattern for m in hits} == {"Java", "JAVA", "C++", "北京大学"}
+    assert all(fold(text[m.start:m.end]) == fold(m.pattern) for m in hits)
@@ -0,0 +1,39 @@
+from backend.app import db
+from backend.app.db import SupabaseClientPool
+
+_URL = "https://example.supabase.co"
+_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.signature"
+
+
+def test_clients_are_reused_round_robin() -> None:
+    pool = SupabaseClientPool(_URL, _KEY, size=2, max_age=3600)
+    first = [pool.get() for _ in range(2)]
+    again = [pool.get() for _ in range(4)]
+
+    assert first[0] is not first[1]
+    assert again == first * 2
+    assert pool.stats() == {"size": 2, "live": 2, "created": 2}
+
+
+def test_closed_or_expired_clients_are_rebuilt() -> None:
+    pool = SupabaseClientPool(_URL, _KEY, size=1, max_age=3600)
+    client = pool.get()
+    client.table("resume_files")
+    session = client._postgrest.session
+    assert isinstance(client._postgrest, db._KeepAlivePostgrestClient)
+
+    session.close()
+    rebuilt = pool.get()
+    assert rebuilt is not client
+
+    pool.max_age = 0
+    assert pool.get() is not rebuilt
+    assert pool.stats()["created"] == 3
+
+
+def test_get_supabase_client_shares_one_pool_per_project(monkeypatch) -> None:
+    monkeypatch.setattr(db, "_pools", {})
+    monkeypatch.setenv("SUPABASE_POOL_SIZE", "1")
+    assert db.get_supabase_client(_URL, _KEY) is db.get_supabase_client(_URL, _KEY)
+    assert db.get_supabase_client("https://other.supabase.co", _KEY) is not db.get_supabase_client(_URL, _KEY)
+    assert len(db._pools) == 2
@@ -0,0 +1,55 @@
+import hashlib
+from pathlib import Path
+
+from backend.app import dedup
+from backend.app.dedup import FingerprintStore, file_sha256
+
+
+def test_record_lookup_and_reuse_savings(tmp_path: Path) -> None:
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4 " * 200000)
+    sha = file_sha256(pdf)
+    assert sha == hashlib.sha256(pdf.read_bytes()).hexdigest()
+
+    store = FingerprintStore(tmp_path / "fp.sqlite3")
+    assert store.get(sha) is None
+    store.record(sha, resume_file_id=1, ocr_text="张三 简历", ocr_seconds=12.5, llm_tokens=800)
+    # 同一内容再次处理时覆盖为最新记录
+    store.record(sha, resume_file_id=2, ocr_text="张三 简历", ocr_seconds=10.0, llm_tokens=900)
+
+    known = FingerprintStore(tmp_path / "fp.sqlite3").get(sha)
+    assert known is not None
+    assert (known.resume_file_id, known.ocr_text, known.ocr_seconds, known.llm_tokens) == (2, "张三 简历", 10.0, 900)
+
+    store.add_savings(ocr_seconds=known.ocr_seconds, llm_tokens=known.llm_tokens)
+    store.add_savings(ocr_seconds=known.ocr_seconds)
+    assert store.stats() == {"hits": 2, "ocr_seconds_saved": 20.0, "llm_tokens_saved": 900, "fingerprints": 1}
+
+
+class _MissingColumn(Exception):
+    code = "42703"
+
+
+def test_missing_content_sha256_column_is_detected_once(monkeypatch) -> None:
+    probes = []
+
+    class _Client:
+        def table(self, name):
+            return self
+
+        def select(self, columns):
+            return self
+
+        def limit(self, n):
+            return self
+
+        def execute(self):
+            probes.append(1)
+            raise _MissingColumn("column resume_files.content_sha256 does not exist")
+
+    monkeypatch.setattr(dedup, "get_supabase_client", lambda: _Client())
+    monkeypatch.setattr(dedup, "_sha256_column", None)
+
+    assert dedup.content_sha256_supported() is False
+    assert dedup.content_sha256_supported() is False
+    assert len(probes) == 1
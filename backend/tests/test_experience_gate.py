@@ -0,0 +1,42 @@
+from backend.app import parser
+
+
+def test_only_low_confidence_entries_go_to_llm(monkeypatch) -> None:
+    entries = [
+        "2019.05 - 2020.12  ABC Exchange  Product Manager\nBuilt perpetual from 0-1",
+        "2021.01 - 至今 字节跳动 后端开发工程师\n负责推荐系统",
+        "参与了很多事情，负责若干模块",
+    ]
+    sent = []
+
+    def fake_llm(batch):
+        sent.append(batch)
+        return [{"company": "LLM", "title": None}]
+
+    monkeypatch.setattr(parser, "extract_experience_via_llm", fake_llm)
+    items = parser._structured_items(entries)
+
+    assert sent == [[entries[2]]]
+    assert [it["company"] for it in items] == ["ABC Exchange", "字节跳动", "LLM"]
+    assert items[0]["start"] == "2019-05" and items[0]["title"] == "Product Manager"
+
+
+def test_consolidated_extraction_is_opt_in(monkeypatch) -> None:
+    calls = []
+    monkeypatch.setattr(parser, "llm_circuit_open", lambda: False)
+    monkeypatch.setattr(parser, "_load_tag_table", lambda: [])
+    monkeypatch.setattr(parser, "_parse_consolidated", lambda text, tags, mode: calls.append(mode) or None)
+    empty = dict.fromkeys(
+        ["schools", "education_tier", "education_tiers", "category", "tag_names", "skills", "work_experience",
+         "internship_experience", "project_experience", "work_items", "proj_items"]
+    )
+    monkeypatch.setattr(parser, "_parse_legacy", lambda text: calls.append("legacy") or dict(empty))
+
+    monkeypatch.delenv("LLM_EXTRACTION_MODE", raising=False)
+    parser.parse_resume("张三\n13800000000", 1)
+    assert calls == ["legacy"]
+
+    monkeypatch.setenv("LLM_EXTRACTION_MODE", "single")
+    parser.parse_resume("张三\n13800000000", 1)
+    # 合并调用失败时仍回退 legacy
+    assert calls == ["legacy", "single", "legacy"]
@@ -0,0 +1,80 @@
+import sqlite3
+from pathlib import Path
+
+from backend.app.jobqueue import JobQueue
+
+
+def test_enqueue_dedupes_active_path_and_keeps_resume_file_id(tmp_path: Path) -> None:
+    q = JobQueue(tmp_path / "jobs.sqlite3")
+    q.enqueue(tmp_path / "a.pdf")
+    q.enqueue(tmp_path / "a.pdf", resume_file_id=7)
+    q.enqueue(tmp_path / "b.pdf")
+
+    job = q.dequeue()
+    assert job is not None
+    assert job.path.name == "a.pdf"
+    assert job.resume_file_id == 7
+    assert job.attempts == 1
+    assert q.dequeue().path.name == "b.pdf"
+    assert q.dequeue() is None
+
+
+def test_running_jobs_survive_restart(tmp_path: Path) -> None:
+    db = tmp_path / "jobs.sqlite3"
+    q = JobQueue(db, max_attempts=2)
+    q.enqueue(tmp_path / "a.pdf")
+    assert q.dequeue() is not None
+
+    # 模拟崩溃后重启：running 任务重新入队，尝试次数累加
+    q2 = JobQueue(db, max_attempts=2)
+    assert q2.recover_running() == 1
+    job = q2.dequeue()
+    assert job is not None and job.attempts == 2
+
+    # 再次崩溃：已达最大尝试次数，置为 failed
+    q3 = JobQueue(db, max_attempts=2)
+    assert q3.recover_running() == 0
+    assert q3.counts()["failed"] == 1
+
+
+def test_finished_job_allows_requeue(tmp_path: Path) -> None:
+    q = JobQueue(tmp_path / "jobs.sqlite3")
+    q.enqueue(tmp_path / "a.pdf")
+    job = q.dequeue()
+    q.mark_done(job.id)
+    q.enqueue(tmp_path / "a.pdf")
+    assert q.counts() == {"pending": 1, "running": 0, "done": 1, "failed": 0}
+
+
+def test_failed_job_is_retried_with_backoff_until_max_attempts(tmp_path: Path, monkeypatch) -> None:
+    clock = [1000.0]
+    monkeypatch.setattr("backend.app.jobqueue.time.time", lambda: clock[0])
+    q = JobQueue(tmp_path / "jobs.sqlite3", max_attempts=2, retry_backoff=10)
+    q.enqueue(tmp_path / "a.pdf")
+
+    job = q.dequeue()
+    assert q.retry_or_fail(job.id, "OCR 超时") is True
+    # 退避期内不出队
+    assert q.dequeue() is None
+    clock[0] += 10
+    job = q.dequeue()
+    assert job is not None and job.attempts == 2
+
+    # 达到最大尝试次数后置为 failed
+    assert q.retry_or_fail(job.id, "OCR 超时") is False
+    assert q.counts() == {"pending": 0, "running": 0, "done": 0, "failed": 1}
+
+
+def test_queue_db_without_available_at_is_migrated(tmp_path: Path) -> None:
+    db = tmp_path / "jobs.sqlite3"
+    conn = sqlite3.connect(str(db))
+    conn.execute(
+        "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL, resume_file_id INTEGER, "
+        "state TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, "
+        "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO jobs(path, created_at, updated_at) VALUES ('a.pdf', 0, 0)")
+    conn.commit()
+    conn.close()
+
+    assert JobQueue(db).dequeue().path.name == "a.pdf"
@@ -0,0 +1,17 @@
+import threading
+
+from backend.app.llm import track_llm_tokens
+
+
+def test_token_meter_counts_concurrent_additions() -> None:
+    with track_llm_tokens() as meter:
+        def add() -> None:
+            for _ in range(10000):
+                meter.add(1)
+
+        threads = [threading.Thread(target=add) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+    assert meter.total_tokens == 80000
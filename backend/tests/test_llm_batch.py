@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.app import llm_batch
+from backend.app.llm_batch import MicroBatcher
+from backend.app.llm_cache import LLMResponseCache
+
+
+def test_concurrent_submissions_share_one_batch(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "0")
+    batches = []
+
+    def run_batch(items):
+        batches.append(sorted(items))
+        return {x: x.upper() for x in items if x != "missing"}
+
+    batcher = MicroBatcher("t", run_batch, window=0.2, max_batch=10, executor=ThreadPoolExecutor(2))
+    results = {}
+
+    def submit(i: int) -> None:
+        results[i] = batcher.submit_many([f"s{i}", "shared", "missing"])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert batches == [["missing", "s0", "s1", "s2", "shared"]]
+    assert results[1] == ["S1", "SHARED", None]
+    assert batcher.stats()["avg_batch_size"] == 5.0
+
+
+def test_cached_answers_are_keyed_by_model_and_prompt(monkeypatch, tmp_path) -> None:
+    cache = LLMResponseCache(tmp_path / "llm.sqlite3", ttl_seconds=3600, max_entries=10)
+    monkeypatch.setattr(llm_batch, "get_llm_cache", lambda: cache)
+    calls = []
+
+    def run_batch(items):
+        calls.append(list(items))
+        return {x: x.upper() for x in items}
+
+    def make(prompt: str, model: str) -> MicroBatcher:
+        return MicroBatcher("t", run_batch, window=0.01, max_batch=10, executor=ThreadPoolExecutor(1), prompt=prompt, model=lambda: model)
+
+    assert make("v1", "m1").submit("a") == "A"
+    assert make("v1", "m1").submit("a") == "A"
+    assert len(calls) == 1
+    # 修改批量提示词或模型后不再命中旧结果
+    make("v2", "m1").submit("a")
+    make("v1", "m2").submit("a")
+    assert len(calls) == 3
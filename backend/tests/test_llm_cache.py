@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from backend.app.llm_cache import LLMResponseCache, make_cache_key
+
+
+def test_hit_records_tokens_saved_per_site(tmp_path: Path) -> None:
+    cache = LLMResponseCache(tmp_path / "llm.sqlite3", ttl_seconds=3600, max_entries=10)
+    key = make_cache_key("gpt-4o-mini", "prompt", "text", 600)
+    assert key != make_cache_key("gpt-4o-mini", "prompt", "text", 900)
+
+    assert cache.get(key, "schools") is None
+    cache.put(key, "schools", "gpt-4o-mini", '{"schools": []}', tokens=120)
+    assert cache.get(key, "schools") == '{"schools": []}'
+
+    stats = cache.stats()
+    assert stats["sites"]["schools"] == {"hits": 1, "misses": 1, "hit_ratio": 0.5, "tokens_saved": 120}
+    assert stats["tokens_saved"] == 120
+
+
+def test_expired_and_overflow_entries_are_evicted(tmp_path: Path) -> None:
+    cache = LLMResponseCache(tmp_path / "llm.sqlite3", ttl_seconds=3600, max_entries=2)
+    for i in range(3):
+        cache.put(f"k{i}", "tags", "m", f"v{i}", tokens=1)
+    cache.evict()
+    assert cache.stats()["entries"] == 2
+
+    cache.ttl_seconds = -1
+    assert cache.get("k2", "tags") is None
+    cache.evict()
+    assert cache.stats()["entries"] == 0
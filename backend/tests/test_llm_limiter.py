@@ -0,0 +1,25 @@
+from backend.app.llm_limiter import LLMRateLimiter
+
+
+def test_throttling_halves_concurrency_and_success_recovers_it() -> None:
+    limiter = LLMRateLimiter(rpm=6000, tpm=1_000_000, max_concurrency=4)
+    for _ in range(4):
+        assert limiter.acquire(100, timeout=0.1)
+    assert not limiter.acquire(100, timeout=0.05)
+
+    limiter.release(100, None, latency=0.1, throttled=True)
+    assert limiter.stats()["concurrency_limit"] == 2.0
+    # 仍有 3 个在途请求，超过减半后的上限
+    assert not limiter.acquire(100, timeout=0.05)
+
+    for _ in range(3):
+        limiter.release(100, 50, latency=0.1)
+    assert limiter.stats()["concurrency_limit"] > 2.0
+    assert limiter.acquire(100, timeout=0.1)
+
+
+def test_request_bucket_blocks_when_rpm_exhausted() -> None:
+    limiter = LLMRateLimiter(rpm=2, tpm=1_000_000, max_concurrency=8)
+    assert limiter.acquire(1, timeout=0.1)
+    assert limiter.acquire(1, timeout=0.1)
+    assert not limiter.acquire(1, timeout=0.1)
@@ -0,0 +1,55 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.app.llm_resilience import CircuitBreaker, DeadlineExceeded, hedged_call
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_after_cooldown() -> None:
+    breaker = CircuitBreaker("test", failure_threshold=3, cooldown=0.05)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.is_open() and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # 半开：只放行一个探测请求
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED and breaker.allow()
+
+
+def test_hedged_call_returns_first_success_and_respects_deadline() -> None:
+    executor = ThreadPoolExecutor(max_workers=4)
+    release = threading.Event()
+    calls = []
+
+    def send(timeout: float) -> str:
+        calls.append(timeout)
+        if len(calls) == 1:
+            release.wait(2)  # 首个请求挂起
+            return "slow"
+        return "hedge"
+
+    started = time.monotonic()
+    assert hedged_call(send, started + 2, 0.05, lambda: True, executor) == "hedge"
+    assert time.monotonic() - started < 1
+    release.set()
+
+    release.clear()
+    calls.clear()
+    with pytest.raises(DeadlineExceeded):
+        hedged_call(send, time.monotonic() + 0.1, None, lambda: True, executor)
+    assert len(calls) == 1
+    release.set()
+    executor.shutdown(wait=True)
@@ -0,0 +1,44 @@
+from backend.app import model_router
+from backend.app.model_router import aux_model, main_model, route_document, routed
+
+
+SIMPLE = """# 张三
+电话 13800000000
+## 工作经历
+2020.07 - 至今  某公司  后端开发工程师
+## 教育背景
+北京大学 计算机科学与技术
+"""
+
+
+def _complex() -> str:
+    row = "<tr><td>2019.01-2021.06</td><td>Bytedance Ltd.</td><td>Senior Backend Engineer 高级后端</td></tr>"
+    table = "<table>" + row * 40 + "</table>"
+    body = "Responsible for distributed storage 负责分布式存储 and on-call 值班。\n" * 80
+    return "\n".join([body, table, body, table])
+
+
+def test_short_resume_routes_simple_and_table_heavy_mixed_routes_complex(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-4o")
+    monkeypatch.setenv("LLM_MODEL_SIMPLE", "gpt-4o-mini")
+    assert route_document(SIMPLE).tier == "simple"
+    decision = route_document(_complex())
+    assert decision.tier == "complex"
+    assert decision.model == decision.aux_model == "gpt-4o"
+    assert decision.features["table_density"] > 0.5
+
+
+def test_routed_context_sets_models_and_restores(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-4o")
+    monkeypatch.setenv("LLM_MODEL_SIMPLE", "simple-model")
+    monkeypatch.setenv("LLM_MODEL_SMALL", "small-model")
+    with routed(SIMPLE, label="t") as decision:
+        assert decision is not None and decision.tier == "simple"
+        assert main_model() == "simple-model" and aux_model() == "small-model"
+    assert main_model() == "gpt-4o"
+    assert model_router.routing_stats()["simple"] >= 1
+
+    monkeypatch.setenv("LLM_ROUTING", "0")
+    with routed(_complex()) as decision:
+        assert decision is None
+        assert main_model() == "gpt-4o"
@@ -0,0 +1,112 @@
+import hashlib
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from backend.app import puller
+from backend.app.puller import AsyncPuller, ChecksumMismatch
+
+
+class _FakeResumeFiles:
+    """只实现拉取任务用到的查询链：select/in_/or_/eq/order/limit/update/execute。"""
+
+    def __init__(self, rows) -> None:
+        self.rows = rows
+
+    def table(self, name: str) -> "_FakeResumeFiles":
+        self._query = {"filters": []}
+        return self
+
+    def select(self, columns: str) -> "_FakeResumeFiles":
+        return self
+
+    def update(self, payload: dict) -> "_FakeResumeFiles":
+        self._query["update"] = payload
+        return self
+
+    def eq(self, column: str, value) -> "_FakeResumeFiles":
+        self._query["filters"].append(lambda r: r[column] == value)
+        return self
+
+    def in_(self, column: str, values) -> "_FakeResumeFiles":
+        self._query["filters"].append(lambda r: r[column] in values)
+        return self
+
+    def or_(self, expr: str) -> "_FakeResumeFiles":
+        # 只支持 column.ilike.prefix% 形式
+        conds = [c.split(".", 2) for c in expr.split(",")]
+        self._query["filters"].append(
+            lambda r: any(op == "ilike" and r[col].lower().startswith(pat.rstrip("%")) for col, op, pat in conds)
+        )
+        return self
+
+    def order(self, column: str) -> "_FakeResumeFiles":
+        return self
+
+    def limit(self, n: int) -> "_FakeResumeFiles":
+        self._query["limit"] = n
+        return self
+
+    def execute(self) -> SimpleNamespace:
+        matched = [r for r in self.rows if all(f(r) for f in self._query["filters"])]
+        if "update" in self._query:
+            for r in matched:
+                r.update(self._query["update"])
+            return SimpleNamespace(data=matched)
+        return SimpleNamespace(data=matched[: self._query.get("limit")])
+
+
+@pytest.fixture
+def make_puller(monkeypatch, tmp_path):
+    def factory(rows, batch_size: int = 2) -> AsyncPuller:
+        db = _FakeResumeFiles(rows)
+        monkeypatch.setattr(puller, "get_supabase_client", lambda: db)
+        monkeypatch.setattr(puller, "content_sha256_supported", lambda: False)
+        monkeypatch.setenv("PULL_BATCH_SIZE", str(batch_size))
+        return AsyncPuller(tmp_path, lambda path, rid: None)
+
+    return factory
+
+
+def test_pending_selection_skips_local_uploads(make_puller) -> None:
+    rows = [
+        {"id": 1, "file_name": "a.pdf", "file_path": "/data/uploads/a.pdf", "status": "待处理"},
+        {"id": 2, "file_name": "b.pdf", "file_path": "/data/uploads/b.pdf", "status": "待处理"},
+        {"id": 3, "file_name": "c.pdf", "file_path": "HTTPS://cdn.example.com/c.pdf", "status": "未处理"},
+        {"id": 4, "file_name": "d.pdf", "file_path": "http://cdn.example.com/d.pdf", "status": "处理中"},
+        {"id": 5, "file_name": "e.pdf", "file_path": "http://cdn.example.com/e.pdf", "status": "已上传"},
+    ]
+    p = make_puller(rows)
+
+    # 本地路径记录占满批次时也不能挡住后面的远程记录
+    assert [r["id"] for r in p._fetch_pending()] == [3, 5]
+
+
+def test_claim_only_succeeds_once(make_puller) -> None:
+    rows = [{"id": 7, "file_name": "a.pdf", "file_path": "https://x/a.pdf", "status": "未处理"}]
+    p = make_puller(rows)
+
+    assert p._claim(7) is True
+    assert rows[0]["status"] == "拉取中"
+    assert p._claim(7) is False
+
+
+def _response(body: bytes, **headers: str) -> httpx.Response:
+    return httpx.Response(200, headers=headers, content=body)
+
+
+def test_verify_checks_length_sha256_and_etag() -> None:
+    body = b"%PDF-1.4 resume"
+    sha, md5 = hashlib.sha256(body).hexdigest(), hashlib.md5(body).hexdigest()
+    ok = _response(body, etag=f'"{md5}"')
+    AsyncPuller._verify(ok, len(body), sha, md5, sha)
+    # 分段上传的 ETag（带 -N）不是内容 MD5，不参与比对
+    AsyncPuller._verify(_response(body, etag='"abc-2"'), len(body), sha, md5, None)
+
+    with pytest.raises(ChecksumMismatch):
+        AsyncPuller._verify(ok, len(body) - 1, sha, md5, None)
+    with pytest.raises(ChecksumMismatch):
+        AsyncPuller._verify(ok, len(body), sha, md5, "0" * 64)
+    with pytest.raises(ChecksumMismatch):
+        AsyncPuller._verify(_response(body, etag=f'"{"0" * 32}"'), len(body), sha, md5, None)
@@ -0,0 +1,56 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.app.pipeline import run_graph
+
+_label = contextvars.ContextVar("label", default=None)
+
+
+def test_dependencies_run_first_and_independent_nodes_overlap() -> None:
+    both_started = threading.Barrier(2, timeout=5)
+    order = []
+
+    def leaf(name: str):
+        def fn():
+            both_started.wait()
+            order.append(name)
+            return name
+        return fn
+
+    def join(a: str, b: str) -> str:
+        order.append("join")
+        return f"{a}+{b}:{_label.get()}"
+
+    _label.set("resume-1")
+    with ThreadPoolExecutor(4) as ex:
+        r = run_graph({"join": (join, ("a", "b")), "a": (leaf("a"), ()), "b": (leaf("b"), ())}, ex)
+
+    # 两个叶子任务必须同时运行才能通过 Barrier；join 按声明顺序接收依赖结果，并继承调用方上下文
+    assert r == {"a": "a", "b": "b", "join": "a+b:resume-1"}
+    assert order[-1] == "join"
+
+
+def test_error_is_raised_after_submitted_tasks_finish() -> None:
+    finished = []
+
+    def slow() -> None:
+        time.sleep(0.05)
+        finished.append("slow")
+
+    def boom() -> None:
+        raise RuntimeError("llm down")
+
+    with ThreadPoolExecutor(2) as ex:
+        with pytest.raises(RuntimeError, match="llm down"):
+            run_graph({"slow": (slow, ()), "boom": (boom, ()), "after": (lambda _: None, ("boom",))}, ex)
+    assert finished == ["slow"]
+
+
+def test_unsatisfiable_dependency_raises() -> None:
+    with ThreadPoolExecutor(1) as ex:
+        with pytest.raises(ValueError):
+            run_graph({"a": (lambda _: 1, ("missing",))}, ex)
@@ -0,0 +1,34 @@
+from backend.app.sections import mark_headings, segment_resume
+
+
+RESUME = """# 张三
+电话 13800000000
+**自我评价**
+9 年 Java 后端开发经验
+## 工作经历 Work Experience
+2024.07 - 2024.10  Bitget  后端开发工程师
+# Project Manager
+负责交易平台迭代
+项目经历（近三年）
+现货交易系统重构
+教育背景：
+北京大学 计算机科学与技术
+Skills
+Java, Go, Kubernetes
+"""
+
+
+def test_segments_known_headings_and_keeps_unknown_titles_in_section() -> None:
+    sections = segment_resume(RESUME)
+    assert [s.kind for s in sections.sections] == ["header", "summary", "work", "education", "skills"]
+    work = sections.text_for("work")
+    assert "Project Manager" in work and "负责交易平台迭代" in work
+    assert sections.text_for("education") == "教育背景：\n北京大学 计算机科学与技术"
+    assert sections.text_for("internship") is None
+
+
+def test_layout_headings_from_content_list_start_sections() -> None:
+    marked = mark_headings(RESUME, [{"type": "text", "text": "项目经历（近三年）", "text_level": 1}])
+    sections = segment_resume(marked)
+    assert sections.text_for("projects") == "# 项目经历（近三年）\n现货交易系统重构"
+    assert "现货交易系统重构" not in sections.text_for("work")
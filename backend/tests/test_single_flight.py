@@ -0,0 +1,39 @@
+import threading
+import time
+
+from backend.app.pipeline import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution() -> None:
+    sf = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def slow() -> str:
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(sf.do("k", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(sf.do("k", slow))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    deadline = time.monotonic() + 5
+    while sf.stats()["coalesced"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    coalesced = sf.stats()["coalesced"]
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+
+    assert coalesced == 3
+    assert results == ["ok"] * 4
+    assert len(runs) == 1
+    assert sf.stats() == {"calls": 4, "coalesced": 3, "inflight": 0}
+    # 调用结束后同一 key 会重新执行
+    assert sf.do("k", lambda: "again") == "again"
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+
+from backend.app import storage
+from backend.app.config import AppSettings
+
+_R2 = dict(r2_account_id="acct", r2_access_key_id="id", r2_secret_access_key="secret", r2_bucket="resumes")
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    calls = []
+    monkeypatch.setattr(storage, "upload_to_supabase", lambda path, key, ct, bucket: calls.append(("supabase", bucket)) or "sb-url")
+    monkeypatch.setattr(storage, "upload_to_r2", lambda path, key, ct: calls.append(("r2", None)) or "r2-url")
+    monkeypatch.delenv("STORAGE_R2_FALLBACK", raising=False)
+    return calls
+
+
+def _settings(monkeypatch, **fields) -> None:
+    settings = AppSettings(supabase_url="https://x.supabase.co", supabase_key="k", **fields)
+    monkeypatch.setattr(storage, "get_app_settings", lambda: settings)
+
+
+def test_originals_go_to_supabase_bucket(monkeypatch, uploads) -> None:
+    _settings(monkeypatch, supabase_storage_bucket="originals", **_R2)
+    assert storage.upload_original(Path("a.pdf"), "k", "application/pdf") == "sb-url"
+    assert uploads == [("supabase", "originals")]
+
+
+def test_r2_is_used_only_when_fallback_enabled(monkeypatch, uploads) -> None:
+    _settings(monkeypatch, **_R2)
+    assert storage.upload_original(Path("a.pdf"), "k", "application/pdf") is None
+    assert uploads == []
+
+    monkeypatch.setenv("STORAGE_R2_FALLBACK", "1")
+    assert storage.upload_original(Path("a.pdf"), "k", "application/pdf") == "r2-url"
+    assert uploads == [("r2", None)]
+
+    # 未配置 R2 时即使开启回退也不上传
+    _settings(monkeypatch)
+    assert storage.upload_original(Path("a.pdf"), "k", "application/pdf") is None
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+from backend.app import main, tag_dictionary
+from backend.app.tag_dictionary import get_tag_dictionary
+
+
+class _FakeTags:
+    """只实现标签字典用到的查询链：select/not_.is_/order/limit/range/execute。"""
+
+    def __init__(self) -> None:
+        self.rows = [
+            {"id": 1, "tag_name": "Java", "category": "技术类", "updated_at": "2025-01-01"},
+            {"id": 2, "tag_name": "品牌运营", "category": "非技术类", "updated_at": "2025-01-02"},
+        ]
+        self.full_loads = 0
+        self.fail = False
+
+    def table(self, name: str) -> "_FakeTags":
+        self._query = {}
+        return self
+
+    def select(self, *columns: str, count=None) -> "_FakeTags":
+        self._query["count"] = count
+        return self
+
+    @property
+    def not_(self) -> "_FakeTags":
+        return self
+
+    def is_(self, column: str, value: str) -> "_FakeTags":
+        self._query["not_null"] = column
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "_FakeTags":
+        self._query.setdefault("order", []).append(column)
+        return self
+
+    def limit(self, n: int) -> "_FakeTags":
+        self._query["limit"] = n
+        return self
+
+    def range(self, start: int, end: int) -> "_FakeTags":
+        self._query["range"] = (start, end)
+        return self
+
+    def execute(self) -> SimpleNamespace:
+        if self.fail:
+            raise RuntimeError("db down")
+        if "range" in self._query:
+            self.full_loads += 1
+            start, end = self._query["range"]
+            rows = sorted(self.rows, key=lambda r: tuple(r[c] for c in self._query.get("order", [])))
+            return SimpleNamespace(data=rows[start:end + 1], count=None)
+        if "not_null" not in self._query:
+            return SimpleNamespace(data=self.rows[:1], count=len(self.rows))
+        stamped = [r["updated_at"] for r in self.rows if r["updated_at"] is not None]
+        return SimpleNamespace(data=[{"updated_at": max(stamped)}] if stamped else [], count=None)
+
+
+def test_loads_once_and_reloads_only_on_version_change(monkeypatch) -> None:
+    db = _FakeTags()
+    monkeypatch.setattr(tag_dictionary, "get_supabase_client", lambda: db)
+    monkeypatch.setattr(tag_dictionary, "_snapshot", None)
+    monkeypatch.setenv("TAG_DICT_CHECK_SECONDS", "0")
+
+    tags = get_tag_dictionary()
+    assert tags.direct_matches("5年 JAVA 后端") == {"Java"}
+    assert tags.tech == {"Java"} and tags.nontech == {"品牌运营"}
+    assert [r["tag_name"] for r in tags.list_rows("非技术类")] == ["品牌运营"]
+
+    assert get_tag_dictionary() is tags
+    assert db.full_loads == 1
+
+    db.rows.append({"id": 3, "tag_name": "Go", "category": "技术类", "updated_at": "2025-02-01"})
+    refreshed = get_tag_dictionary()
+    assert db.full_loads == 2 and "Go" in refreshed.tag_set
+
+    db.fail = True
+    assert get_tag_dictionary() is refreshed
+
+
+def test_null_updated_at_does_not_pin_version(monkeypatch) -> None:
+    db = _FakeTags()
+    db.rows.append({"id": 3, "tag_name": "Go", "category": "技术类", "updated_at": None})
+    monkeypatch.setattr(tag_dictionary, "get_supabase_client", lambda: db)
+    monkeypatch.setattr(tag_dictionary, "_snapshot", None)
+    monkeypatch.setenv("TAG_DICT_CHECK_SECONDS", "0")
+
+    get_tag_dictionary()
+    # 行数不变、仅修改时间变化的编辑也要触发重新加载
+    db.rows[0] = {**db.rows[0], "tag_name": "Kotlin", "updated_at": "2025-03-01"}
+    assert "Kotlin" in get_tag_dictionary().tag_set
+    assert db.full_loads == 2
+
+
+def test_tags_endpoint_returns_just_inserted_tag(monkeypatch) -> None:
+    db = _FakeTags()
+    monkeypatch.setattr(tag_dictionary, "get_supabase_client", lambda: db)
+    monkeypatch.setattr(tag_dictionary, "_snapshot", None)
+    monkeypatch.delenv("TAG_DICT_CHECK_SECONDS", raising=False)
+
+    assert [r["tag_name"] for r in main.list_tags(category=None, limit=100)["items"]] == ["Java", "品牌运营"]
+    # 检查间隔内新增的标签也要立刻出现，并按 tag_name 排序
+    db.rows.append({"id": 3, "tag_name": "Go", "category": "技术类", "updated_at": "2025-01-01"})
+    assert [r["tag_name"] for r in main.list_tags(category=None, limit=100)["items"]] == ["Go", "Java", "品牌运营"]
+    assert [r["tag_name"] for r in main.list_tags(category="技术类", limit=1)["items"]] == ["Go"]
@@ -0,0 +1,14 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from backend.app.tag_index import TagIndex
+
+
+def test_top_k_ranks_related_tags_within_candidates() -> None:
+    tags = ["后端开发", "微服务", "智能合约", "内容运营", "品牌运营", "Kubernetes", "Solidity", "产品经理"]
+    index = TagIndex(tags)
+    text = "5 年后端工程师，负责微服务拆分，编写 Solidity 智能合约"
+    top = index.top_k(text, 3, candidates=[t for t in tags if t != "Solidity"])
+    assert set(top) == {"后端开发", "微服务", "智能合约"}
+    assert index.top_k("完全无关的文字", 3, candidates=["Kubernetes"]) == []
@@ -0,0 +1,123 @@
+import random
+from difflib import SequenceMatcher
+
+from backend.app.education import UniversityClassifier
+from backend.app.university_index import FuzzyNameIndex
+
+
+# 改为索引查找前 classify_university(name, overseas_hint=False) 的输出（使用仓库内 config 名单）
+GOLDEN = [
+    ('清华大学', '211'),
+    ('北京大学', '211'),
+    ('北大', '211'),
+    ('清华', '211'),
+    ('中科大', '211'),
+    ('科大', 'regular'),
+    ('哈工大', '211'),
+    ('成电', '211'),
+    ('UESTC', '211'),
+    ('北邮', '211'),
+    ('上财', '211'),
+    ('石油大学', 'regular'),
+    ('北京大学软件与微电子学院', 'regular'),
+    ('清华大学（深圳）', 'regular'),
+    ('清华大学深圳研究生院', 'regular'),
+    ('北京邮电大学 ', '211'),
+    (' 浙江  大学', 'double_first_class'),
+    ('浙江大学', 'double_first_class'),
+    ('上海交通大学医学院', '211'),
+    ('中国科学院大学', '211'),
+    ('中国人民大学', '211'),
+    ('北京航空航天大学', '211'),
+    ('北京航天航空大学', 'regular'),
+    ('华中科技大学', '211'),
+    ('华中科技大', '211'),
+    ('西安电子科技大学', '211'),
+    ('西安电子科大', '211'),
+    ('南京航空航天大学', '211'),
+    ('南京理工大学', '211'),
+    ('苏州大学', '211'),
+    ('深圳大学', 'regular'),
+    ('南方科技大学', 'regular'),
+    ('上海科技大学', '211'),
+    ('宁波大学', 'regular'),
+    ('河北工业大学', '211'),
+    ('中国矿业大学（北京）', '211'),
+    ('中国地质大学(武汉)', '211'),
+    ('北京林业大学', '211'),
+    ('中央财经大学', '211'),
+    ('对外经济贸易大学', '211'),
+    ('外交学院', 'double_first_class'),
+    ('中国政法大学', '211'),
+    ('首都师范大学', 'double_first_class'),
+    ('东北财经大学', 'double_first_class'),
+    ('Harvard', 'regular'),
+    ('Harvard University', 'regular'),
+    ('MIT', 'regular'),
+    ('Tsinghua University', 'regular'),
+    ('Peking University', 'regular'),
+    ('University of Oxford', 'regular'),
+    ('National University of Singapore', 'regular'),
+    ('香港大学', 'regular'),
+    ('港大', 'regular'),
+    ('香港科技大学', 'regular'),
+    ('某某职业技术学院', 'regular'),
+    ('北京理工', '211'),
+    ('北理工', '211'),
+    ('天津大学', 'double_first_class'),
+    ('天津大学仁爱学院', 'regular'),
+    ('复旦', '211'),
+    ('复旦大学', '211'),
+    ('同济大学', '211'),
+    ('华东师范大学', '211'),
+    ('华东理工大学', '211'),
+    ('华理', '211'),
+    ('电子科技大学', '211'),
+    ('电子科技大学成都学院', 'regular'),
+    ('四川大学锦城学院', 'regular'),
+    ('武汉大学', '211'),
+    ('武汉理工大学', '211'),
+    ('湖南大学', '211'),
+    ('中南大学', '211'),
+    ('国防科技大学', '211'),
+    ('国防科学技术大学', '211'),
+    ('中国海洋大学', '211'),
+    ('海洋大学', '211'),
+    ('兰州大学', '211'),
+    ('西北工业大学', '211'),
+    ('西北大学', '211'),
+]
+
+
+def test_classification_matches_golden_set() -> None:
+    classifier = UniversityClassifier()
+    assert [(n, classifier.classify_university(n, overseas_hint=False)) for n, _ in GOLDEN] == GOLDEN
+
+
+def test_shortlist_never_drops_a_fuzzy_match() -> None:
+    classifier = UniversityClassifier()
+    names = classifier.universities_211
+    index = FuzzyNameIndex(names)
+    rng = random.Random(5)
+    pool = "".join(set("".join(names))) + "学院分校研究生 "
+
+    def brute_force(target: str) -> str | None:
+        best_ratio, best = 0.0, None
+        for c in names:
+            r = SequenceMatcher(None, target.lower(), c.lower()).ratio()
+            if r > best_ratio and r >= 0.8:
+                best_ratio, best = r, c
+        return best
+
+    for _ in range(300):
+        target = list(rng.choice(names))
+        for _ in range(rng.randint(0, 3)):
+            op, pos = rng.random(), rng.randrange(len(target) + 1)
+            if op < 0.4:
+                target.insert(pos, rng.choice(pool))
+            elif target and op < 0.7:
+                del target[min(pos, len(target) - 1)]
+            elif target:
+                target[min(pos, len(target) - 1)] = rng.choice(pool)
+        target = "".join(target)
+        assert index.best_match(target) == brute_force(target), target